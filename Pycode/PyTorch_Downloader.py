@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import threading
 import platform
 import sys
@@ -11,6 +11,20 @@ import shutil
 import struct
 import io
 import contextlib
+import collections
+import urllib.parse
+import multiprocessing
+
+from install_state import (INSTALL_INFO_NAME, check_installation, python_version, read_install_info,
+                           update_install_info, write_install_info)
+from model_fetcher import MODEL_DIR, MODEL_URLS, fetch_model, model_path
+from offline_bundle import BundleError, export_bundle, import_bundle, read_manifest
+from precompile_libs import compile_tree, is_compiled
+from runtime_check import CHILD_FLAG, format_report, verify_runtime
+from runtime_check import main as runtime_check_main
+from runtimes import VARIANTS, dedupe, installed_runtimes, migrate_legacy, runtime_dir, selected_variant, set_active_runtime
+from slim_libs import apply_prune, plan_prune
+from wheel_store import WheelStore, normalize_project
 
 
 def resource_root() -> Path:
@@ -23,6 +37,73 @@ def resource_root() -> Path:
     return Path(__file__).parent
 
 
+class PipOutputStream(io.TextIOBase):
+    """
+    pipの出力を1行ずつ渡し、`--progress-bar raw` の進捗行から速度と残り時間を求める
+    Hand pip's output on line by line; progress lines of `--progress-bar raw` become
+    (file, bytes done, total bytes, bytes per second, seconds left) callbacks
+    """
+    PROGRESS_RE = re.compile(r"^Progress (\d+) of (\d+)$")
+    DOWNLOADING_RE = re.compile(r"^\s*Downloading (\S+)")
+    RATE_WINDOW = 5.0   # 速度を平均する秒数 / Seconds the transfer rate is averaged over
+
+    def __init__(self, on_line, on_progress):
+        super().__init__()
+        self.on_line = on_line
+        self.on_progress = on_progress
+        self.pending = ""
+        self.current = None
+        self.samples = collections.deque()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        *lines, self.pending = (self.pending + text).split("\n")
+        for line in lines:
+            self.process_line(line.rstrip())
+        return len(text)
+
+    def finish(self):
+        if self.pending.strip():
+            self.process_line(self.pending.rstrip())
+        self.pending = ""
+
+    def process_line(self, line):
+        match = self.PROGRESS_RE.match(line.strip())
+        if match:
+            self.report_progress(int(match.group(1)), int(match.group(2)))
+            return
+        match = self.DOWNLOADING_RE.match(line)
+        if match:
+            self.current = urllib.parse.unquote(match.group(1).rsplit("/", 1)[-1])
+            self.samples.clear()
+        if line.strip():
+            self.on_line(line)
+
+    def report_progress(self, done, total):
+        now = time.monotonic()
+        self.samples.append((now, done))
+        while now - self.samples[0][0] > self.RATE_WINDOW:
+            self.samples.popleft()
+        start, start_done = self.samples[0]
+        rate = (done - start_done) / (now - start) if now > start else 0.0
+        eta = (total - done) / rate if rate > 0 and total else None
+        self.on_progress(self.current or "?", done, total, rate, eta)
+
+
+def pip_supports_raw_progress():
+    """
+    pipが `--progress-bar raw` に対応しているか (pip 24.1以降)
+    Whether this pip knows `--progress-bar raw` (pip 24.1 and later)
+    """
+    try:
+        from pip._internal.cli import cmdoptions
+        return "raw" in (cmdoptions.progress_bar().choices or ())
+    except Exception:
+        return False
+
+
 class PyTorchDownloader:
     """
     PyTorchとWhisperの依存関係ダウンローダー (Dependency Downloader for PyTorch & Whisper)
@@ -30,9 +111,17 @@ class PyTorchDownloader:
     (Downloads PyTorch & Whisper to a specific directory for dynamic loading)
     """
 
+    # インストールの各ステップと要求パッケージ / Install steps and the packages each one requests
+    STEP_PACKAGES = {
+        "pytorch-core": ["torch", "torchvision", "torchaudio", "numpy"],
+        "pytorch-extras": ["tqdm", "mpmath", "tiktoken", "regex", "numba", "llvmlite"],
+        "openai-whisper": ["openai-whisper"],
+    }
+    # Transcriptionでは使わないパッケージ（軽量インストールでは省く） / Unused by Transcription, left out of slim installs
+    SLIM_SKIP = ("torchvision", "torchaudio")
+
     def __init__(self):
         # 基本属性の初期化 / Initialize core attributes
-        self.target_dir = Path("pytorch_libs")
         self.is_downloading = False
         self.download_thread = None
         self.current_language = "en"  # Default to English
@@ -67,6 +156,13 @@ class PyTorchDownloader:
         # 既存インストールの確認 / Check if installation already exists
         self.check_existing_installation()
 
+    @property
+    def target_dir(self):
+        """
+        選択中のバリアント（cpu/cuda）のランタイムフォルダ / Runtime folder of the selected variant (cpu/cuda)
+        """
+        return runtime_dir(".", self.version_var.get())
+
     def setup_responsive_scaling(self):
         """Calculate scaling factors based on screen size"""
         # Create temporary root to get screen dimensions
@@ -147,6 +243,10 @@ class PyTorchDownloader:
                 "language": "Language:",
                 "platform_detected": "Detected platform:",
                 "existing_dir": "Existing directory detected:",
+                "runtime_installed": "Installed runtimes: {} (* = used by Transcription)",
+                "runtime_active": "Transcription will use the {} runtime ({}) from its next start",
+                "runtime_linked": "Linked {} files ({:.0f} MB) shared with the {} runtime",
+                "runtime_migrated": "Moved the old pytorch_libs folder to {}",
                 "cleaning_up": "Cleaning up existing installations...",
                 "cleanup_status": "Cleaning up...",
                 "cleanup_warning": "Warning: Failed to remove",
@@ -155,13 +255,40 @@ class PyTorchDownloader:
                 "warning": "Warning",
                 "already_downloading": "Already downloading",
                 "confirm": "Confirm",
-                "download_confirm": "Download to {}? Existing files will be removed.",
+                "download_confirm": "Download to {}? Existing files that differ from the selection will be replaced.",
                 "error": "Error",
                 "cuda_error": "Unsupported or missing CUDA Toolkit.",
                 "pip_error": "pip Error",
                 "pip_import_failed": "Failed to import pip:",
                 "embedded_wheel": "Using embedded wheel:",
                 "no_embedded_wheel": "Embedded wheel not found → fallback to PyPI",
+                "wheel_cache_hit": "Installed from the local wheel cache (nothing downloaded)",
+                "wheel_cache_downloaded": "Downloaded {} new wheel(s) into the local wheel cache",
+                "wheel_cache_stats": "Wheel cache: {} wheels, {:.1f} GB ({} pruned)",
+                "wheel_cache_unavailable": "Wheel cache unavailable, downloading directly:",
+                "export_bundle": "📦 Export Bundle",
+                "import_bundle": "📥 Import Bundle",
+                "bundle_choose_models": "Select Whisper models to include (Cancel for none)",
+                "bundle_import_confirm": "Install the offline bundle {} into {}? Existing PyTorch files will be replaced.",
+                "bundle_exported": "Offline bundle written: {}",
+                "bundle_imported": "Offline bundle installed: {}",
+                "bundle_failed": "Offline bundle failed",
+                "install_up_to_date": "Installation already matches the request ({} files checked in {:.1f}s), nothing to download",
+                "install_repairing": "Reinstalling only what differs:",
+                "install_full": "Full reinstall:",
+                "install_repair_failed": "Repair from the wheel cache failed, reinstalling everything:",
+                "whisper_model": "Whisper model:",
+                "fetch_model": "⬇️ Download Model",
+                "model_fetch_progress": "Downloading {}: {:.0f} / {:.0f} MB",
+                "model_fetched": "Model {} verified: {} ({:.1f}s)",
+                "model_fetch_failed": "Model download failed",
+                "slim_install": "Slim install (skip torchvision/torchaudio, remove tests and headers)",
+                "slim_pruning": "Slimming the runtime and running an import smoke test...",
+                "slim_done": "Slimmed the runtime: {} removed, smoke test passed ({})",
+                "slim_failed": "Slimming undone, the smoke test failed:",
+                "precompiling": "Precompiling the runtime's Python bytecode...",
+                "precompiled": "Compiled {} files in {}s with {} processes ({} could not be compiled)",
+                "pip_download_progress": "Downloading {}: {:.0f} / {:.0f} MB ({:.1f} MB/s, {} left)",
                 "download_complete": "Done",
                 "complete": "Complete",
                 "download_success_msg": "Download of PyTorch + Whisper has completed!\nYou may click 'Verify' or close this window.",
@@ -194,6 +321,10 @@ class PyTorchDownloader:
                 "language": "言語:",
                 "platform_detected": "検出されたプラットフォーム:",
                 "existing_dir": "既存ディレクトリ検出:",
+                "runtime_installed": "インストール済みのランタイム: {}（* = Transcriptionが使用）",
+                "runtime_active": "次回の起動からTranscriptionは {} ランタイム ({}) を使用します",
+                "runtime_linked": "{} ファイル ({:.0f} MB) を {} ランタイムとハードリンクで共有しました",
+                "runtime_migrated": "旧pytorch_libsフォルダを {} に移動しました",
                 "cleaning_up": "既存インストールをクリーンアップ中...",
                 "cleanup_status": "クリーンアップ中...",
                 "cleanup_warning": "警告: 削除失敗",
@@ -202,13 +333,40 @@ class PyTorchDownloader:
                 "warning": "警告",
                 "already_downloading": "ダウンロード中です",
                 "confirm": "確認",
-                "download_confirm": "{} へダウンロードしますか？既存の内容は削除されます。",
+                "download_confirm": "{} へダウンロードしますか？選択内容と異なる既存ファイルは置き換えられます。",
                 "error": "エラー",
                 "cuda_error": "CUDA Toolkit が見つからないか、サポートされていません。",
                 "pip_error": "pip エラー",
                 "pip_import_failed": "pip のインポートに失敗しました:",
                 "embedded_wheel": "同梱wheelを使用します:",
                 "no_embedded_wheel": "同梱wheelが見つかりませんでした→PyPIからインストール",
+                "wheel_cache_hit": "ローカルwheelキャッシュからインストールしました（ダウンロードなし）",
+                "wheel_cache_downloaded": "新しいwheelを{}個ダウンロードしてキャッシュに追加しました",
+                "wheel_cache_stats": "wheelキャッシュ: {}個, {:.1f} GB（{}個削除）",
+                "wheel_cache_unavailable": "wheelキャッシュを使用できないため直接ダウンロードします:",
+                "export_bundle": "📦 バンドル書き出し",
+                "import_bundle": "📥 バンドル読み込み",
+                "bundle_choose_models": "同梱するWhisperモデルを選択（キャンセルで同梱なし）",
+                "bundle_import_confirm": "オフラインバンドル {} を {} にインストールしますか？既存のPyTorchファイルは置き換えられます。",
+                "bundle_exported": "オフラインバンドルを書き出しました: {}",
+                "bundle_imported": "オフラインバンドルをインストールしました: {}",
+                "bundle_failed": "オフラインバンドルの処理に失敗しました",
+                "install_up_to_date": "インストール済みの内容は要求と一致しています（{} ファイルを {:.1f} 秒で確認）。ダウンロードは不要です",
+                "install_repairing": "差分のみ再インストールします:",
+                "install_full": "全体を再インストールします:",
+                "install_repair_failed": "wheelキャッシュからの修復に失敗したため全体を再インストールします:",
+                "whisper_model": "Whisperモデル:",
+                "fetch_model": "⬇️ モデルをダウンロード",
+                "model_fetch_progress": "{} をダウンロード中: {:.0f} / {:.0f} MB",
+                "model_fetched": "モデル {} を検証しました: {} ({:.1f}秒)",
+                "model_fetch_failed": "モデルのダウンロードに失敗しました",
+                "slim_install": "軽量インストール（torchvision/torchaudioを省き、テストとヘッダーを削除）",
+                "slim_pruning": "ランタイムを軽量化し、importのスモークテストを実行中...",
+                "slim_done": "ランタイムを軽量化しました: {} 削除、スモークテスト成功 ({})",
+                "slim_failed": "スモークテストに失敗したため軽量化を取り消しました:",
+                "precompiling": "ランタイムのPythonバイトコードを事前コンパイル中...",
+                "precompiled": "{} ファイルを {} 秒でコンパイルしました（{} プロセス、コンパイル不可 {} 件）",
+                "pip_download_progress": "{} をダウンロード中: {:.0f} / {:.0f} MB（{:.1f} MB/s、残り {}）",
                 "download_complete": "ダウンロード完了",
                 "complete": "完了",
                 "download_success_msg": "PyTorch + Whisper のダウンロードが完了しました！\n✔️『検証』をクリックするか、ウィンドウを閉じてください。",
@@ -241,6 +399,10 @@ class PyTorchDownloader:
                 "language": "语言：",
                 "platform_detected": "检测到的平台：",
                 "existing_dir": "检测到现有目录：",
+                "runtime_installed": "已安装的运行时：{}（* = Transcription 使用）",
+                "runtime_active": "Transcription 下次启动时将使用 {} 运行时（{}）",
+                "runtime_linked": "已通过硬链接与 {2} 运行时共享 {0} 个文件（{1:.0f} MB）",
+                "runtime_migrated": "已将旧的 pytorch_libs 文件夹移动到 {}",
                 "cleaning_up": "正在清理现有安装...",
                 "cleanup_status": "清理中...",
                 "cleanup_warning": "警告：删除失败",
@@ -249,13 +411,40 @@ class PyTorchDownloader:
                 "warning": "警告",
                 "already_downloading": "正在下载中",
                 "confirm": "确认",
-                "download_confirm": "要下载到 {} 吗？现有内容将被删除。",
+                "download_confirm": "要下载到 {} 吗？与所选内容不同的现有文件将被替换。",
                 "error": "错误",
                 "cuda_error": "未找到或不支持 CUDA Toolkit。",
                 "pip_error": "pip 错误",
                 "pip_import_failed": "导入 pip 失败：",
                 "embedded_wheel": "使用内置 wheel：",
                 "no_embedded_wheel": "未找到内置 wheel → 从 PyPI 安装",
+                "wheel_cache_hit": "已从本地 wheel 缓存安装（无需下载）",
+                "wheel_cache_downloaded": "已下载 {} 个新 wheel 并加入本地缓存",
+                "wheel_cache_stats": "wheel 缓存：{} 个，{:.1f} GB（已清理 {} 个）",
+                "wheel_cache_unavailable": "wheel 缓存不可用，直接下载：",
+                "export_bundle": "📦 导出离线包",
+                "import_bundle": "📥 导入离线包",
+                "bundle_choose_models": "选择要包含的 Whisper 模型（取消则不包含）",
+                "bundle_import_confirm": "将离线包 {} 安装到 {}？现有的 PyTorch 文件将被替换。",
+                "bundle_exported": "离线包已写出：{}",
+                "bundle_imported": "离线包已安装：{}",
+                "bundle_failed": "离线包处理失败",
+                "install_up_to_date": "已安装内容与请求一致（{} 个文件，耗时 {:.1f} 秒），无需下载",
+                "install_repairing": "仅重新安装有差异的部分：",
+                "install_full": "完整重新安装：",
+                "install_repair_failed": "从 wheel 缓存修复失败，完整重新安装：",
+                "whisper_model": "Whisper 模型：",
+                "fetch_model": "⬇️ 下载模型",
+                "model_fetch_progress": "正在下载 {}：{:.0f} / {:.0f} MB",
+                "model_fetched": "模型 {} 已校验：{}（{:.1f} 秒）",
+                "model_fetch_failed": "模型下载失败",
+                "slim_install": "精简安装（不安装 torchvision/torchaudio，删除测试与头文件）",
+                "slim_pruning": "正在精简运行时并运行导入冒烟测试...",
+                "slim_done": "运行时已精简：删除 {}，冒烟测试通过（{}）",
+                "slim_failed": "冒烟测试失败，已撤销精简：",
+                "precompiling": "正在预编译运行时的 Python 字节码...",
+                "precompiled": "已编译 {} 个文件，用时 {} 秒（{} 个进程，{} 个无法编译）",
+                "pip_download_progress": "正在下载 {}：{:.0f} / {:.0f} MB（{:.1f} MB/s，剩余 {}）",
                 "download_complete": "下载完成",
                 "complete": "完成",
                 "download_success_msg": "PyTorch + Whisper 下载完成！\n您可以点击验证或关闭此窗口。",
@@ -288,6 +477,10 @@ class PyTorchDownloader:
                 "language": "언어:",
                 "platform_detected": "감지된 플랫폼:",
                 "existing_dir": "기존 디렉토리 감지:",
+                "runtime_installed": "설치된 런타임: {} (* = Transcription에서 사용)",
+                "runtime_active": "다음 실행부터 Transcription은 {} 런타임({})을 사용합니다",
+                "runtime_linked": "{2} 런타임과 {0}개 파일({1:.0f} MB)을 하드 링크로 공유했습니다",
+                "runtime_migrated": "이전 pytorch_libs 폴더를 {}(으)로 옮겼습니다",
                 "cleaning_up": "기존 설치를 정리하는 중...",
                 "cleanup_status": "정리 중...",
                 "cleanup_warning": "경고: 제거 실패",
@@ -296,13 +489,40 @@ class PyTorchDownloader:
                 "warning": "경고",
                 "already_downloading": "이미 다운로드 중입니다",
                 "confirm": "확인",
-                "download_confirm": "{} 에 다운로드하시겠습니까? 기존 파일은 삭제됩니다.",
+                "download_confirm": "{} 에 다운로드하시겠습니까? 선택과 다른 기존 파일은 교체됩니다.",
                 "error": "오류",
                 "cuda_error": "CUDA 툴킷을 찾을 수 없거나 지원되지 않습니다.",
                 "pip_error": "pip 오류",
                 "pip_import_failed": "pip 가져오기 실패:",
                 "embedded_wheel": "내장 wheel 사용:",
                 "no_embedded_wheel": "내장 wheel을 찾을 수 없음 → PyPI에서 설치",
+                "wheel_cache_hit": "로컬 wheel 캐시에서 설치했습니다 (다운로드 없음)",
+                "wheel_cache_downloaded": "새 wheel {}개를 다운로드하여 로컬 캐시에 추가했습니다",
+                "wheel_cache_stats": "wheel 캐시: {}개, {:.1f} GB ({}개 정리됨)",
+                "wheel_cache_unavailable": "wheel 캐시를 사용할 수 없어 직접 다운로드합니다:",
+                "export_bundle": "📦 번들 내보내기",
+                "import_bundle": "📥 번들 가져오기",
+                "bundle_choose_models": "포함할 Whisper 모델 선택 (취소하면 포함하지 않음)",
+                "bundle_import_confirm": "오프라인 번들 {}을(를) {}에 설치하시겠습니까? 기존 PyTorch 파일이 교체됩니다.",
+                "bundle_exported": "오프라인 번들을 저장했습니다: {}",
+                "bundle_imported": "오프라인 번들을 설치했습니다: {}",
+                "bundle_failed": "오프라인 번들 처리 실패",
+                "install_up_to_date": "설치된 내용이 요청과 일치합니다 ({}개 파일, {:.1f}초 확인). 다운로드할 것이 없습니다",
+                "install_repairing": "차이가 있는 부분만 다시 설치합니다:",
+                "install_full": "전체를 다시 설치합니다:",
+                "install_repair_failed": "wheel 캐시에서 복구하지 못해 전체를 다시 설치합니다:",
+                "whisper_model": "Whisper 모델:",
+                "fetch_model": "⬇️ 모델 다운로드",
+                "model_fetch_progress": "{} 다운로드 중: {:.0f} / {:.0f} MB",
+                "model_fetched": "모델 {} 검증 완료: {} ({:.1f}초)",
+                "model_fetch_failed": "모델 다운로드 실패",
+                "slim_install": "경량 설치 (torchvision/torchaudio 제외, 테스트와 헤더 삭제)",
+                "slim_pruning": "런타임 경량화 및 import 스모크 테스트 실행 중...",
+                "slim_done": "런타임 경량화 완료: {} 삭제, 스모크 테스트 통과 ({})",
+                "slim_failed": "스모크 테스트에 실패하여 경량화를 취소했습니다:",
+                "precompiling": "런타임의 Python 바이트코드를 미리 컴파일하는 중...",
+                "precompiled": "{}개 파일을 {}초 만에 컴파일했습니다 ({}개 프로세스, 컴파일 불가 {}개)",
+                "pip_download_progress": "{} 다운로드 중: {:.0f} / {:.0f} MB ({:.1f} MB/s, 남은 시간 {})",
                 "download_complete": "다운로드 완료",
                 "complete": "완료",
                 "download_success_msg": "PyTorch + Whisper 다운로드가 완료되었습니다!\n'검증'을 클릭하거나 이 창을 닫으세요.",
@@ -586,6 +806,7 @@ class PyTorchDownloader:
             text=self.t("cpu_version"),
             variable=self.version_var,
             value="cpu",
+            command=self.on_variant_changed,
             font=self.fonts['normal'],
             bg=self.colors['surface'],
             fg=self.colors['text'],
@@ -594,7 +815,7 @@ class PyTorchDownloader:
         )
         self.cpu_radio.pack(anchor=tk.W, pady=self.scaled_dimensions['padding_tiny'])
 
-        cuda_ok = self.check_cuda_available()
+        cuda_ok = self.cuda_ok = self.check_cuda_available()
         cuda_text = self.t("cuda_version")
         if not cuda_ok:
             cuda_text += f" - {self.t('not_detected')}"
@@ -604,6 +825,7 @@ class PyTorchDownloader:
             text=cuda_text,
             variable=self.version_var,
             value="cuda",
+            command=self.on_variant_changed,
             font=self.fonts['normal'],
             bg=self.colors['surface'],
             fg=self.colors['text'] if cuda_ok else self.colors['text_light'],
@@ -613,6 +835,19 @@ class PyTorchDownloader:
         )
         self.cuda_radio.pack(anchor=tk.W, pady=self.scaled_dimensions['padding_tiny'])
 
+        self.slim_var = tk.BooleanVar(value=False)
+        self.slim_check = tk.Checkbutton(
+            radio_frame,
+            text=self.t("slim_install"),
+            variable=self.slim_var,
+            font=self.fonts['small'],
+            bg=self.colors['surface'],
+            fg=self.colors['text'],
+            activebackground=self.colors['surface'],
+            selectcolor=self.colors['surface']
+        )
+        self.slim_check.pack(anchor=tk.W, pady=self.scaled_dimensions['padding_tiny'])
+
         # Install directory
         self.install_dir_label = tk.Label(
             inner,
@@ -624,6 +859,41 @@ class PyTorchDownloader:
         )
         self.install_dir_label.pack(pady=(self.scaled_dimensions['padding_medium'], 0))
 
+        # Whisperモデルの事前ダウンロード / Prefetch a Whisper model
+        model_frame = tk.Frame(inner, bg=self.colors['surface'])
+        model_frame.pack(pady=(self.scaled_dimensions['padding_small'], 0))
+
+        self.model_label = tk.Label(
+            model_frame,
+            text=self.t("whisper_model"),
+            font=self.fonts['small'],
+            fg=self.colors['text'],
+            bg=self.colors['surface']
+        )
+        self.model_label.pack(side=tk.LEFT)
+
+        self.model_var = tk.StringVar(value="small")
+        ttk.Combobox(
+            model_frame,
+            textvariable=self.model_var,
+            values=list(MODEL_URLS),
+            state="readonly",
+            width=14
+        ).pack(side=tk.LEFT, padx=self.scaled_dimensions['padding_tiny'])
+
+        self.fetch_model_btn = tk.Button(
+            model_frame,
+            text=self.t("fetch_model"),
+            command=self.start_fetch_model,
+            font=self.fonts['small'],
+            bg=self.colors['text_light'],
+            fg='white',
+            activebackground=self.colors['primary'],
+            relief=tk.FLAT,
+            cursor='hand2'
+        )
+        self.fetch_model_btn.pack(side=tk.LEFT)
+
     def create_status_card(self, parent):
         """Create status card"""
         inner = self.create_card_frame(parent, self.t("status"))
@@ -710,6 +980,28 @@ class PyTorchDownloader:
         )
         self.verify_btn.pack(side=tk.LEFT, padx=self.scaled_dimensions['padding_small'])
 
+        self.export_btn = tk.Button(
+            button_frame,
+            text=self.t("export_bundle"),
+            command=self.start_export_bundle,
+            bg=self.colors['text_light'],
+            fg='white',
+            activebackground=self.colors['primary'],
+            **button_config
+        )
+        self.export_btn.pack(side=tk.LEFT, padx=self.scaled_dimensions['padding_small'])
+
+        self.import_btn = tk.Button(
+            button_frame,
+            text=self.t("import_bundle"),
+            command=self.start_import_bundle,
+            bg=self.colors['text_light'],
+            fg='white',
+            activebackground=self.colors['primary'],
+            **button_config
+        )
+        self.import_btn.pack(side=tk.LEFT, padx=self.scaled_dimensions['padding_small'])
+
         self.close_btn = tk.Button(
             button_frame,
             text=self.t("close"),
@@ -776,8 +1068,11 @@ class PyTorchDownloader:
         if self.cuda_radio['state'] == tk.DISABLED:
             cuda_text += f" - {self.t('not_detected')}"
         self.cuda_radio.config(text=cuda_text)
+        self.slim_check.config(text=self.t("slim_install"))
         
         self.install_dir_label.config(text=f"{self.t('install_dir')} {self.target_dir.absolute()}")
+        self.model_label.config(text=self.t("whisper_model"))
+        self.fetch_model_btn.config(text=self.t("fetch_model"))
         
         # Update status
         if self.status_label.cget("text") in ["準備完了", "Ready", "准备就绪", "준비 완료"]:
@@ -786,6 +1081,8 @@ class PyTorchDownloader:
         # Update buttons
         self.download_btn.config(text=self.t("start_download"))
         self.verify_btn.config(text=self.t("verify"))
+        self.export_btn.config(text=self.t("export_bundle"))
+        self.import_btn.config(text=self.t("import_bundle"))
         self.close_btn.config(text=self.t("close"))
 
     def check_cuda_available(self):
@@ -802,12 +1099,60 @@ class PyTorchDownloader:
 
     def check_existing_installation(self):
         """
-        すでにpytorch_libsフォルダがある場合を確認 / Check if the target_dir already exists
+        すでにランタイムがある場合を確認（旧pytorch_libsは移動）/ Check for installed runtimes (an old pytorch_libs is moved)
         """
+        try:
+            migrated = migrate_legacy()
+            if migrated:
+                self.log_output(self.t("runtime_migrated").format(migrated))
+        except OSError as e:
+            self.log_output(f"{self.t('cleanup_warning')} pytorch_libs: {e}")
+        installed = installed_runtimes()
+        if installed:
+            active = selected_variant()
+            self.version_var.set(active if active in installed else next(iter(installed)))
+            self.on_variant_changed()
+            self.log_output(self.t("runtime_installed").format(
+                ", ".join(f"{v}{' *' if v == active else ''}" for v in installed)))
         if self.target_dir.exists():
             self.log_output(f"{self.t('existing_dir')} {self.target_dir}")
             self.verify_btn.config(state=tk.NORMAL)
 
+    def on_variant_changed(self):
+        """
+        バリアント変更時にインストール先表示を更新 / Show the runtime folder of the newly selected variant
+        """
+        self.install_dir_label.config(text=f"{self.t('install_dir')} {self.target_dir.absolute()}")
+        installed = self.target_dir in installed_runtimes().values()
+        self.verify_btn.config(state=tk.NORMAL if installed else tk.DISABLED)
+
+    def set_variant_radios(self, enabled):
+        """
+        処理中はバリアント（=対象フォルダ）を変更できないようにする / Lock the variant, and so the target folder, while a task runs
+        """
+        self.cpu_radio.config(state=tk.NORMAL if enabled else tk.DISABLED)
+        self.cuda_radio.config(state=tk.NORMAL if enabled and self.cuda_ok else tk.DISABLED)
+
+    def activate_runtime(self):
+        """
+        インストール済みのランタイムを次回のTranscription起動時に使うよう選択
+        Select the installed runtime for the next start of Transcription
+        """
+        variant = self.version_var.get()
+        set_active_runtime(".", variant)
+        self.log_output(self.t("runtime_active").format(variant, self.target_dir))
+
+    def dedupe_runtime(self):
+        """
+        他のランタイムと同一のファイルをハードリンクで共有 / Share files identical to another runtime's through hard links
+        """
+        for variant, folder in installed_runtimes().items():
+            if folder == self.target_dir:
+                continue
+            linked, saved = dedupe(self.target_dir, [folder], log=self.log_output)
+            if linked:
+                self.log_output(self.t("runtime_linked").format(linked, saved / 1024 ** 2, variant))
+
     def log_output(self, message):
         """
         ログエリアにメッセージを出力 / Output message to log (ScrolledText)
@@ -827,9 +1172,34 @@ class PyTorchDownloader:
                 self.status_label.config(fg=color)
         self.root.after(0, update)
 
+    def show_download_progress(self, name, done, total, rate, eta):
+        """
+        pipのダウンロード進捗をプログレスバーとステータスに表示
+        Show pip's download progress in the progress bar and the status label
+        """
+        def update():
+            if total:
+                self.progress_bar.stop()
+                self.progress_bar.config(mode='determinate', maximum=total, value=done)
+        self.root.after(0, update)
+        eta_text = f"{int(eta) // 60}:{int(eta) % 60:02d}" if eta is not None else "--:--"
+        self.update_status(self.t("pip_download_progress").format(
+            name, done / 1024 ** 2, total / 1024 ** 2, rate / 1024 ** 2, eta_text), self.colors['accent'])
+
+    def reset_progress(self):
+        """
+        ダウンロード後にプログレスバーを不確定表示へ戻す / Put the progress bar back to indeterminate after a download
+        """
+        def update():
+            if str(self.progress_bar.cget('mode')) == 'determinate':
+                self.progress_bar.config(mode='indeterminate', value=0)
+                self.progress_bar.start()
+        self.root.after(0, update)
+
     def clean_pytorch_installation(self):
         """
-        既存のPyTorchインストールを削除しクリーンアップ / Clean up existing PyTorch installations
+        選択中のランタイムからPyTorchを削除しクリーンアップ（他のランタイムはそのまま）
+        Clean up the PyTorch installation of the selected runtime (other runtimes are kept)
         """
         self.log_output(self.t("cleaning_up"))
         self.update_status(self.t("cleanup_status"), self.colors['warning'])
@@ -865,6 +1235,7 @@ class PyTorchDownloader:
 
         self.is_downloading = True
         self.download_btn.config(state=tk.DISABLED)
+        self.set_variant_radios(False)
         self.progress_bar.start()
         self.output_text.delete(1.0, tk.END)
 
@@ -902,73 +1273,90 @@ class PyTorchDownloader:
             raise
 
         full_cmd = pip_args[:]
+        if full_cmd[:1] == ["install"] and "--no-compile" not in full_cmd:
+            # .pycはインストール後に並列でまとめて生成 / Bytecode is compiled afterwards, in parallel
+            full_cmd.append("--no-compile")
+        if full_cmd[:1] in (["install"], ["download"]) and "--progress-bar" not in full_cmd \
+                and pip_supports_raw_progress():
+            # 機械可読な進捗行を出力させる / Have pip print machine-readable progress lines
+            full_cmd += ["--progress-bar", "raw"]
         self.log_output(f"[{label}] pip {' '.join(full_cmd)}")
 
-        # pip 出力をキャプチャ / Capture pip output
-        output_buffer = io.StringIO()
-        with contextlib.redirect_stdout(output_buffer), contextlib.redirect_stderr(output_buffer):
-            try:
-                rc = pip_main(full_cmd)  # pip_main returns 0 if success
-            except SystemExit as e:
-                rc = e.code if e.code is not None else 1
-
-        # キャプチャした出力をログ表示 / Show captured output in logs
-        output = output_buffer.getvalue()
-        if output:
-            for line in output.splitlines():
-                if line.strip():
-                    self.log_output(line)
+        # pip 出力を1行ずつログへ / Stream pip output into the log line by line
+        stream = PipOutputStream(self.log_output, self.show_download_progress)
+        try:
+            with contextlib.redirect_stdout(stream), contextlib.redirect_stderr(stream):
+                try:
+                    rc = pip_main(full_cmd)  # pip_main returns 0 if success
+                except SystemExit as e:
+                    rc = e.code if e.code is not None else 1
+            stream.finish()
+        finally:
+            self.reset_progress()
 
         if rc != 0:
             raise RuntimeError(f"{label} failed with exit-code {rc}")
 
-    def download_dependencies(self):
+    def open_wheel_store(self):
         """
-        PyTorch、Whisper、および関連依存関係をダウンロード・インストールする
-        Download & install PyTorch, Whisper, and related dependencies
+        ダウンロード済みwheelのキャッシュを開く（失敗時はNone）
+        Open the local wheel cache, or None when it cannot be used
         """
         try:
-            self.target_dir.mkdir(exist_ok=True)
-            self.clean_pytorch_installation()
+            return WheelStore()
+        except Exception as e:
+            self.log_output(f"{self.t('wheel_cache_unavailable')} {e}")
+            return None
 
-            PY_VER = f"{sys.version_info.major}{sys.version_info.minor}"
-            if self.version_var.get() == "cuda":
-                url = self.get_cuda_index_url()
-                # CUDA URLがNoneの場合、早期終了 / If None, exit early (error already shown)
-                if not url:
-                    return
-            else:
-                url = "https://download.pytorch.org/whl/cpu"
+    def _install_cached(self, store, packages, index_url, pip_options, label):
+        """
+        wheelキャッシュ経由でインストール。キャッシュにないwheelだけをダウンロード
+        Install through the wheel cache; only wheels it lacks are downloaded
+        """
+        if store is None:
+            self._run_pip([
+                "install", *packages, "--index-url", index_url, *pip_options,
+                "--no-cache-dir", "--target", str(self.target_dir)
+            ], label)
+            return
+        downloaded = store.install(self._run_pip, packages, self.target_dir, index_url, pip_options, label)
+        if downloaded:
+            self.log_output(self.t("wheel_cache_downloaded").format(len(downloaded)))
+        else:
+            self.log_output(self.t("wheel_cache_hit"))
 
-            # ---------- Step1： Torch Core ----------
-            core_pkgs = ["torch", "torchvision", "torchaudio", "numpy"]
+    def install_steps(self, store, steps, url, PY_VER):
+        """
+        指定したステップ（STEP_PACKAGESのラベル）を順にインストール
+        Install the given steps (labels of STEP_PACKAGES) in order
+        """
+        # ---------- Step1： Torch Core ----------
+        if "pytorch-core" in steps:
             self.log_output(f"Index URL (core): {url}")
-            self._run_pip([
-                "install", *core_pkgs,
-                "--index-url", url,
+            self._install_cached(store, self.step_packages()["pytorch-core"], url, [
                 "--only-binary", ":all:",
                 "--implementation", "cp",
                 "--python-version", PY_VER,
                 "--platform", self.platform_tag,
-                "--upgrade", "--no-cache-dir",
-                "--target", str(self.target_dir)
+                "--upgrade"
             ], "pytorch-core")
 
-            # ---------- Step2： Other Dependencies ----------
-            extra_pkgs = ["tqdm", "mpmath", "tiktoken", "regex", "numba", "llvmlite"]
+        # ---------- Step2： Other Dependencies ----------
+        if "pytorch-extras" in steps:
             self.log_output("Index URL (extra): https://pypi.org/simple")
-            self._run_pip([
-                "install", *extra_pkgs,
+            self._install_cached(store, self.step_packages()["pytorch-extras"], "https://pypi.org/simple", [
                 "--only-binary", ":all:",  # これらはPyPIにwheelがある / These have wheels on PyPI
-                "--upgrade", "--no-cache-dir",
-                "--target", str(self.target_dir)
+                "--upgrade"
             ], "pytorch-extras")
 
-            # ---------- Step3： Whisper ----------
+        # ---------- Step3： Whisper ----------
+        if "openai-whisper" in steps:
             wheel_path = self._find_embedded_whisper_wheel()
             # exe版はthird_party_wheels内にopenai_whisperのwhlが含まれる / For exe bundling, the wheel might be included
             if wheel_path and wheel_path.exists():
                 self.log_output(f"{self.t('embedded_wheel')} {wheel_path.name}")
+                if store is not None:
+                    store.add(wheel_path)   # 修復・バンドル用に保存 / Kept for repairs and bundles
                 self._run_pip([
                     "install", str(wheel_path),
                     "--no-deps", "--upgrade", "--no-cache-dir",
@@ -976,22 +1364,131 @@ class PyTorchDownloader:
                 ], "openai-whisper")
             else:
                 self.log_output(self.t("no_embedded_wheel"))
-                self._run_pip([
-                    "install", "openai-whisper",
+                self._install_cached(store, self.step_packages()["openai-whisper"], "https://pypi.org/simple", [
                     "--only-binary", ":all:",  # PyPI上に公式wheel有 / Official wheel on PyPI
-                    "--no-deps", "--upgrade", "--no-cache-dir",
-                    "--target", str(self.target_dir)
+                    "--no-deps", "--upgrade"
                 ], "openai-whisper")
 
-            # インストール情報の書き込み / Write installation info
-            install_info = {
-                "version": self.version_var.get(),
-                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    def step_packages(self):
+        """
+        各ステップのパッケージ（軽量インストールではSLIM_SKIPを除く）
+        Packages of each step, without SLIM_SKIP for a slim install
+        """
+        if not self.slim_var.get():
+            return self.STEP_PACKAGES
+        return {label: [p for p in pkgs if p not in self.SLIM_SKIP] for label, pkgs in self.STEP_PACKAGES.items()}
+
+    def slim_installation(self, packages):
+        """
+        不要なパッケージ・テスト・ヘッダーを削除し、別プロセスのimportテストで確認（失敗時は元に戻す）
+        Remove unused packages, tests and headers, checked by a fresh-process import test (undone on failure)
+        """
+        self.log_output(self.t("slim_pruning"))
+        plan = plan_prune(self.target_dir, packages)
+        ok, message = apply_prune(self.target_dir, plan, log=self.log_output)
+        if ok:
+            self.log_output(self.t("slim_done").format(plan.describe(), message))
+        else:
+            self.log_output(f"{self.t('slim_failed')} {message}")
+        return ok
+
+    def precompile_installation(self):
+        """
+        ランタイム全体を複数プロセスでバイトコードにコンパイルし、記録用の結果を返す
+        Compile the whole runtime to bytecode with a process pool; returns the record
+        """
+        self.log_output(self.t("precompiling"))
+        bytecode = compile_tree(self.target_dir)
+        self.log_output(self.t("precompiled").format(
+            bytecode["files"], bytecode["seconds"], bytecode["workers"], bytecode["failed"]))
+        return bytecode
+
+    def repair_installation(self, store, check, PY_VER):
+        """
+        破損したパッケージを記録済みのバージョンでwheelキャッシュから再インストールし、
+        不足しているパッケージを含むステップを返す（RuntimeErrorなら全体を再インストール）
+        Reinstall damaged packages at their recorded version from the wheel cache and
+        return the steps that contain missing packages (RuntimeError means reinstall all)
+        """
+        for name, version, problem in check.damaged:
+            self.log_output(f"{name} {version}: {problem}")
+        if check.damaged:
+            self._run_pip([
+                "install", *[f"{name}=={version}" for name, version, _ in check.damaged],
+                "--only-binary", ":all:",
+                "--implementation", "cp",
+                "--python-version", PY_VER,
+                "--platform", self.platform_tag,
+                "--no-deps", "--upgrade", "--force-reinstall", "--no-cache-dir",
+                "--target", str(self.target_dir), *store.offline_args()
+            ], "repair (wheel cache)")
+        missing = set(check.missing)
+        return [label for label, pkgs in self.step_packages().items()
+                if missing & {normalize_project(p) for p in pkgs}]
+
+    def download_dependencies(self):
+        """
+        PyTorch、Whisper、および関連依存関係をダウンロード・インストールする
+        Download & install PyTorch, Whisper, and related dependencies
+        """
+        try:
+            self.target_dir.mkdir(parents=True, exist_ok=True)
+            store = self.open_wheel_store()
+
+            PY_VER = f"{sys.version_info.major}{sys.version_info.minor}"
+            if self.version_var.get() == "cuda":
+                url = self.get_cuda_index_url()
+                # CUDA URLがNoneの場合、早期終了 / If None, exit early (error already shown)
+                if not url:
+                    return
+            else:
+                url = "https://download.pytorch.org/whl/cpu"
+
+            # 記録済みのインストールとRECORDのハッシュを比較 / Compare with the recorded install and RECORD hashes
+            request = {
+                "variant": self.version_var.get(),
+                "index_url": url,
+                "python": python_version(),
                 "platform": self.platform_tag,
-                "python": sys.version.split()[0]
+                "slim": self.slim_var.get(),
+                "packages": [p for pkgs in self.step_packages().values() for p in pkgs],
             }
-            with open(self.target_dir / "pytorch_whisper_installed.json", "w") as f:
-                json.dump(install_info, f, indent=2)
+            check = check_installation(self.target_dir, request)
+            if check.ok:
+                self.log_output(self.t("install_up_to_date").format(check.files, check.seconds))
+                if not is_compiled(read_install_info(self.target_dir)):
+                    update_install_info(self.target_dir, bytecode=self.precompile_installation())
+            else:
+                steps = None
+                if check.mismatch is None and store is not None:
+                    self.log_output(f"{self.t('install_repairing')} {check.describe()}")
+                    try:
+                        steps = self.repair_installation(store, check, PY_VER)
+                    except RuntimeError as e:
+                        self.log_output(f"{self.t('install_repair_failed')} {e}")
+                if steps is None:
+                    self.log_output(f"{self.t('install_full')} {check.describe()}")
+                    self.clean_pytorch_installation()
+                    steps = list(self.STEP_PACKAGES)
+                self.install_steps(store, steps, url, PY_VER)
+                if request["slim"] and not self.slim_installation(request["packages"]):
+                    request["slim"] = False
+                self.dedupe_runtime()
+                bytecode = self.precompile_installation()
+
+            # キャッシュ上限を超えた古いwheelを削除 / Evict old wheels beyond the cache size cap
+            if store is not None:
+                in_use = set(store.mark_installed(self.target_dir))
+                for folder in installed_runtimes().values():
+                    in_use.update(store.installed_wheels(folder))   # 他のランタイムの修復用 / For repairs of the other runtime
+                removed, _ = store.prune(keep=in_use)
+                stats = store.stats()
+                self.log_output(self.t("wheel_cache_stats").format(stats["wheels"], stats["bytes"] / 1024 ** 3, removed))
+
+            # インストール情報の書き込み / Write installation info
+            if not check.ok:
+                write_install_info(self.target_dir, request, bytecode=bytecode)
+            self.activate_runtime()
 
             self.update_status(self.t("download_complete"), self.colors['success'])
             self.root.after(0, lambda: self.verify_btn.config(state=tk.NORMAL))
@@ -1006,8 +1503,134 @@ class PyTorchDownloader:
         finally:
             self.is_downloading = False
             self.root.after(0, lambda: self.download_btn.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.set_variant_radios(True))
             self.root.after(0, lambda: self.progress_bar.stop())
 
+    def _start_task(self, task, *args, failed_key="bundle_failed"):
+        """
+        ダウンロードと同様にバックグラウンドで処理を実行 / Run a task in the background like the download
+        """
+        self.is_downloading = True
+        self.download_btn.config(state=tk.DISABLED)
+        self.set_variant_radios(False)
+        self.export_btn.config(state=tk.DISABLED)
+        self.import_btn.config(state=tk.DISABLED)
+        self.progress_bar.start()
+        self.output_text.delete(1.0, tk.END)
+
+        def run():
+            try:
+                task(*args)
+            except Exception as e:
+                self.log_output(f"{self.t('error')}: {e}")
+                self.update_status(self.t(failed_key), self.colors['danger'])
+                self.root.after(0, lambda err=str(e): messagebox.showerror(self.t(failed_key), err))
+            finally:
+                self.is_downloading = False
+                self.root.after(0, lambda: self.download_btn.config(state=tk.NORMAL))
+                self.root.after(0, lambda: self.set_variant_radios(True))
+                self.root.after(0, lambda: self.export_btn.config(state=tk.NORMAL))
+                self.root.after(0, lambda: self.import_btn.config(state=tk.NORMAL))
+                self.root.after(0, lambda: self.progress_bar.stop())
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def start_fetch_model(self):
+        """
+        選択したWhisperモデルの事前ダウンロードを開始 / Start prefetching the selected Whisper model
+        """
+        if self.is_downloading:
+            messagebox.showwarning(self.t("warning"), self.t("already_downloading"))
+            return
+        self._start_task(self.fetch_whisper_model, self.model_var.get(), failed_key="model_fetch_failed")
+
+    def fetch_whisper_model(self, name):
+        """
+        HTTP Rangeで並列ダウンロードし、SHA-256を検証（中断しても再開可能）
+        Download in parallel HTTP ranges and verify the SHA-256 (resumes after interruptions)
+        """
+        self.log_output(f"{self.t('fetch_model')} {name} -> {model_path(name)}")
+        t0 = time.perf_counter()
+        path = fetch_model(name, progress=lambda done, total: self.update_status(
+            self.t("model_fetch_progress").format(name, done / 1024 ** 2, total / 1024 ** 2), self.colors['accent']))
+        message = self.t("model_fetched").format(name, path, time.perf_counter() - t0)
+        self.log_output(message)
+        self.update_status(message, self.colors['success'])
+
+    def start_export_bundle(self):
+        """
+        オフラインバンドルの書き出しを開始 / Start exporting an offline bundle
+        """
+        if self.is_downloading:
+            messagebox.showwarning(self.t("warning"), self.t("already_downloading"))
+            return
+        out = filedialog.asksaveasfilename(
+            defaultextension=".zip",
+            initialfile=f"whisper-offline-{self.version_var.get()}-{self.platform_tag}.zip",
+            filetypes=[("Offline bundle", "*.zip")]
+        )
+        if not out:
+            return
+        models = filedialog.askopenfilenames(
+            title=self.t("bundle_choose_models"),
+            initialdir=str(MODEL_DIR) if MODEL_DIR.exists() else None,
+            filetypes=[("Whisper model", "*.pt")]
+        )
+        self._start_task(self.export_offline_bundle, out, list(models))
+
+    def export_offline_bundle(self, out, models):
+        """
+        インストール済みのwheel・同梱wheel・モデルを1つのバンドルに書き出す
+        Write the installed wheels, the embedded wheel and the models into one bundle
+        """
+        self.update_status(self.t("export_bundle"), self.colors['accent'])
+        embedded = self._find_embedded_whisper_wheel()
+        export_bundle(out, self.target_dir, models, [embedded] if embedded else [], log=self.log_output)
+        self.log_output(self.t("bundle_exported").format(out))
+        self.update_status(self.t("download_complete"), self.colors['success'])
+        self.root.after(0, lambda: messagebox.showinfo(self.t("complete"), self.t("bundle_exported").format(out)))
+
+    def start_import_bundle(self):
+        """
+        オフラインバンドルの読み込みを開始 / Start importing an offline bundle
+        """
+        if self.is_downloading:
+            messagebox.showwarning(self.t("warning"), self.t("already_downloading"))
+            return
+        bundle = filedialog.askopenfilename(filetypes=[("Offline bundle", "*.zip")])
+        if not bundle:
+            return
+        try:
+            variant = read_manifest(bundle).get("variant")
+            if variant not in VARIANTS:
+                raise BundleError(f"unknown runtime variant {variant!r}")
+        except BundleError as e:
+            messagebox.showerror(self.t("bundle_failed"), str(e))
+            return
+        # バンドルのバリアントのランタイムに読み込む / Import into the runtime of the bundle's variant
+        self.version_var.set(variant)
+        self.on_variant_changed()
+        if not messagebox.askyesno(self.t("confirm"),
+                                   self.t("bundle_import_confirm").format(Path(bundle).name, self.target_dir)):
+            return
+        self._start_task(self.import_offline_bundle, bundle)
+
+    def import_offline_bundle(self, bundle):
+        """
+        バンドルを検証してネットワークなしでそのバリアントのランタイムにインストール
+        Verify the bundle and install it into the runtime of its variant without any network access
+        """
+        self.update_status(self.t("import_bundle"), self.colors['accent'])
+        manifest = import_bundle(bundle, self._run_pip, self.target_dir, self.platform_tag,
+                                 log=self.log_output, before_install=self.clean_pytorch_installation,
+                                 after_install=self.dedupe_runtime)
+        self.log_output(self.t("bundle_imported").format(f"{Path(bundle).name} ({manifest.get('variant')})"))
+        self.activate_runtime()
+        self.update_status(self.t("download_complete"), self.colors['success'])
+        self.root.after(0, lambda: self.verify_btn.config(state=tk.NORMAL))
+        self.root.after(0, lambda: messagebox.showinfo(self.t("complete"),
+                                                       self.t("bundle_imported").format(Path(bundle).name)))
+
     def _find_embedded_whisper_wheel(self) -> Path | None:
         """
         exe版に同梱されているopenai_whisperのwheelファイルを探す / 
@@ -1021,30 +1644,39 @@ class PyTorchDownloader:
 
     def verify_installation(self):
         """
-        ダウンロードされたPyTorch/Whisperが正常にimport可能か検証
-        Verify that downloaded PyTorch/Whisper can be imported successfully
+        別プロセスでPyTorch/Whisperのimportと小さな推論を実行して検証
+        Verify PyTorch/Whisper by importing them and running a tiny forward pass in a fresh process
         """
+        if self.is_downloading:
+            messagebox.showwarning(self.t("warning"), self.t("already_downloading"))
+            return
         self.log_output(self.t("verify_start"))
         self.update_status(self.t("verifying"), self.colors['accent'])
+        self.verify_btn.config(state=tk.DISABLED)
+        self.progress_bar.start()
+        threading.Thread(target=self._verify_worker, daemon=True).start()
 
+    def _verify_worker(self):
+        """
+        検証処理本体（バックグラウンドスレッド） / The verification itself (background thread)
+        """
         try:
-            # ─── 新: 既に import 済みなら再ロードをスキップ ───
-            if 'torch' in sys.modules:
-                torch = sys.modules['torch']
-                self.log_output(f"Torch already imported: {torch.__version__}, CUDA: {torch.cuda.is_available()}")
-            else:
-                # パスを一時的に挿入 / Temporarily modify sys.path
-                orig = sys.path.copy()
-                sys.path.insert(0, str(self.target_dir.absolute()))
-                import torch
-                self.log_output(f"Torch {torch.__version__}, CUDA: {torch.cuda.is_available()}")
-                sys.path = orig
-
-            # Whisper モジュールの動作チェック
+            # 既にimport済みのtorchに影響されないよう新しいプロセスで実行 / A fresh process, so no torch already imported here can hide problems
+            report = verify_runtime(self.target_dir)
+            for line in format_report(report):
+                self.log_output(line)
+            if not report.get("ok"):
+                self.log_output(f"{self.t('import_error')} {report.get('error')}")
+                self.update_status(self.t("verify_failed"), self.colors['danger'])
+                self.root.after(0, lambda: messagebox.showerror(
+                    self.t("verify_failed"),
+                    self.t("verify_failed_msg").format(report.get("error"))
+                ))
+                return
             self.log_output("Whisper OK")
 
             # インストール情報の出力
-            info_file = self.target_dir / "pytorch_whisper_installed.json"
+            info_file = self.target_dir / INSTALL_INFO_NAME
             if info_file.exists():
                 info = json.load(open(info_file, "r"))
                 self.log_output(f"Installed version: {info.get('version')} @ {info.get('time')}")
@@ -1054,33 +1686,29 @@ class PyTorchDownloader:
             if not self.check_ffmpeg_available():
                 self.log_output("ffmpeg not found")
                 self.update_status(self.t("verify_failed"), self.colors['danger'])
-                messagebox.showerror(
+                self.root.after(0, lambda: messagebox.showerror(
                     self.t("ffmpeg_not_found"),
                     self.t("ffmpeg_install_cmd")
-                )
+                ))
                 return
 
             self.log_output("ffmpeg OK")
             self.update_status(self.t("verify_success"), self.colors['success'])
-            messagebox.showinfo(
+            self.root.after(0, lambda: messagebox.showinfo(
                 self.t("verify_success"),
                 self.t("verify_success_msg")
-            )
+            ))
 
-        except ImportError as e:
-            self.log_output(f"{self.t('import_error')} {e}")
-            self.update_status(self.t("verify_failed"), self.colors['danger'])
-            messagebox.showerror(
-                self.t("verify_failed"),
-                self.t("verify_failed_msg").format(str(e))
-            )
         except Exception as e:
             self.log_output(f"{self.t('error')}: {e}")
             self.update_status(self.t("verify_failed"), self.colors['danger'])
-            messagebox.showerror(
+            self.root.after(0, lambda err=str(e): messagebox.showerror(
                 self.t("error"),
-                str(e)
-            )
+                err
+            ))
+        finally:
+            self.root.after(0, lambda: self.verify_btn.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.progress_bar.stop())
 
     def on_closing(self):
         """
@@ -1111,5 +1739,10 @@ class PyTorchDownloader:
             return False
 
 if __name__ == "__main__":
+    # exe版でのコンパイル用ワーカープロセス / Worker processes of the bytecode compile in the exe build
+    multiprocessing.freeze_support()
+    # exe版の検証用子プロセス / Child process of the verification in the exe build
+    if len(sys.argv) > 1 and sys.argv[1] == CHILD_FLAG:
+        sys.exit(runtime_check_main(sys.argv[2:]))
     app = PyTorchDownloader()
     app.run()
\ No newline at end of file
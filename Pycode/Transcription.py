@@ -1,20 +1,50 @@
+import sys
+import multiprocessing
+
+# Frozen executables re-enter here in worker processes (--shared-weights)
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+# Headless modes must not import tkinter (render nodes and servers have no display).
+# Each runs as __main__ the way `python -m <module>` would, so the worker processes
+# they spawn re-import that module instead of this GUI file.
+HEADLESS_MODES = {
+    "--batch": "transcription_cli",
+    "--watch": "watch_folder",
+    "--serve": "http_api",
+    "--benchmark": "benchmark",
+    "--evaluate": "evaluation",
+}
+if __name__ == "__main__":
+    for flag, module in HEADLESS_MODES.items():
+        if flag in sys.argv[1:]:
+            import runpy
+            runpy.run_module(module, run_name="__main__", alter_sys=True)
+            sys.exit(0)
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
+import contextlib
 import os
 import threading
 import time
-import json
 from datetime import datetime, timedelta
 from pathlib import Path
-import sys
 import io
 import re
 import queue
 import subprocess
 import platform
 
+import transcription_core as core
+from job_profiler import PROFILE_MODES, JobProfile
+from memory_budget import MemoryTracker, plan_memory
+from result_cache import ResultCache
+from segment_store import SegmentStore
+from stage_timing import StageTimer
+from transcript_index import TranscriptIndex, format_ms
+
 # Dynamic library loading configuration
-PYTORCH_DIR = Path("pytorch_libs")
 WHISPER_AVAILABLE = False
 whisper = None
 torch = None
@@ -23,32 +53,9 @@ def setup_pytorch_path():
     """Setup PyTorch library path for dynamic loading"""
     global WHISPER_AVAILABLE, whisper, torch
     
-    if getattr(sys, 'frozen', False):
-        base_path = Path(sys.executable).parent
-    else:
-        base_path = Path(__file__).parent
-    
-    PYTORCH_DIR = base_path / "pytorch_libs"
-    
-    if PYTORCH_DIR.exists():
-        pytorch_path = str(PYTORCH_DIR.absolute())
-        if pytorch_path not in sys.path:
-            sys.path.insert(0, pytorch_path)
-        
-        try:
-            import torch as torch_module
-            import whisper as whisper_module
-            torch = torch_module
-            whisper = whisper_module
-            WHISPER_AVAILABLE = True
-            print(f"Successfully loaded PyTorch from: {pytorch_path}")
-            return True
-        except ImportError as e:
-            print(f"Failed to import PyTorch/Whisper: {e}")
-            return False
-    else:
-        print(f"PyTorch directory not found at: {PYTORCH_DIR}")
-    return False
+    ok = core.setup_pytorch_path()
+    WHISPER_AVAILABLE, whisper, torch = core.WHISPER_AVAILABLE, core.whisper, core.torch
+    return ok
 
 class ProgressCapture(io.StringIO):
     """Custom StringIO class to capture and parse Whisper progress output"""
@@ -124,7 +131,7 @@ class AudioSubtitleSystem:
     def __init__(self):
         # State management
         self.current_file = None
-        self.transcription_results = []
+        self.transcription_results = SegmentStore()
         self.whisper_model = None
         self.device = "cuda"
         self.audio_duration = 0
@@ -132,11 +139,15 @@ class AudioSubtitleSystem:
         self.is_transcribing = False
         self.is_downloading = False
         self.is_loading_model = False
+        self.model_download_status = None
         self.update_timer = None
         self.original_stderr = None
         self.message_queue = queue.Queue()
         self.status_queue = queue.Queue()
         self.current_language = "en"  # Default language
+        self.transcript_index = None
+        self.result_cache = None
+        self.profile_mode = "off"
         
         # Initialize translations
         self.init_translations()
@@ -236,13 +247,33 @@ class AudioSubtitleSystem:
                 "subtitle_saved": "Subtitle file saved:",
                 "save_error": "Save error:",
                 "no_subtitles": "No subtitles to save",
+                "subtitles_resegmented": "Subtitles re-segmented: {} → {} cues",
+                "search_transcripts": "🔍 Search Transcripts",
+                "search": "Search",
+                "index_folder": "📂 Index Folder",
+                "search_hits": "{} hits",
+                "indexing_folder": "Indexing {} ...",
+                "index_done": "Index updated: {} indexed, {} unchanged, {} removed",
+                "index_error": "Index error:",
+                "col_time": "Time",
+                "col_source": "Source",
+                "col_text": "Text",
                 "file_selected": "Audio file selected: {} (Estimated time: {})",
                 "file_selected_no_duration": "Audio file selected: {} (Whisper not installed, cannot get duration)",
                 "model_not_found": "Model '{}' not found. Checking download...",
                 "confirming_download": "Confirming model download: {}",
                 "unable_to_get_duration": "Unable to get audio duration:",
                 "downloading": "Downloading model '{}' (Size: {})",
+                "model_download_progress": "Downloading model {}: {:.0f} / {:.0f} MB",
                 "loading": "Loading model '{}'...",
+                "word_alignment_cost": "Word timestamps: alignment took {} ({:.1f}% of transcription time, {} words)",
+                "stage_timings": "Stage times:",
+                "served_from_cache": "Served from cache: identical audio was already transcribed with these settings ({} segments)",
+                "cache_error": "Result cache unavailable:",
+                "memory_plan": "Memory:",
+                "memory_usage": "Memory per stage:",
+                "profile_saved": "Profile saved:",
+                "memory_over_budget": "This file probably needs more memory than is free ({}).\n\nTranscribe anyway?",
                 "language_codes": {
                     "ja": "Japanese",
                     "en": "English", 
@@ -315,13 +346,33 @@ class AudioSubtitleSystem:
                 "subtitle_saved": "字幕ファイルが保存されました:",
                 "save_error": "保存エラーが発生しました:",
                 "no_subtitles": "保存する字幕がありません",
+                "subtitles_resegmented": "字幕を再分割しました: {} → {} キュー",
+                "search_transcripts": "🔍 転写結果を検索",
+                "search": "検索",
+                "index_folder": "📂 フォルダを索引",
+                "search_hits": "{} 件ヒット",
+                "indexing_folder": "{} を索引中...",
+                "index_done": "索引を更新しました: 追加 {}、変更なし {}、削除 {}",
+                "index_error": "索引エラー:",
+                "col_time": "時間",
+                "col_source": "ファイル",
+                "col_text": "テキスト",
                 "file_selected": "音声ファイルが選択されました: {} (推定時間: {})",
                 "file_selected_no_duration": "音声ファイルが選択されました: {} (Whisperがインストールされていないため長さ取得不可)",
                 "model_not_found": "モデル'{}'が見つかりません。ダウンロード確認中...",
                 "confirming_download": "モデルダウンロードを確認中: {}",
                 "unable_to_get_duration": "音声長を取得できません:",
                 "downloading": "モデル'{}'をダウンロードしています... (サイズ: {})",
+                "model_download_progress": "モデル{}をダウンロード中: {:.0f} / {:.0f} MB",
                 "loading": "モデル'{}'を読み込み中...",
+                "word_alignment_cost": "単語タイムスタンプ: アライメント所要時間 {} (転写時間の{:.1f}%、{}語)",
+                "stage_timings": "処理段階ごとの時間:",
+                "served_from_cache": "キャッシュから取得: 同じ音声が同じ設定で転写済みです（{}セグメント）",
+                "cache_error": "結果キャッシュを利用できません:",
+                "memory_plan": "メモリ:",
+                "memory_usage": "処理段階ごとのメモリ:",
+                "profile_saved": "プロファイルを保存しました:",
+                "memory_over_budget": "このファイルには空きメモリ以上のメモリが必要な可能性があります（{}）。\n\nそれでも転写しますか？",
                 "language_codes": {
                     "ja": "日本語",
                     "en": "英語",
@@ -394,13 +445,33 @@ class AudioSubtitleSystem:
                 "subtitle_saved": "字幕文件已保存:",
                 "save_error": "保存错误:",
                 "no_subtitles": "没有要保存的字幕",
+                "subtitles_resegmented": "字幕已重新分段：{} → {} 条",
+                "search_transcripts": "🔍 搜索转录结果",
+                "search": "搜索",
+                "index_folder": "📂 索引文件夹",
+                "search_hits": "共 {} 条结果",
+                "indexing_folder": "正在索引 {} ...",
+                "index_done": "索引已更新：新增 {}，未变化 {}，移除 {}",
+                "index_error": "索引错误:",
+                "col_time": "时间",
+                "col_source": "来源",
+                "col_text": "文本",
                 "file_selected": "已选择音频文件: {} (预计时间: {})",
                 "file_selected_no_duration": "已选择音频文件: {} (Whisper 未安装，无法获取时长)",
                 "model_not_found": "未找到模型 '{}'。正在检查下载...",
                 "confirming_download": "确认模型下载: {}",
                 "unable_to_get_duration": "无法获取音频时长:",
                 "downloading": "正在下载模型 '{}' (大小: {})",
+                "model_download_progress": "正在下载模型 {}：{:.0f} / {:.0f} MB",
                 "loading": "正在加载模型 '{}'...",
+                "word_alignment_cost": "词级时间戳：对齐耗时 {}（占转录时间的 {:.1f}%，共 {} 个词）",
+                "stage_timings": "各阶段耗时：",
+                "served_from_cache": "已从缓存提供：相同音频已用相同设置转录过（{} 个片段）",
+                "cache_error": "结果缓存不可用：",
+                "memory_plan": "内存：",
+                "memory_usage": "各阶段内存：",
+                "profile_saved": "性能分析结果已保存：",
+                "memory_over_budget": "此文件所需内存可能超过当前可用内存（{}）。\n\n仍要转录吗？",
                 "language_codes": {
                     "ja": "日语",
                     "en": "英语",
@@ -473,13 +544,33 @@ class AudioSubtitleSystem:
                 "subtitle_saved": "자막 파일 저장됨:",
                 "save_error": "저장 오류:",
                 "no_subtitles": "저장할 자막이 없습니다",
+                "subtitles_resegmented": "자막 재분할: {} → {}개 큐",
+                "search_transcripts": "🔍 전사 결과 검색",
+                "search": "검색",
+                "index_folder": "📂 폴더 색인",
+                "search_hits": "{}건 검색됨",
+                "indexing_folder": "{} 색인 중...",
+                "index_done": "색인 업데이트: 추가 {}, 변경 없음 {}, 제거 {}",
+                "index_error": "색인 오류:",
+                "col_time": "시간",
+                "col_source": "파일",
+                "col_text": "텍스트",
                 "file_selected": "오디오 파일 선택됨: {} (예상 시간: {})",
                 "file_selected_no_duration": "오디오 파일 선택됨: {} (Whisper가 설치되지 않아 길이를 가져올 수 없음)",
                 "model_not_found": "'{}' 모델을 찾을 수 없습니다. 다운로드 확인 중...",
                 "confirming_download": "모델 다운로드 확인 중: {}",
                 "unable_to_get_duration": "오디오 길이를 가져올 수 없습니다:",
                 "downloading": "'{}' 모델 다운로드 중... (크기: {})",
+                "model_download_progress": "{} 모델 다운로드 중: {:.0f} / {:.0f} MB",
                 "loading": "'{}' 모델 로드 중...",
+                "word_alignment_cost": "단어 타임스탬프: 정렬 소요 시간 {} (전사 시간의 {:.1f}%, {}개 단어)",
+                "stage_timings": "단계별 소요 시간:",
+                "served_from_cache": "캐시에서 제공: 동일한 오디오가 같은 설정으로 이미 전사되었습니다 ({}개 세그먼트)",
+                "cache_error": "결과 캐시를 사용할 수 없습니다:",
+                "memory_plan": "메모리:",
+                "memory_usage": "단계별 메모리:",
+                "profile_saved": "프로파일 저장됨:",
+                "memory_over_budget": "이 파일은 사용 가능한 메모리보다 많은 메모리가 필요할 수 있습니다 ({}).\n\n그래도 전사하시겠습니까?",
                 "language_codes": {
                     "ja": "일본어",
                     "en": "영어",
@@ -505,10 +596,10 @@ class AudioSubtitleSystem:
         if not setup_pytorch_path():
             WHISPER_AVAILABLE = False
         else:
-            if torch and torch.cuda.is_available():
-                self.device = "cuda"
-            else:
-                self.device = "cpu"
+            self.device = core.default_device()
+            # fp16 as measured by check_in_exe; the parameter dialog keeps it
+            if core.MACHINE_DEFAULTS.get("fp16") and self.device == "cuda":
+                self.whisper_params = {"fp16": True}
 
     def calculate_adaptive_scaling(self):
         """Calculate adaptive scaling factors based on screen resolution"""
@@ -977,8 +1068,8 @@ class AudioSubtitleSystem:
         )
         self.model_section_label.pack(anchor=tk.W, pady=(0, self.scaled_dimensions['padding_small'] // 2))
         
-        self.model_var = tk.StringVar(value="large-v3")
-        opts = ["tiny","base","small","medium","large","large-v2","large-v3","large-v3-turbo"]
+        self.model_var = tk.StringVar(value=core.MACHINE_DEFAULTS.get("model", "large-v3"))
+        opts = core.MODEL_NAMES
         self.model_combo = ttk.Combobox(
             inner,
             textvariable=self.model_var,
@@ -1181,6 +1272,14 @@ class AudioSubtitleSystem:
             state=tk.DISABLED
         )
         self.save_subtitle_btn.pack(side=tk.LEFT)
+        
+        self.search_btn = ttk.Button(
+            tf,
+            text=self.t("search_transcripts"),
+            command=self.open_search_window,
+            style='Primary.TButton'
+        )
+        self.search_btn.pack(side=tk.LEFT, padx=(self.scaled_dimensions['padding_medium'], 0))
 
     def open_parameter_window(self):
         """Open parameter settings window with adaptive layout"""
@@ -1189,7 +1288,7 @@ class AudioSubtitleSystem:
         
         # Calculate adaptive window size
         param_width = int(600 * self.scale)
-        param_height = int(550 * self.scale)
+        param_height = int(720 * self.scale)
         
         # Ensure it fits on screen
         screen_width = win.winfo_screenwidth()
@@ -1265,6 +1364,33 @@ class AudioSubtitleSystem:
                        fg=self.colors['text'],
                        font=('Yu Gothic', self.scaled_fonts['normal'])).pack(anchor=tk.W, padx=pad, pady=(pad,0))
 
+        # word_timestamps
+        self.word_ts_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(win,
+                       text="word_timestamps",
+                       variable=self.word_ts_var,
+                       bg=self.colors['surface'],
+                       fg=self.colors['text'],
+                       font=('Yu Gothic', self.scaled_fonts['normal'])).pack(anchor=tk.W, padx=pad, pady=(pad,0))
+
+        # resegment_subtitles
+        self.reseg_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(win,
+                       text="resegment_subtitles",
+                       variable=self.reseg_var,
+                       bg=self.colors['surface'],
+                       fg=self.colors['text'],
+                       font=('Yu Gothic', self.scaled_fonts['normal'])).pack(anchor=tk.W, padx=pad, pady=(pad,0))
+
+        # profile (saved next to the audio file)
+        tk.Label(win, text="profile:",
+                 bg=self.colors['surface'],
+                 fg=self.colors['text'],
+                 font=('Yu Gothic', self.scaled_fonts['normal'])).pack(anchor=tk.W, padx=pad, pady=(pad,0))
+        self.profile_var = tk.StringVar(value=self.profile_mode)
+        ttk.Combobox(win, textvariable=self.profile_var, values=("off",) + PROFILE_MODES, state="readonly",
+                     font=('Yu Gothic', self.scaled_fonts['normal'])).pack(fill=tk.X, padx=pad)
+
         # OK button
         def apply_params():
             self.whisper_params = {
@@ -1274,7 +1400,11 @@ class AudioSubtitleSystem:
                 "logprob_threshold": self.logp_var.get(),
                 "no_speech_threshold": self.nospeech_var.get(),
                 "condition_on_previous_text": self.cond_prev_var.get(),
+                "word_timestamps": self.word_ts_var.get(),
+                "resegment_subtitles": self.reseg_var.get(),
+                "fp16": getattr(self, 'whisper_params', {}).get("fp16", core.DEFAULT_PARAMS["fp16"]),
             }
+            self.profile_mode = self.profile_var.get()
             win.destroy()
             self.append_status_message(f"{self.t('parameters_updated')} {self.whisper_params}")
 
@@ -1342,6 +1472,7 @@ class AudioSubtitleSystem:
         # Update save section
         self.save_transcription_btn.config(text=self.t("save_transcription"))
         self.save_subtitle_btn.config(text=self.t("save_subtitle"))
+        self.search_btn.config(text=self.t("search_transcripts"))
 
     def update_language_combo(self):
         """Update transcription language combo box with translated names"""
@@ -1459,16 +1590,15 @@ class AudioSubtitleSystem:
             return 0
             
         try:
-            audio = whisper.load_audio(file_path)
-            duration = audio.shape[0] / 16000.0
-            return duration
+            audio = core.load_audio(file_path)
+            return core.audio_duration(audio)
         except Exception as e:
             messagebox.showerror(self.t("error"), f"{self.t('unable_to_get_duration')} {e}")
             return 0
 
     def select_audio_file(self):
         ftypes = [
-            ("Audio files", "*.mp3 *.wav *.m4a *.aac *.ogg *.flac"), 
+            ("Audio files", " ".join(f"*{ext}" for ext in core.AUDIO_EXTENSIONS)), 
             ("All files", "*.*")
         ]
         fp = filedialog.askopenfilename(title="Select Audio File", filetypes=ftypes)
@@ -1487,24 +1617,14 @@ class AudioSubtitleSystem:
                 self.append_status_message(self.t("file_selected_no_duration").format(os.path.basename(fp)))
 
     def check_model_exists(self, ms):
-        cache_dir = Path.home()/".cache"/"whisper"
-        return (cache_dir/f"{ms}.pt").exists()
+        return core.check_model_exists(ms)
 
     def load_whisper_model(self, model_size):
         if not WHISPER_AVAILABLE:
             self.update_ui_safe(lambda: messagebox.showerror(self.t("error"), self.t("whisper_not_installed")))
             return None
             
-        model_sizes = {
-            "tiny":  "~75 MB",
-            "base":  "~142 MB",
-            "small": "~466 MB",
-            "medium":"~1.46 GB",
-            "large": "~2.96 GB",
-            "large-v2": "~2.96 GB",
-            "large-v3": "~3.09 GB",
-            "large-v3-turbo": "~1.6 GB"
-        }
+        model_sizes = core.MODEL_SIZES
         
         if not self.check_model_exists(model_size):
             self.update_status(self.t("confirming_download").format(model_size), self.colors['warning'])
@@ -1530,9 +1650,11 @@ class AudioSubtitleSystem:
             self.update_status(self.t("loading_model").format(model_size), self.colors['accent'])
             self.append_status_message(self.t("loading").format(model_size))
             
-            model = whisper.load_model(model_size, device=self.device)
+            model = core.load_model(model_size, self.device,
+                                    progress=lambda done, total: self.report_model_download(model_size, done, total))
             
             self.is_downloading = False
+            self.model_download_status = None
             self.is_loading_model = False
             
             device_info = "GPU (CUDA)" if self.device == "cuda" else "CPU"
@@ -1542,6 +1664,7 @@ class AudioSubtitleSystem:
         except Exception as e:
             self.is_downloading = False
             self.is_loading_model = False
+            self.model_download_status = None
             err_msg = str(e)
             self.update_status(self.t("model_loading_error"), self.colors['danger'])
             self.append_status_message(f"{self.t('model_loading_error')}: {err_msg}")
@@ -1550,6 +1673,11 @@ class AudioSubtitleSystem:
             )
             return None
 
+    def report_model_download(self, model_size, done, total):
+        """Download progress from model_fetcher's threads; shown by update_elapsed_time"""
+        self.model_download_status = self.t("model_download_progress").format(
+            model_size, done / 1024 ** 2, total / 1024 ** 2)
+
     def process_message_queue(self):
         """Process messages from background threads"""
         try:
@@ -1598,7 +1726,7 @@ class AudioSubtitleSystem:
             self.elapsed_label.config(text=f"{self.t('elapsed')} {elapsed_str}")
             
             if self.is_downloading:
-                status_text = f"{self.t('downloading_model').split(':')[0]}..."
+                status_text = self.model_download_status or f"{self.t('downloading_model').split(':')[0]}..."
             elif self.is_loading_model:
                 status_text = f"{self.t('loading_model').split(':')[0]}..."
             else:
@@ -1619,6 +1747,10 @@ class AudioSubtitleSystem:
         if not WHISPER_AVAILABLE:
             messagebox.showerror(self.t("error"), self.t("whisper_not_installed"))
             return
+
+        plan = self.plan_transcription_memory(self.model_combo.get())
+        if plan is False:
+            return
             
         def task():
             self.update_ui_safe(lambda: self.transcribe_btn.config(state=tk.DISABLED))
@@ -1642,7 +1774,15 @@ class AudioSubtitleSystem:
                 lang = None
 
             ms = self.model_combo.get()
-            self.whisper_model = self.load_whisper_model(ms)
+            kw = self.topic_entry.get().strip()
+            params = getattr(self, 'whisper_params', {})
+            chunk_seconds = plan.chunk_seconds if plan else core.CHUNK_SECONDS
+            cache_entry = self.lookup_cached_result(ms, lang, kw, params, chunk_seconds)
+            if cache_entry is True:
+                return
+            memory = MemoryTracker()
+            with memory.stage("model_load"):
+                self.whisper_model = self.load_whisper_model(ms)
             if not self.whisper_model:
                 self.is_transcribing = False
                 self.is_downloading = False
@@ -1655,81 +1795,42 @@ class AudioSubtitleSystem:
                 self.update_status(self.t("model_loading_failed").split(':')[0], self.colors['danger'])
                 return
 
-            kw = self.topic_entry.get().strip()
-            prompt = None
-            if kw and lang:
-                lang_prompts = {
-                    'ja': f"この音声は『{kw}』に関連しています。",
-                    'en': f"The following audio is related to '{kw}'.",
-                    'zh': f"以下音频与'{kw}'相关。",
-                    'ko': f"다음 오디오는 '{kw}'와 관련이 있습니다."
-                }
-                prompt = lang_prompts.get(lang, lang_prompts['en'])
+            prompt = core.build_prompt(kw, lang)
 
             try:
                 self.append_status_message(self.t("starting_transcription"))
                 self.update_status(f"{self.t('transcription_completed').split()[0]}...", self.colors['accent'])
                 
-                self.transcription_results = []
+                self.transcription_results = SegmentStore()
                 
-                capture = ProgressCapture(
-                    self.handle_progress_update,
-                    self.handle_segment_progress,
-                    self.append_transcription_text)
-                orig_stdout, orig_stderr = sys.stdout, sys.stderr
-                sys.stdout = sys.stderr = capture
+                def chunk_capture(offset):
+                    return ProgressCapture(
+                        self.handle_progress_update,
+                        self.handle_segment_progress,
+                        lambda st, et, tx, off=offset: self.append_transcription_text_with_offset(st, et, tx, off)
+                    )
+                
+                if plan and plan.adjusted:
+                    self.append_status_message(f"{self.t('memory_plan')} {plan.describe()}")
+                profile = contextlib.nullcontext()
+                if self.profile_mode in PROFILE_MODES:
+                    profile = JobProfile(self.profile_mode, os.path.splitext(self.current_file)[0])
                 try:
-                    audio = whisper.load_audio(self.current_file)
-                    sr = 16000
-                    chunk_size = 30 * 60 * sr
-                    
-                    segments_data = [
-                        audio[i : i + chunk_size]
-                        for i in range(0, audio.shape[0], chunk_size)
-                    ]
-                    
-                    self.transcription_results = []
-                    offset = 0.0
-                    
-                    for seg_index, seg_audio in enumerate(segments_data):
-                        offset = seg_index * (chunk_size / sr)
-                    
-                        capture = ProgressCapture(
-                            self.handle_progress_update,
-                            self.handle_segment_progress,
-                            lambda st, et, tx, off=offset: self.append_transcription_text_with_offset(st, et, tx, off)
-                        )
-                        orig_stdout, orig_stderr = sys.stdout, sys.stderr
-                        sys.stdout = sys.stderr = capture
-                    
-                        params = getattr(self, 'whisper_params', {})
-                        result_seg = self.whisper_model.transcribe(
-                            seg_audio,
+                    with profile:
+                        self.transcription_results, duration, timer = core.transcribe_path(
+                            self.whisper_model, self.current_file,
                             language=lang,
-                            task="transcribe",
-                            initial_prompt=prompt,
-                            verbose=True,
-                            temperature=params.get("temperature", 0.0),
-                            best_of=params.get("best_of", 10),
-                            beam_size=params.get("beam_size", 10),
-                            logprob_threshold=params.get("logprob_threshold", -1),
-                            no_speech_threshold=params.get("no_speech_threshold", 0.5),
-                            condition_on_previous_text=params.get("condition_on_previous_text", False),
-                            fp16=params.get("fp16", False)
+                            prompt=prompt,
+                            params=params,
+                            chunk_seconds=chunk_seconds,
+                            progress_stream=chunk_capture,
+                            timer=StageTimer(),
+                            memory=memory,
+                            streaming=plan.streaming if plan else False
                         )
-                        sys.stdout, sys.stderr = orig_stdout, orig_stderr
-                    
-                        for seg in result_seg["segments"]:
-                            self.transcription_results.append({
-                                "start": seg["start"] + offset,
-                                "end":   seg["end"]   + offset,
-                                "text":  seg["text"].strip()
-                            })
-
-                        offset += seg_audio.shape[0] / sr
-                    
                 finally:
-                    sys.stdout, sys.stderr = orig_stdout, orig_stderr
+                    if getattr(profile, "paths", None):
+                        self.append_status_message(f"{self.t('profile_saved')} {', '.join(profile.paths)}")
                 
                 self.update_ui_safe(lambda: self.progress_bar.stop())
                 
@@ -1739,6 +1840,23 @@ class AudioSubtitleSystem:
                     self.update_ui_safe(lambda: self.elapsed_label.config(text=f"{self.t('elapsed')} {elapsed_str}"))
                 
                 self.append_status_message(self.t("transcription_complete").format(len(self.transcription_results), elapsed_str))
+                self.stage_timer = timer
+                self.append_status_message(f"{self.t('stage_timings')} {timer.summary_line()}")
+                self.append_status_message(f"{self.t('memory_usage')} {memory.summary_line()}")
+                if params.get("word_timestamps", False):
+                    align_seconds = timer.seconds["align"]
+                    share = 100.0 * align_seconds / total_time if total_time > 0 else 0.0
+                    align_str = f"{align_seconds:.1f}s"
+                    n_words = len(self.transcription_results.words) if self.transcription_results.words else 0
+                    self.append_status_message(self.t("word_alignment_cost").format(align_str, share, n_words))
+                
+                self.index_current_results()
+                if cache_entry:
+                    try:
+                        self.result_cache.put(cache_entry[1], cache_entry[0], self.transcription_results,
+                                              ms, lang, duration)
+                    except Exception as e:
+                        self.append_status_message(f"{self.t('cache_error')} {e}")
                 
                 self.update_status(self.t("transcription_completed"), self.colors['success'])
                 self.update_ui_safe(lambda: self.transcribe_btn.config(state=tk.NORMAL))
@@ -1783,37 +1901,183 @@ class AudioSubtitleSystem:
             return
             
         try:
+            meta = core.build_metadata(
+                self.current_file,
+                self.topic_entry.get().strip(),
+                self.transcription_language_combo.get(),
+                self.model_combo.get(),
+                self.device,
+                self.transcription_results,
+                getattr(self, 'stage_timer', None)
+            )
             if fp.endswith('.json'):
-                data = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "source_file": os.path.basename(self.current_file),
-                    "keyword": self.topic_entry.get().strip(),
-                    "language": self.transcription_language_combo.get(),
-                    "model": self.model_combo.get(),
-                    "device": self.device,
-                    "transcription": self.transcription_results
-                }
-                with open(fp, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
+                core.write_json(fp, self.transcription_results, meta)
+                index = self.get_transcript_index()
+                if index:
+                    # The saved JSON supersedes the entry recorded when the job finished
+                    def reindex_saved(path=fp, job_key=os.path.abspath(self.current_file)):
+                        index.remove(job_key)
+                        index.index_file(path)
+                    index.index_async(reindex_saved)
             else:
-                with open(fp, 'w', encoding='utf-8') as f:
-                    f.write(f"Transcription of: {os.path.basename(self.current_file)}\n")
-                    f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Language: {self.transcription_language_combo.get()}\n")
-                    f.write(f"Model: {self.model_combo.get()}\n")
-                    f.write("-" * 50 + "\n\n")
-                    
-                    for seg in self.transcription_results:
-                        start_time = str(timedelta(seconds=int(seg['start'])))
-                        end_time = str(timedelta(seconds=int(seg['end'])))
-                        f.write(f"[{start_time} --> {end_time}]\n")
-                        f.write(f"{seg['text']}\n\n")
+                core.write_txt(fp, self.transcription_results, meta)
                         
             self.append_status_message(f"{self.t('results_saved')} {os.path.basename(fp)}")
             messagebox.showinfo(self.t("success"), f"{self.t('results_saved')} {os.path.basename(fp)}")
         except Exception as e:
             messagebox.showerror(self.t("error"), f"{self.t('save_error')} {str(e)}")
 
+    def get_transcript_index(self):
+        """Open the transcript search index on first use; None if SQLite/FTS5 is unavailable"""
+        if self.transcript_index is None:
+            try:
+                self.transcript_index = TranscriptIndex(log=self.append_status_message)
+            except Exception as e:
+                self.append_status_message(f"{self.t('index_error')} {e}")
+                return None
+        return self.transcript_index
+
+    def get_result_cache(self):
+        """Open the result cache on first use; None if it cannot be opened"""
+        if self.result_cache is None:
+            try:
+                self.result_cache = ResultCache()
+            except Exception as e:
+                self.append_status_message(f"{self.t('cache_error')} {e}")
+                return None
+        return self.result_cache
+
+    def plan_transcription_memory(self, model_name):
+        """Pre-flight memory estimate for the current file against the memory free now.
+        Returns the plan (shorter chunks or streaming decode when needed), None when no
+        estimate is possible, or False when the user cancels a job that will not fit."""
+        try:
+            plan = plan_memory(model_name, getattr(self, 'audio_duration', None), core.CHUNK_SECONDS,
+                               "auto", self.device, enforce=False)
+        except Exception:
+            return None
+        if not plan.fits and not messagebox.askyesno(self.t("warning"),
+                                                     self.t("memory_over_budget").format(plan.describe())):
+            return False
+        return plan
+
+    def lookup_cached_result(self, model_name, lang, keyword, params, chunk_seconds):
+        """Show a cached transcript of the current file if there is one (returns True).
+        Otherwise returns the (content_hash, key) to store the new result under, or None.
+        chunk_seconds is the chunk length this run transcribes with (the memory plan may shorten it)."""
+        cache = self.get_result_cache()
+        if not cache:
+            return None
+        try:
+            content_hash, key = cache.key_for(self.current_file, model_name, lang, keyword,
+                                              params, chunk_seconds)
+            hit = cache.get(key)
+        except Exception as e:
+            self.append_status_message(f"{self.t('cache_error')} {e}")
+            return None
+        if hit is None:
+            return content_hash, key
+
+        self.transcription_results = hit[0]
+        self.stage_timer = None
+
+        def fmt(t):
+            m = int(t // 60)
+            return f"{m:02d}:{t - m * 60:06.3f}"
+        for seg in self.transcription_results:
+            self.append_transcription_text(fmt(seg.start), fmt(seg.end), seg.text)
+
+        self.is_transcribing = False
+        if self.update_timer:
+            self.root.after_cancel(self.update_timer)
+            self.update_timer = None
+        self.update_ui_safe(lambda: self.progress_bar.stop())
+        self.append_status_message(self.t("served_from_cache").format(len(self.transcription_results)))
+        self.index_current_results()
+        self.update_status(self.t("served_from_cache").split(':')[0].split('：')[0], self.colors['success'])
+        self.update_ui_safe(lambda: self.transcribe_btn.config(state=tk.NORMAL))
+        self.update_ui_safe(lambda: self.save_transcription_btn.config(state=tk.NORMAL))
+        self.update_ui_safe(lambda: self.save_subtitle_btn.config(state=tk.NORMAL))
+        return True
+
+    def index_current_results(self):
+        """Index the finished job in the background under its source audio path"""
+        index = self.get_transcript_index()
+        if not index or not self.transcription_results:
+            return
+        index.index_async(
+            index.index_segments,
+            os.path.abspath(self.current_file),
+            list(self.transcription_results),
+            source_file=os.path.basename(self.current_file),
+            model=self.model_combo.get(),
+            language=self.transcription_language_combo.get()
+        )
+
+    def open_search_window(self):
+        """Open the transcript search window"""
+        index = self.get_transcript_index()
+        if not index:
+            return
+        
+        win = tk.Toplevel(self.root)
+        win.title(self.t("search_transcripts"))
+        win.geometry(f"{int(900 * self.scale)}x{int(500 * self.scale)}")
+        win.configure(bg=self.colors['surface'])
+        pad = self.scaled_dimensions['padding_medium']
+        
+        bar = tk.Frame(win, bg=self.colors['surface'])
+        bar.pack(fill=tk.X, padx=pad, pady=pad)
+        
+        query_entry = ttk.Entry(bar, font=('Yu Gothic', self.scaled_fonts['normal']), style='Modern.TEntry')
+        query_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, pad))
+        
+        status = tk.Label(win, text="", anchor=tk.W,
+                          font=('Yu Gothic', self.scaled_fonts['small']),
+                          fg=self.colors['text_light'], bg=self.colors['surface'])
+        
+        columns = ("time", "ms", "source", "text")
+        tree = ttk.Treeview(win, columns=columns, show="headings")
+        tree.heading("time", text=self.t("col_time"))
+        tree.heading("ms", text="ms")
+        tree.heading("source", text=self.t("col_source"))
+        tree.heading("text", text=self.t("col_text"))
+        tree.column("time", width=int(110 * self.scale), stretch=False)
+        tree.column("ms", width=int(90 * self.scale), stretch=False, anchor=tk.E)
+        tree.column("source", width=int(180 * self.scale), stretch=False)
+        tree.column("text", width=int(480 * self.scale))
+        
+        def run_search(event=None):
+            tree.delete(*tree.get_children())
+            hits = index.search(query_entry.get())
+            for hit in hits:
+                source = hit['source_file'] or os.path.basename(hit['path'])
+                tree.insert("", tk.END, values=(format_ms(hit['start_ms']), hit['start_ms'], source, hit['text']))
+            status.config(text=self.t("search_hits").format(len(hits)))
+        
+        def index_folder():
+            folder = filedialog.askdirectory(parent=win)
+            if not folder:
+                return
+            status.config(text=self.t("indexing_folder").format(folder))
+            
+            def done(result):
+                if isinstance(result, Exception):
+                    text = f"{self.t('index_error')} {result}"
+                else:
+                    text = self.t("index_done").format(result['indexed'], result['unchanged'], result['removed'])
+                self.update_ui_safe(lambda: status.winfo_exists() and status.config(text=text))
+            
+            index.reindex_async([folder], on_done=done)
+        
+        ttk.Button(bar, text=self.t("search"), command=run_search, style='Primary.TButton').pack(side=tk.LEFT)
+        ttk.Button(bar, text=self.t("index_folder"), command=index_folder).pack(side=tk.LEFT, padx=(pad, 0))
+        query_entry.bind("<Return>", run_search)
+        
+        tree.pack(fill=tk.BOTH, expand=True, padx=pad)
+        status.pack(fill=tk.X, padx=pad, pady=(pad // 2, pad))
+        query_entry.focus_set()
+
     def save_subtitle_file(self):
         if not self.transcription_results:
             messagebox.showwarning(self.t("warning"), self.t("no_subtitles"))
@@ -1828,47 +2092,21 @@ class AudioSubtitleSystem:
             return
             
         try:
+            params = getattr(self, 'whisper_params', {})
+            store = core.subtitle_store(self.transcription_results, self.transcription_language_combo.get(), params)
+            if store is not self.transcription_results:
+                self.append_status_message(self.t("subtitles_resegmented").format(len(self.transcription_results), len(store)))
+            
             if fp.endswith('.srt'):
-                with open(fp, 'w', encoding='utf-8') as f:
-                    for i, seg in enumerate(self.transcription_results, 1):
-                        start_time = self.seconds_to_srt_time(seg['start'])
-                        end_time = self.seconds_to_srt_time(seg['end'])
-                        
-                        f.write(f"{i}\n")
-                        f.write(f"{start_time} --> {end_time}\n")
-                        f.write(f"{seg['text']}\n\n")
-                        
+                core.write_srt(fp, store)
             elif fp.endswith('.vtt'):
-                with open(fp, 'w', encoding='utf-8') as f:
-                    f.write("WEBVTT\n\n")
-                    for seg in self.transcription_results:
-                        start_time = self.seconds_to_vtt_time(seg['start'])
-                        end_time = self.seconds_to_vtt_time(seg['end'])
-                        
-                        f.write(f"{start_time} --> {end_time}\n")
-                        f.write(f"{seg['text']}\n\n")
+                core.write_vtt(fp, store)
                         
             self.append_status_message(f"{self.t('subtitle_saved')} {os.path.basename(fp)}")
             messagebox.showinfo(self.t("success"), f"{self.t('subtitle_saved')} {os.path.basename(fp)}")
         except Exception as e:
             messagebox.showerror(self.t("error"), f"{self.t('save_error')} {str(e)}")
 
-    def seconds_to_srt_time(self, seconds):
-        """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
-
-    def seconds_to_vtt_time(self, seconds):
-        """Convert seconds to WebVTT timestamp format (HH:MM:SS.mmm)"""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        millis = int((seconds % 1) * 1000)
-        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
-
     def on_closing(self):
         if self.update_timer:
             self.root.after_cancel(self.update_timer)
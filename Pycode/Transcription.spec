@@ -73,8 +73,13 @@ gui_modules = [
     'ctypes', '_ctypes',
 ]
 
+# Headless modes, started by name through runpy (see HEADLESS_MODES in Transcription.py)
+headless_modules = [
+    'transcription_cli', 'watch_folder', 'http_api', 'benchmark', 'evaluation',
+]
+
 # Combine all modules
-all_hidden_imports = stdlib_modules + gui_modules
+all_hidden_imports = stdlib_modules + gui_modules + headless_modules
 
 a = Analysis(
     ['Transcription.py'],
@@ -94,8 +99,8 @@ a = Analysis(
         'pytest', 'test', 'tests', 'testing',
         'setuptools', 'wheel', 'distutils', 'pip',
         
-        # Web frameworks and tools
-        'requests', 'urllib3', 'http.server', 'wsgiref', 'xmlrpc',
+        # Web frameworks and tools (http.server stays: model_fetcher and the --serve API use it)
+        'requests', 'urllib3', 'wsgiref', 'xmlrpc',
         'django', 'flask', 'bottle',
         
         # Development environments
@@ -109,7 +114,7 @@ a = Analysis(
         'PIL', 'Pillow', 'cv2', 'opencv', 'imageio', 'skimage',
         
         # Database drivers
-        'pymongo', 'psycopg2', 'mysql', 'sqlite3', 'sqlalchemy',
+        'pymongo', 'psycopg2', 'mysql', 'sqlalchemy',
         
         # Other large packages
         'sympy', 'networkx', 'nltk', 'gensim', 'transformers',
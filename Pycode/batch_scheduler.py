@@ -0,0 +1,284 @@
+"""Duration-aware scheduling of a batch across several resident-model workers.
+
+Durations are probed up front (WAV header / ffprobe, no decoding). Files longer than
+one chunk are split at the same boundaries transcribe_chunks uses, and every idle
+worker takes the longest remaining piece (longest-processing-time-first), so one long
+recording cannot leave the other workers idle at the end of the batch.
+"""
+import heapq
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import transcription_core as core
+from segment_store import SegmentStore
+from stage_timing import StageTimer
+
+# Used for files whose duration cannot be probed: a rough 128 kbps estimate from the size
+UNKNOWN_BYTES_PER_SECOND = 16000
+
+
+def probe_durations(paths, threads=8):
+    """{path: (seconds, estimated)} probed in parallel; the probes are subprocess-bound"""
+    def probe(path):
+        seconds = core.probe_duration(path)
+        if seconds is None:
+            return max(os.path.getsize(path) / UNKNOWN_BYTES_PER_SECOND, 1.0), True
+        return seconds, False
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return dict(zip(paths, pool.map(probe, paths)))
+
+
+class FileTask:
+    """One input file and the chunk results collected for it"""
+
+    def __init__(self, input_file, base, duration, estimated, spans):
+        self.input_file = input_file
+        self.base = base
+        self.duration = duration
+        self.estimated = estimated
+        self.results = [None] * len(spans)      # whisper segment lists, by chunk index
+        self.offsets = [offset for offset, _ in spans]
+        self.remaining = len(spans)
+        self.error = None
+        self.busy_seconds = 0.0
+        self.timer = StageTimer()             # stage times summed over the file's chunks
+        self.lock = threading.Lock()
+
+
+class WorkerStats:
+    def __init__(self, name):
+        self.name = name
+        self.busy_seconds = 0.0
+        self.items = 0
+        self.audio_seconds = 0.0
+        self.current = None
+        self.current_since = None
+
+    def busy_now(self, now):
+        return self.busy_seconds + (now - self.current_since if self.current_since else 0.0)
+
+
+def plan_makespan(lengths, workers):
+    """Makespan of longest-first list scheduling, as a prediction in audio seconds"""
+    loads = [0.0] * workers
+    for length in sorted(lengths, reverse=True):
+        heapq.heapreplace(loads, loads[0] + length)
+    return max(loads)
+
+
+class BatchScheduler:
+    """Runs (file, chunk) work items longest-first on worker threads that each hold a model
+    (or drive a worker process, see shared_weights.ModelProcess).
+    on_file_done(task, store, written, elapsed) and on_file_failed(task, error) report results."""
+
+    def __init__(self, workers, model_name, device, formats, params, language, keyword,
+                 chunk_seconds=core.CHUNK_SECONDS, model_loader=None, audio_loader=None,
+                 report_seconds=30.0, verbose=None):
+        self.workers = workers
+        self.model_name = model_name
+        self.device = device
+        self.formats = formats
+        self.params = params
+        self.language = language
+        self.keyword = keyword
+        self.chunk_seconds = chunk_seconds
+        self.model_loader = model_loader or core.load_model
+        self.audio_loader = audio_loader or core.load_audio_range
+        self.report_seconds = report_seconds
+        self.verbose = verbose
+        self.stats = [WorkerStats(f"w{i + 1}") for i in range(workers)]
+        self.on_file_done = None
+        self.on_file_failed = None
+        self._load_error = None
+        self._heap = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._started = None
+        self._queued_audio = 0.0
+
+    # ---------- planning ----------
+    def add_files(self, files):
+        """files: iterable of (input_file, base, duration, estimated). Returns the FileTasks."""
+        tasks = []
+        seq = 0
+        for input_file, base, duration, estimated in files:
+            spans = core.chunk_spans(duration, self.chunk_seconds)
+            task = FileTask(input_file, base, duration, estimated, spans)
+            tasks.append(task)
+            for index, (offset, length) in enumerate(spans):
+                expected = length if length is not None else max(duration - offset, 0.0)
+                # heapq is a min-heap: negate so the longest piece comes out first
+                self._heap.append((-expected, seq, task, index, offset, length))
+                self._queued_audio += expected
+                seq += 1
+        heapq.heapify(self._heap)
+        return tasks
+
+    @property
+    def pieces(self):
+        return len(self._heap)
+
+    def predicted_makespan(self):
+        return plan_makespan([-item[0] for item in self._heap], self.workers)
+
+    # ---------- running ----------
+    def run(self):
+        """Load one model per worker, drain the work heap and return the WorkerStats"""
+        self._started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(stats,), daemon=True) for stats in self.stats]
+        for t in threads:
+            t.start()
+        reporter = threading.Thread(target=self._reporter, daemon=True)
+        reporter.start()
+        for t in threads:
+            # join with a timeout so Ctrl+C reaches the main thread
+            while t.is_alive():
+                t.join(0.5)
+        self._done.set()
+        self._fail_remaining()
+        return self.stats
+
+    def _fail_remaining(self):
+        """Report every file that still has pieces queued once all workers are gone
+        (each failed to load its model), so the batch does not end as if it succeeded"""
+        error = self._load_error or RuntimeError("no worker was left to transcribe it")
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            task = item[2]
+            with task.lock:
+                task.error = error
+                self._notify(self.on_file_failed, task, error)
+
+    def _next(self):
+        with self._lock:
+            while self._heap:
+                item = heapq.heappop(self._heap)
+                self._queued_audio += item[0]
+                if item[2].error is None:      # skip the rest of a file that already failed
+                    return item
+            return None
+
+    def _worker(self, stats):
+        try:
+            model = self.model_loader(self.model_name, self.device)
+        except Exception as e:
+            print(f"{stats.name}: model loading failed: {e}", file=sys.stderr)
+            self._load_error = e
+            return
+
+        while True:
+            item = self._next()
+            if item is None:
+                stats.current = None
+                break
+            _, _, task, index, offset, length = item
+            stats.current = f"{task.input_file.name} {index + 1}/{len(task.results)}"
+            stats.current_since = time.perf_counter()
+            error = None
+            timings = None
+            try:
+                segments, audio_seconds, timings = self._run_piece(model, task.input_file, offset, length)
+            except Exception as e:
+                error = e
+            elapsed = time.perf_counter() - stats.current_since
+            stats.busy_seconds += elapsed
+            stats.current_since = None
+            stats.items += 1
+            if error is None:
+                stats.audio_seconds += audio_seconds
+            self._chunk_finished(task, index, None if error else segments, error, elapsed, timings)
+        if hasattr(model, "close"):
+            model.close()
+
+    def _run_piece(self, model, path, offset, length):
+        """Transcribe one piece; returns (whisper segments, audio seconds, StageTimer.to_raw())"""
+        lang = None if self.language in (None, "", "auto") else self.language
+        prompt = core.build_prompt(self.keyword, lang)
+        if hasattr(model, "transcribe_piece"):
+            # Worker process (shared_weights.ModelProcess): it decodes and transcribes itself
+            return model.transcribe_piece(path, offset, length, language=lang, prompt=prompt,
+                                          params=self.params, verbose=self.verbose)
+        timer = StageTimer()
+        with timer.stage("decode_audio"):
+            audio = self.audio_loader(path, offset, length)
+        with timer.watch(model):
+            result = core.transcribe_chunk(model, audio, language=lang, prompt=prompt,
+                                           params=self.params, verbose=self.verbose)
+        return result["segments"], core.audio_duration(audio), timer.to_raw()
+
+    def _chunk_finished(self, task, index, segments, error, elapsed, timings=None):
+        with task.lock:
+            task.busy_seconds += elapsed
+            if timings:
+                task.timer.merge(timings)
+            if task.error is not None:
+                return
+            if error is not None:
+                task.error = error
+                self._notify(self.on_file_failed, task, error)
+                return
+            task.results[index] = segments
+            task.remaining -= 1
+            if task.remaining:
+                return
+
+        # Last chunk in: assemble in time order and export
+        try:
+            store = SegmentStore()
+            for offset, segs in zip(task.offsets, task.results):
+                store.extend_whisper_segments(segs, offset)
+            task.results = None
+            written = core.export_result(store, task.input_file, task.base, self.formats, self.language,
+                                         self.keyword, self.model_name, self.device, self.params, task.timer)
+        except Exception as e:
+            task.error = e
+            self._notify(self.on_file_failed, task, e)
+            return
+        self._notify(self.on_file_done, task, store, written, task.busy_seconds)
+
+    @staticmethod
+    def _notify(callback, task, *args):
+        """Call a result callback; an exception in it must not end the worker thread"""
+        if callback is None:
+            return
+        try:
+            callback(task, *args)
+        except Exception as e:
+            print(f"reporting {task.input_file} failed: {e}", file=sys.stderr)
+
+    # ---------- reporting ----------
+    def utilization_line(self):
+        now = time.perf_counter()
+        wall = max(now - self._started, 1e-9)
+        parts = []
+        for s in self.stats:
+            current = s.current or "idle"
+            parts.append(f"{s.name} {100 * s.busy_now(now) / wall:3.0f}% ({current})")
+        with self._lock:
+            left = len(self._heap)
+            audio_left = self._queued_audio
+        return (f"[{timedelta(seconds=int(wall))}] " + " | ".join(parts)
+                + f" | {left} pieces, {timedelta(seconds=int(audio_left))} audio left")
+
+    def _reporter(self):
+        while not self._done.wait(self.report_seconds):
+            print(self.utilization_line(), flush=True)
+
+    def summary_lines(self):
+        wall = max(time.perf_counter() - self._started, 1e-9)
+        total_busy = sum(s.busy_seconds for s in self.stats)
+        lines = []
+        for s in self.stats:
+            rtf = s.busy_seconds / s.audio_seconds if s.audio_seconds else 0.0
+            lines.append(f"  {s.name}: {100 * s.busy_seconds / wall:5.1f}% busy, {s.items} pieces, "
+                         f"{timedelta(seconds=int(s.audio_seconds))} audio (RTF {rtf:.2f})")
+        balance = total_busy / (wall * len(self.stats))
+        lines.append(f"  makespan {timedelta(seconds=int(wall))}, worker utilization {100 * balance:.1f}%")
+        return lines
@@ -0,0 +1,367 @@
+"""Transcription benchmark: runs the real transcribe_file path on CPU over a matrix of
+models, beam_size/best_of and chunk lengths, and writes a JSON report that can be
+compared with an earlier one.
+
+    python Transcription.py --benchmark --models tiny,base --beam-size 1,5 --out bench.json
+    python Transcription.py --benchmark --models tiny --compare bench.json
+
+Test audio is generated deterministically (speech-like syllables, near-silence and a
+music stand-in), so two machines or two commits benchmark byte-identical inputs.
+Local recordings can be added with --fixtures. Every configuration runs in its own
+process so peak RSS belongs to that configuration alone.
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import struct
+import sys
+import tempfile
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+
+import transcription_core as core
+from memory_budget import peak_rss_bytes
+from transcription_cli import EXIT_FAILED, EXIT_NO_WHISPER, EXIT_OK, EXIT_USAGE, collect_inputs
+
+BENCH_AUDIO_DIR = Path.home() / ".cache" / "whisper_transcription" / "bench_audio"
+# Bump when the generators change so old cached WAVs are not mistaken for the new ones
+GENERATOR_VERSION = 1
+SYNTHETIC_KINDS = ("speech", "silence", "music")
+REPORT_VERSION = 1
+
+
+# ---------- deterministic test audio ----------
+def _speech_like(rng, seconds, rate):
+    """Voiced syllables (harmonics of a gliding pitch, boosted near two vowel formants) separated by pauses"""
+    samples = []
+    t = 0
+    total = int(seconds * rate)
+    while t < total:
+        if rng.random() < 0.2:
+            pause = int(rng.uniform(0.15, 0.6) * rate)
+            samples.extend(rng.gauss(0, 0.002) for _ in range(min(pause, total - t)))
+            t += pause
+            continue
+        length = min(int(rng.uniform(0.12, 0.28) * rate), total - t)
+        f0 = rng.uniform(95, 230)
+        f1, f2 = rng.choice(((730, 1090), (270, 2290), (530, 1840), (570, 840), (440, 1020)))
+        for i in range(length):
+            x = i / rate
+            env = math.sin(math.pi * i / length) ** 2
+            glide = f0 * (1 + 0.05 * math.sin(2 * math.pi * 3 * x))
+            voiced = sum(math.sin(2 * math.pi * glide * h * x) / h *
+                         (1.5 if abs(glide * h - f1) < 150 else 1.0) *
+                         (1.2 if abs(glide * h - f2) < 200 else 1.0)
+                         for h in range(1, 9))
+            samples.append(0.18 * env * voiced + rng.gauss(0, 0.004))
+        t += length
+    return samples[:total]
+
+
+def _silence(rng, seconds, rate):
+    return [rng.gauss(0, 0.001) for _ in range(int(seconds * rate))]
+
+
+def _music_like(rng, seconds, rate):
+    """Triads changing every half second with a click on each beat"""
+    samples = []
+    beat = int(0.5 * rate)
+    roots = [220.0 * 2 ** (n / 12) for n in (0, 3, 5, 7, 10)]
+    for start in range(0, int(seconds * rate), beat):
+        root = rng.choice(roots)
+        chord = (root, root * 2 ** (4 / 12), root * 2 ** (7 / 12))
+        length = min(beat, int(seconds * rate) - start)
+        for i in range(length):
+            x = (start + i) / rate
+            env = math.exp(-3.0 * i / beat)
+            tone = sum(math.sin(2 * math.pi * f * x) for f in chord) / 3
+            click = rng.gauss(0, 0.3) if i < 80 else 0.0
+            samples.append(0.25 * env * tone + 0.05 * click)
+    return samples
+
+
+GENERATORS = {"speech": _speech_like, "silence": _silence, "music": _music_like}
+
+
+def synthetic_audio(kind, seconds, seed=0, directory=BENCH_AUDIO_DIR):
+    """Path of a generated 16 kHz mono WAV; created once and reused"""
+    directory = Path(directory)
+    path = directory / f"{kind}_{int(seconds)}s_seed{seed}_v{GENERATOR_VERSION}.wav"
+    if path.exists():
+        return path
+    rng = random.Random(f"{kind}:{seed}")
+    samples = GENERATORS[kind](rng, seconds, core.SAMPLE_RATE)
+    frames = b"".join(struct.pack("<h", max(-32767, min(32767, int(s * 32767)))) for s in samples)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with wave.open(str(tmp), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(core.SAMPLE_RATE)
+        w.writeframes(frames)
+    os.replace(tmp, path)
+    return path
+
+
+def parse_synthetic(value):
+    """'speech:60,music:30' -> [('speech', 60.0), ('music', 30.0)]"""
+    items = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        kind, _, seconds = part.partition(":")
+        if kind not in GENERATORS:
+            raise ValueError(f"unknown synthetic audio '{kind}' (choose from {', '.join(SYNTHETIC_KINDS)})")
+        items.append((kind, float(seconds or 60)))
+    return items
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ---------- measurement ----------
+def _config_main(conn, config, audio_files, threads):
+    """Child process: load one model, transcribe every input with one parameter set.
+    config["params"] overrides further whisper parameters; with config["keep_text"] each
+    result carries the transcript (evaluation.py scores it)."""
+    if not core.setup_pytorch_path():
+        conn.send(("error", "PyTorch/Whisper not installed"))
+        return
+    if threads:
+        core.torch.set_num_threads(threads)
+    params = dict(core.DEFAULT_PARAMS, beam_size=config["beam_size"], best_of=config["best_of"], fp16=False)
+    params.update(config.get("params", {}))
+    try:
+        t0 = time.perf_counter()
+        model = core.load_model(config["model"], "cpu")
+        load_seconds = time.perf_counter() - t0
+    except Exception as e:
+        conn.send(("error", f"model loading failed: {e}"))
+        return
+    conn.send(("loaded", {"load_seconds": round(load_seconds, 3),
+                          "rss_after_load_mb": round(peak_rss_bytes() / 2 ** 20, 1)}))
+
+    with tempfile.TemporaryDirectory(prefix="whisper_bench_") as out_dir:
+        for audio in audio_files:
+            result = {"audio": audio["name"]}
+            t0 = time.perf_counter()
+            try:
+                store, duration, _ = core.transcribe_file(
+                    model, audio["path"], Path(out_dir) / "out", ["json"],
+                    language=audio.get("language") or config["language"], model_name=config["model"], device="cpu",
+                    params=params, chunk_seconds=config["chunk_minutes"] * 60)
+            except Exception as e:
+                result["error"] = str(e)
+                conn.send(("result", result))
+                continue
+            wall = time.perf_counter() - t0
+            result.update({
+                "audio_seconds": round(duration, 3),
+                "wall_seconds": round(wall, 3),
+                "rtf": round(wall / duration, 4) if duration > 0 else None,
+                "segments": len(store),
+                "segments_per_second": round(len(store) / wall, 3) if wall > 0 else None,
+                # Running peak of this configuration's process (model + every file so far)
+                "peak_rss_mb": round(peak_rss_bytes() / 2 ** 20, 1),
+            })
+            if config.get("keep_text"):
+                result["text"] = " ".join(seg.text for seg in store)
+            conn.send(("result", result))
+    conn.send(("done", None))
+
+
+def run_config(config, audio_files, threads=0, progress=print):
+    """Benchmark one configuration in a fresh process; returns its report entry"""
+    ctx = multiprocessing.get_context("spawn")
+    conn, child = ctx.Pipe()
+    process = ctx.Process(target=_config_main, args=(child, config, audio_files, threads), daemon=True)
+    process.start()
+    child.close()
+    entry = dict(config, results=[])
+    try:
+        while True:
+            try:
+                kind, value = conn.recv()
+            except EOFError:
+                entry["error"] = f"benchmark process exited with code {process.exitcode}"
+                break
+            if kind == "error":
+                entry["error"] = value
+                break
+            if kind == "loaded":
+                entry.update(value)
+            elif kind == "result":
+                entry["results"].append(value)
+                progress(result_line(value))
+            elif kind == "done":
+                break
+    finally:
+        process.join(10)
+        if process.is_alive():
+            process.terminate()
+    return entry
+
+
+def config_label(config):
+    return (f"{config['model']} beam={config['beam_size']} best_of={config['best_of']} "
+            f"chunk={config['chunk_minutes']:g}min")
+
+
+def result_line(result):
+    if "error" in result:
+        return f"    {result['audio']}: FAILED: {result['error']}"
+    return (f"    {result['audio']}: {result['wall_seconds']:.1f}s for {result['audio_seconds']:.0f}s audio "
+            f"(RTF {result['rtf']:.3f}), {result['segments']} segments, peak RSS {result['peak_rss_mb']:.0f} MB")
+
+
+def machine_info():
+    info = {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+    if core.torch is not None:
+        info["torch"] = core.torch.__version__
+        info["torch_threads"] = core.torch.get_num_threads()
+    return info
+
+
+# ---------- comparison ----------
+def _result_key(entry, result):
+    return (entry["model"], entry["beam_size"], entry["best_of"], entry["chunk_minutes"], result["audio"])
+
+
+def compare_reports(old, new):
+    """Lines comparing wall time, RTF and peak RSS of runs present in both reports"""
+    previous = {}
+    for entry in old.get("configs", []):
+        for result in entry.get("results", []):
+            if "error" not in result:
+                previous[_result_key(entry, result)] = result
+
+    lines = [f"{'configuration':44} {'audio':22} {'wall old':>9} {'wall new':>9} {'change':>8} {'peak RSS MB':>16}"]
+    for entry in new.get("configs", []):
+        for result in entry.get("results", []):
+            before = previous.get(_result_key(entry, result))
+            if before is None or "error" in result:
+                continue
+            change = 100.0 * (result["wall_seconds"] - before["wall_seconds"]) / max(before["wall_seconds"], 1e-9)
+            lines.append(f"{config_label(entry):44} {result['audio'][:22]:22} "
+                         f"{before['wall_seconds']:8.1f}s {result['wall_seconds']:8.1f}s {change:+7.1f}% "
+                         f"{before['peak_rss_mb']:6.0f} -> {result['peak_rss_mb']:<6.0f}")
+    old_audio = {a["name"]: a["sha256"] for a in old.get("audio", [])}
+    changed = [a["name"] for a in new.get("audio", []) if a["name"] in old_audio and old_audio[a["name"]] != a["sha256"]]
+    if changed:
+        lines.append(f"warning: audio differs between the reports: {', '.join(changed)}")
+    if len(lines) == 1:
+        lines.append("(no runs in common)")
+    return lines
+
+
+# ---------- command line ----------
+def _int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def _float_list(value):
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Transcription.py",
+        description="Benchmark transcription speed and memory on CPU")
+    parser.add_argument("--benchmark", action="store_true", required=True)
+    parser.add_argument("--models", default="tiny", help="comma-separated model names")
+    parser.add_argument("--beam-size", type=_int_list, default=[core.DEFAULT_PARAMS["beam_size"]],
+                        help="comma-separated beam sizes")
+    parser.add_argument("--best-of", type=_int_list, default=[core.DEFAULT_PARAMS["best_of"]],
+                        help="comma-separated best_of values")
+    parser.add_argument("--chunk-minutes", type=_float_list, default=[core.CHUNK_SECONDS / 60],
+                        help="comma-separated chunk lengths")
+    parser.add_argument("--synthetic", default="speech:60,silence:30,music:30",
+                        help="generated inputs as kind:seconds (kinds: speech, silence, music); '' for none")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated audio")
+    parser.add_argument("--fixtures", nargs="*", default=[], metavar="PATH",
+                        help="local audio files or directories to include")
+    parser.add_argument("--language", default="ja")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per run (0: PyTorch default)")
+    parser.add_argument("--out", default=None, help="report file (default: benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="earlier report to compare against")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in core.MODEL_NAMES]
+    if unknown or not models:
+        parser.error(f"unknown models: {', '.join(unknown) or '(none)'}")
+    try:
+        synthetic = parse_synthetic(args.synthetic)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not core.setup_pytorch_path():
+        print("PyTorch/Whisper not installed, please run PyTorch Downloader first", file=sys.stderr)
+        return EXIT_NO_WHISPER
+
+    audio_files = []
+    for kind, seconds in synthetic:
+        print(f"Preparing synthetic {kind} audio ({seconds:g}s)...")
+        path = synthetic_audio(kind, seconds, args.seed)
+        audio_files.append({"name": path.stem, "path": str(path), "kind": kind})
+    for input_file, _ in collect_inputs(args.fixtures, recursive=True):
+        audio_files.append({"name": input_file.name, "path": str(input_file.absolute()), "kind": "fixture"})
+    if not audio_files:
+        print("No benchmark audio.", file=sys.stderr)
+        return EXIT_USAGE
+    for audio in audio_files:
+        audio["sha256"] = file_sha256(audio["path"])
+
+    configs = [{"model": m, "beam_size": beam, "best_of": best, "chunk_minutes": chunk, "language": args.language}
+               for m in models for beam in args.beam_size for best in args.best_of for chunk in args.chunk_minutes]
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": machine_info(),
+        "threads": args.threads or None,
+        "audio": [{k: a[k] for k in ("name", "kind", "sha256")} for a in audio_files],
+        "configs": [],
+    }
+    for n, config in enumerate(configs, 1):
+        print(f"[{n}/{len(configs)}] {config_label(config)}", flush=True)
+        entry = run_config(config, audio_files, args.threads)
+        if "error" in entry:
+            print(f"    FAILED: {entry['error']}")
+        report["configs"].append(entry)
+
+    out = Path(args.out or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Report written to {out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        for line in compare_reports(previous, report):
+            print(line)
+
+    failed = any("error" in e or any("error" in r for r in e["results"]) for e in report["configs"])
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
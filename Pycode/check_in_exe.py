@@ -3,14 +3,25 @@
 """
 check_in_exe.py
 ---------------
-• 解析“真实的” pytorch_libs 目录 （脚本 vs. EXE 两种运行模式）
+• 解析“真实的” PyTorch 运行时目录（pytorch_runtimes 中选中的那个；脚本 vs. EXE 两种运行模式）
 • 把它插到 sys.path[0]
 • 强制重新 import torch / whisper
 • 打印所有关键信息
+• 硬件微基准：import 耗时、CPU matmul GFLOPS、log-mel 吞吐、每个已下载模型的加载 / 编码 / 解码一步
+• 写出 machine_profile.json，Transcription 据此选择默认的设备、线程数、fp16 与模型
 """
 
 import sys, os, inspect, importlib, pathlib, time, traceback
 
+from machine_profile import (PROFILE_VERSION, bench_log_mel, bench_matmul, bench_model, choose_defaults,
+                             choose_device, machine_info, save_profile, thread_counts, use_fp16)
+from install_state import read_install_info
+from memory_budget import MODEL_PARAMETERS
+from model_fetcher import model_path, model_ready
+from runtime_check import ImportTimer
+from runtimes import active_runtime
+from transcription_core import DEFAULT_PARAMS, MODEL_NAMES
+
 def headline(t): print("\n" + "="*8, t, "="*8)
 
 # ---------- 1. 解析路径 ----------
@@ -18,7 +29,7 @@ if getattr(sys, 'frozen', False):          # 运行在 PyInstaller 打包的 EXE
     base_dir = pathlib.Path(sys.executable).parent
 else:                                      # 普通 .py 运行
     base_dir = pathlib.Path(__file__).resolve().parent
-lib_dir  = (base_dir / "pytorch_libs").resolve()
+lib_dir  = active_runtime(base_dir).resolve()
 
 headline("运行环境 / Runtime Env")
 print("os.getcwd()      :", os.getcwd())
@@ -26,7 +37,7 @@ print("sys.argv[0]      :", sys.argv[0])
 print("__file__         :", globals().get('__file__'))
 print("sys.executable   :", sys.executable)
 print("base_dir         :", base_dir)
-print("pytorch_libs dir :", lib_dir, "| exists?", lib_dir.exists())
+print("runtime dir      :", lib_dir, "| exists?", lib_dir.exists())
 
 # ---------- 2. 准备 sys.path 并 purge 旧模块 ----------
 sys.path.insert(0, str(lib_dir))           # 把我们的 wheel 目录放到最前
@@ -43,11 +54,33 @@ def try_import(name):
         traceback.print_exc()
         return None
 
+import_s = {}
+def timed_import(name):
+    start = time.perf_counter()
+    module = try_import(name)
+    import_s[name] = round(time.perf_counter() - start, 3)
+    return module
+
+# 轻量安装 (slim) 会删除 torchvision / torchaudio；安装记录里没有的就不导入
+installed = (read_install_info(lib_dir) or {}).get("packages")
+def optional_import(name):
+    if installed is not None and name not in installed:
+        print(f"  -  {name}: 未安装 / not installed")
+        return None
+    return timed_import(name)
+
 headline("尝试导入 / Import Trial")
-torch   = try_import("torch")
-vision  = try_import("torchvision")
-audio   = try_import("torchaudio")
-whisper = try_import("whisper")
+timer = ImportTimer().install()
+torch   = timed_import("torch")
+vision  = optional_import("torchvision")
+audio   = optional_import("torchaudio")
+whisper = timed_import("whisper")
+timer.remove()
+for name, seconds in import_s.items():
+    print(f"  import {name:12}: {seconds:7.3f} s")
+print("  最慢的模块 / slowest modules (self / cumulative ms):")
+for name, self_ms, cum_ms in timer.top(10):
+    print(f"    {self_ms:8.1f} {cum_ms:9.1f}  {name}")
 
 headline("加载结果 / Load Result")
 if torch:
@@ -77,5 +110,70 @@ if torch:
     a = torch.eye(3)
     print("  ✔  CPU Eye OK :", a)
 
+# ---------- 5. 硬件微基准 ----------
+profile = {"version": PROFILE_VERSION, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+           "machine": machine_info(), "runtime": str(lib_dir), "imports": import_s,
+           "slowest_imports": timer.top(10), "matmul": {}, "models": {}}
+if torch and whisper:
+    profile["torch"] = torch.__version__
+    headline("CPU MatMul GFLOPS (fp32)")
+    cpu_fp32 = {}
+    for threads in thread_counts():
+        cpu_fp32[threads] = bench_matmul(torch, threads=threads)
+        print(f"  {threads:3} threads : {cpu_fp32[threads]:8.1f} GFLOPS")
+    profile["matmul"]["cpu_fp32"] = cpu_fp32
+
+    cuda = {"available": torch.cuda.is_available()}
+    if cuda["available"]:
+        headline("GPU MatMul GFLOPS")
+        cuda["name"] = torch.cuda.get_device_name(0)
+        cuda["fp32_gflops"] = bench_matmul(torch, "cuda", torch.float32)
+        cuda["fp16_gflops"] = bench_matmul(torch, "cuda", torch.float16)
+        print(f"  {cuda['name']}: fp32 {cuda['fp32_gflops']:.1f}, fp16 {cuda['fp16_gflops']:.1f} GFLOPS")
+    profile["cuda"] = cuda
+
+    headline("Log-Mel 吞吐 / Log-Mel Throughput")
+    profile["log_mel"] = {"cpu": bench_log_mel(whisper, torch)}
+    if cuda["available"]:
+        profile["log_mel"]["cuda"] = bench_log_mel(whisper, torch, "cuda")
+    for device, speed in profile["log_mel"].items():
+        print(f"  {device:5}: {speed:10.1f} s audio / s")
+
+    # ---------- 6. 每个已下载模型 ----------
+    headline("模型基准 / Model Benchmarks")
+    order = sorted(MODEL_NAMES, key=lambda n: (MODEL_PARAMETERS[n], MODEL_NAMES.index(n)))
+    device, fp16 = choose_device(profile), use_fp16(profile)
+    beam_size = DEFAULT_PARAMS["beam_size"]
+    benchmarked = {}        # checkpoint -> model name; large and large-v3 share large-v3.pt
+    for name in order:
+        if not model_ready(name):
+            continue
+        checkpoint = model_path(name)
+        if checkpoint in benchmarked:
+            alias = benchmarked[checkpoint]
+            if alias in profile["models"]:
+                profile["models"][name] = dict(profile["models"][alias])
+                print(f"  {name:15} same checkpoint as {alias}")
+            continue
+        benchmarked[checkpoint] = name
+        try:
+            result = bench_model(whisper, torch, checkpoint, device, beam_size, fp16)
+        except Exception as e:
+            print(f"  ✘  {name}: {e}")
+            continue
+        result.update(device=device, beam_size=beam_size, fp16=fp16)
+        profile["models"][name] = result
+        print(f"  {name:15} load {result['load_s']:6.2f} s | encoder {result['encoder_s']:7.3f} s | "
+              f"decoder step {result['decoder_step_s'] * 1000:7.1f} ms | ~{result['realtime_factor']:.2f}x real time")
+    if not profile["models"]:
+        print("  (没有已下载的模型 / no downloaded models)")
+
+    # ---------- 7. 写出机器配置 ----------
+    headline("机器配置 / Machine Profile")
+    profile["defaults"] = choose_defaults(profile, order)
+    print("  defaults :", profile["defaults"])
+    print("  saved to :", save_profile(profile))
+
 print("\n全部结束 / Finished")
-input("Press any key to exit…")   # ← 等待用户按回车后再退出
\ No newline at end of file
+if sys.stdin and sys.stdin.isatty():
+    input("Press any key to exit…")   # ← 等待用户按回车后再退出
\ No newline at end of file
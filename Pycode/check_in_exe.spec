@@ -94,8 +94,8 @@ a = Analysis(
         'pytest', 'test', 'tests', 'testing',
         'setuptools', 'wheel', 'distutils', 'pip',
         
-        # Web frameworks and tools
-        'requests', 'urllib3', 'http.server', 'wsgiref', 'xmlrpc',
+        # Web frameworks and tools (http.server stays: model_fetcher uses it)
+        'requests', 'urllib3', 'wsgiref', 'xmlrpc',
         'django', 'flask', 'bottle',
         
         # Development environments
@@ -108,8 +108,8 @@ a = Analysis(
         # Image and multimedia (not needed for audio transcription)
         'PIL', 'Pillow', 'cv2', 'opencv', 'imageio', 'skimage',
         
-        # Database drivers
-        'pymongo', 'psycopg2', 'mysql', 'sqlite3', 'sqlalchemy',
+        # Database drivers (sqlite3 stays: runtimes -> install_state -> wheel_store uses it)
+        'pymongo', 'psycopg2', 'mysql', 'sqlalchemy',
         
         # Other large packages
         'sympy', 'networkx', 'nltk', 'gensim', 'transformers',
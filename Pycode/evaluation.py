@@ -0,0 +1,315 @@
+"""Speed-versus-accuracy evaluation: transcribes local recordings that have a reference
+transcript with several pipelines and reports the error rate next to the real-time factor.
+
+    python Transcription.py --evaluate eval_set/ --models tiny,base,small --beam-size 1,5
+    python Transcription.py --evaluate eval_set/ --pipelines pipelines.json --out eval.json
+
+Each recording needs a reference next to it: talk.mp3 -> talk.ref.txt (plain UTF-8 text).
+A first line "language: en" in the reference sets the recording's language (default
+--language). Japanese, Chinese and Korean are scored by character error rate (CER),
+other languages by word error rate (WER); both are reported for every file.
+
+--pipelines reads a JSON list of pipelines instead of the --models/--beam-size/... matrix:
+    [{"name": "small-greedy", "model": "small", "beam_size": 1, "best_of": 1},
+     {"name": "base-30min", "model": "base", "chunk_minutes": 30, "condition_on_previous_text": true}]
+Any whisper parameter of the GUI's parameter window can be set per pipeline. Every pipeline
+runs in its own process (see benchmark.run_config). The output is a table sorted by real-time
+factor in which the Pareto-optimal pipelines (nothing else is both faster and more accurate)
+are marked, plus a JSON report with the per-file numbers.
+"""
+import argparse
+import json
+import re
+import sys
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+
+import transcription_core as core
+from benchmark import _float_list, _int_list, file_sha256, machine_info, run_config
+from transcription_cli import EXIT_FAILED, EXIT_NO_WHISPER, EXIT_OK, EXIT_USAGE, collect_inputs
+
+CER_LANGUAGES = ("ja", "zh", "ko")
+REFERENCE_SUFFIX = ".ref.txt"
+PIPELINE_KEYS = ("name", "model", "beam_size", "best_of", "chunk_minutes", "language")
+REPORT_VERSION = 1
+
+_language_line = re.compile(r"^\s*language\s*:\s*([A-Za-z-]+)\s*$")
+
+
+# ---------- references ----------
+def reference_path(audio_path):
+    audio_path = Path(audio_path)
+    return audio_path.with_name(audio_path.stem + REFERENCE_SUFFIX)
+
+
+def read_reference(path):
+    """(text, language or None) of a reference transcript"""
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        lines = f.read().splitlines()
+    language = None
+    if lines:
+        match = _language_line.match(lines[0])
+        if match:
+            language = match.group(1).lower()
+            lines = lines[1:]
+    return "\n".join(lines), language
+
+
+# ---------- scoring ----------
+def normalize_text(text):
+    """NFKC, lower case, punctuation and symbols dropped, whitespace collapsed"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = "".join(" " if unicodedata.category(c)[0] in "PSZC" else c for c in text)
+    return " ".join(text.split())
+
+
+def edit_distance(reference, hypothesis):
+    """Levenshtein distance between two token sequences.
+    Row by row with numpy: substitutions and deletions are elementwise, and the
+    insertion chain along the row is new[j] = j + min(k <= j) (candidate[k] - k)."""
+    import numpy as np
+
+    if not reference:
+        return len(hypothesis)
+    if not hypothesis:
+        return len(reference)
+    vocabulary = {}
+    ref = np.array([vocabulary.setdefault(t, len(vocabulary)) for t in reference], dtype=np.int64)
+    hyp = np.array([vocabulary.setdefault(t, len(vocabulary)) for t in hypothesis], dtype=np.int64)
+    positions = np.arange(len(hyp) + 1, dtype=np.int64)
+    row = positions.copy()
+    candidate = np.empty_like(row)
+    substitution = np.empty(len(hyp), dtype=np.int64)
+    for i, token in enumerate(ref, 1):
+        np.not_equal(hyp, token, out=substitution)
+        substitution += row[:-1]
+        np.add(row[1:], 1, out=candidate[1:])
+        np.minimum(candidate[1:], substitution, out=candidate[1:])
+        candidate[0] = i
+        candidate -= positions
+        np.minimum.accumulate(candidate, out=row)
+        row += positions
+    return int(row[-1])
+
+
+def score(reference, hypothesis, language):
+    """Edits and reference lengths in words and characters, and the primary error rate"""
+    ref = normalize_text(reference)
+    hyp = normalize_text(hypothesis)
+    ref_words, hyp_words = ref.split(), hyp.split()
+    ref_chars, hyp_chars = ref.replace(" ", ""), hyp.replace(" ", "")
+    result = {
+        "word_edits": edit_distance(ref_words, hyp_words),
+        "words": len(ref_words),
+        "char_edits": edit_distance(ref_chars, hyp_chars),
+        "chars": len(ref_chars),
+        "metric": "cer" if (language or "")[:2] in CER_LANGUAGES else "wer",
+    }
+    result["wer"] = _rate(result["word_edits"], result["words"])
+    result["cer"] = _rate(result["char_edits"], result["chars"])
+    result["error"] = result[result["metric"]]
+    return result
+
+
+def _rate(edits, length):
+    return round(edits / length, 4) if length else (0.0 if edits == 0 else 1.0)
+
+
+# ---------- pipelines ----------
+def pipeline_label(pipeline):
+    if pipeline.get("name"):
+        return pipeline["name"]
+    label = f"{pipeline['model']} beam={pipeline['beam_size']} best_of={pipeline['best_of']}"
+    if pipeline["chunk_minutes"] != core.CHUNK_SECONDS / 60:
+        label += f" chunk={pipeline['chunk_minutes']:g}min"
+    return label + "".join(f" {k}={v}" for k, v in sorted(pipeline.get("params", {}).items()))
+
+
+def load_pipelines(path, language):
+    """Pipelines from a JSON list; keys other than PIPELINE_KEYS are whisper parameters"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: expected a non-empty JSON list of pipelines")
+    pipelines = []
+    for n, entry in enumerate(entries, 1):
+        unknown = [k for k in entry if k not in PIPELINE_KEYS and k not in core.DEFAULT_PARAMS]
+        if unknown:
+            raise ValueError(f"pipeline {n}: unknown settings {', '.join(unknown)}")
+        model = entry.get("model")
+        if model not in core.MODEL_NAMES:
+            raise ValueError(f"pipeline {n}: unknown model {model!r}")
+        pipelines.append({
+            "name": entry.get("name") or "",
+            "model": model,
+            "beam_size": entry.get("beam_size", core.DEFAULT_PARAMS["beam_size"]),
+            "best_of": entry.get("best_of", core.DEFAULT_PARAMS["best_of"]),
+            "chunk_minutes": entry.get("chunk_minutes", core.CHUNK_SECONDS / 60),
+            "language": entry.get("language", language),
+            "params": {k: v for k, v in entry.items() if k not in PIPELINE_KEYS},
+        })
+    return pipelines
+
+
+def summarize(entry, references):
+    """Corpus-level numbers of one pipeline run; edits are summed before dividing"""
+    totals = dict.fromkeys(("word_edits", "words", "char_edits", "chars", "edits", "units"), 0)
+    wall = audio = 0.0
+    files = 0
+    for result in entry.get("results", []):
+        if "error" in result:
+            continue
+        reference = references[result["audio"]]
+        result["score"] = score(reference["text"], result.pop("text", ""), reference["language"])
+        for key in ("word_edits", "words", "char_edits", "chars"):
+            totals[key] += result["score"][key]
+        primary = result["score"]["metric"]
+        totals["edits"] += result["score"]["word_edits" if primary == "wer" else "char_edits"]
+        totals["units"] += result["score"]["words" if primary == "wer" else "chars"]
+        wall += result["wall_seconds"]
+        audio += result["audio_seconds"]
+        files += 1
+    if not files:
+        return None
+    return {
+        "files": files,
+        "rtf": round(wall / audio, 4) if audio > 0 else None,
+        "wer": _rate(totals["word_edits"], totals["words"]),
+        "cer": _rate(totals["char_edits"], totals["chars"]),
+        "error": _rate(totals["edits"], totals["units"]),
+    }
+
+
+def pareto_front(summaries):
+    """Indexes of the summaries no other one beats on both real-time factor and error"""
+    front = []
+    for i, a in enumerate(summaries):
+        dominated = any(
+            b["rtf"] <= a["rtf"] and b["error"] <= a["error"] and (b["rtf"] < a["rtf"] or b["error"] < a["error"])
+            for j, b in enumerate(summaries) if j != i)
+        if not dominated:
+            front.append(i)
+    return front
+
+
+def pareto_table(report):
+    rows = [(entry["label"], entry["summary"]) for entry in report["pipelines"] if entry.get("summary")]
+    rows = [(label, s) for label, s in rows if s["rtf"] is not None]
+    front = set(pareto_front([s for _, s in rows]))
+    order = sorted(range(len(rows)), key=lambda i: (rows[i][1]["rtf"], rows[i][1]["error"]))
+    width = max([len(label) for label, _ in rows] + [8])
+    lines = [f"   {'pipeline':{width}} {'RTF':>7} {'error':>7} {'WER':>7} {'CER':>7}  files"]
+    for i in order:
+        label, s = rows[i]
+        lines.append(f"{'*' if i in front else ' '}  {label:{width}} {s['rtf']:7.3f} {100 * s['error']:6.1f}% "
+                     f"{100 * s['wer']:6.1f}% {100 * s['cer']:6.1f}%  {s['files']}")
+    lines.append("* Pareto-optimal: no other pipeline is both faster and more accurate. "
+                 "error is CER for ja/zh/ko recordings and WER for the rest.")
+    return lines
+
+
+# ---------- command line ----------
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Transcription.py",
+        description="Measure word/character error rate against reference transcripts next to the real-time factor")
+    parser.add_argument("--evaluate", nargs="+", required=True, metavar="PATH",
+                        help="audio files and/or directories; each recording needs a <name>.ref.txt reference")
+    parser.add_argument("--pipelines", default=None, metavar="JSON",
+                        help="JSON list of pipelines to compare (overrides the matrix options below)")
+    parser.add_argument("--models", default="tiny,base,small", help="comma-separated model names")
+    parser.add_argument("--beam-size", type=_int_list, default=[core.DEFAULT_PARAMS["beam_size"]],
+                        help="comma-separated beam sizes")
+    parser.add_argument("--best-of", type=_int_list, default=[core.DEFAULT_PARAMS["best_of"]],
+                        help="comma-separated best_of values")
+    parser.add_argument("--chunk-minutes", type=_float_list, default=[core.CHUNK_SECONDS / 60],
+                        help="comma-separated chunk lengths")
+    parser.add_argument("--language", default="ja",
+                        help="language of recordings whose reference does not name one")
+    parser.add_argument("--recursive", action="store_true", help="descend into subdirectories")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per run (0: PyTorch default)")
+    parser.add_argument("--out", default=None, help="report file (default: evaluation-<timestamp>.json)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.pipelines:
+        try:
+            pipelines = load_pipelines(args.pipelines, args.language)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    else:
+        models = [m.strip() for m in args.models.split(",") if m.strip()]
+        unknown = [m for m in models if m not in core.MODEL_NAMES]
+        if unknown or not models:
+            parser.error(f"unknown models: {', '.join(unknown) or '(none)'}")
+        pipelines = [{"name": "", "model": m, "beam_size": beam, "best_of": best, "chunk_minutes": chunk,
+                      "language": args.language, "params": {}}
+                     for m in models for beam in args.beam_size for best in args.best_of
+                     for chunk in args.chunk_minutes]
+
+    audio_files = []
+    references = {}
+    for input_file, _ in collect_inputs(args.evaluate, args.recursive):
+        ref_path = reference_path(input_file)
+        if not ref_path.exists():
+            print(f"skipped {input_file}: no {ref_path.name}")
+            continue
+        text, language = read_reference(ref_path)
+        name = str(input_file)
+        references[name] = {"text": text, "language": language or args.language}
+        audio_files.append({"name": name, "path": str(input_file.absolute()), "language": language,
+                            "sha256": file_sha256(input_file)})
+    if not audio_files:
+        print("No recordings with reference transcripts.", file=sys.stderr)
+        return EXIT_USAGE
+
+    if not core.setup_pytorch_path():
+        print("PyTorch/Whisper not installed, please run PyTorch Downloader first", file=sys.stderr)
+        return EXIT_NO_WHISPER
+
+    report = {
+        "version": REPORT_VERSION,
+        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": machine_info(),
+        "threads": args.threads or None,
+        "audio": [{"name": a["name"], "language": references[a["name"]]["language"], "sha256": a["sha256"]}
+                  for a in audio_files],
+        "pipelines": [],
+    }
+    for n, pipeline in enumerate(pipelines, 1):
+        label = pipeline_label(pipeline)
+        print(f"[{n}/{len(pipelines)}] {label}", flush=True)
+        entry = run_config(dict(pipeline, keep_text=True), audio_files, args.threads)
+        entry.pop("keep_text", None)
+        entry["label"] = label
+        if "error" in entry:
+            print(f"    FAILED: {entry['error']}")
+        entry["summary"] = summarize(entry, references)
+        if entry["summary"]:
+            s = entry["summary"]
+            print(f"    RTF {s['rtf']:.3f}, error {100 * s['error']:.1f}% "
+                  f"(WER {100 * s['wer']:.1f}%, CER {100 * s['cer']:.1f}%)")
+        report["pipelines"].append(entry)
+
+    summaries = [e for e in report["pipelines"] if e.get("summary") and e["summary"]["rtf"] is not None]
+    for i in pareto_front([e["summary"] for e in summaries]):
+        summaries[i]["summary"]["pareto"] = True
+
+    out = Path(args.out or f"evaluation-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("-" * 50)
+    for line in pareto_table(report):
+        print(line)
+    print(f"Report written to {out}")
+
+    failed = any("error" in e or any("error" in r for r in e["results"]) for e in report["pipelines"])
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,707 @@
+"""Local HTTP job API backed by a pool of workers that keep their Whisper model loaded.
+
+    python Transcription.py --serve --port 8765 --workers 1 --model large-v3
+
+    POST   /jobs                     raw audio body (?filename=&language=&keyword=&<param>=)
+                                     or JSON {"path": "...", "language": ..., "keyword": ..., "params": {...}}
+    GET    /jobs                     all known jobs
+    GET    /jobs/<id>                status and progress
+    GET    /jobs/<id>/segments       segments so far (?since=N&wait=SECONDS, or ?stream=1 for NDJSON)
+    GET    /jobs/<id>/result.<fmt>   download json / txt / srt / vtt once finished
+    DELETE /jobs/<id>                cancel a queued job or forget a finished one
+    GET    /health                   workers, queue depth and capacity
+
+The job queue is bounded: when it is full, POST answers 503 with Retry-After
+instead of accepting more work than the workers can hold. JSON jobs naming a local
+"path" are refused (403) unless the file lies under a directory given with
+--allow-path, so a client cannot make the server read arbitrary files.
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import transcription_core as core
+from transcription_cli import (EXIT_INTERRUPTED, EXIT_NO_WHISPER, EXIT_OK, EXIT_USAGE, add_transcription_args,
+                               open_cache, open_metrics, params_from_args, parse_formats)
+from stage_timing import StageTimer
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "txt": "text/plain; charset=utf-8",
+    "srt": "application/x-subrip; charset=utf-8",
+    "vtt": "text/vtt; charset=utf-8",
+}
+COPY_BLOCK = 1024 * 1024
+
+
+def _now_text():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def coerce_params(values):
+    """Pick whisper parameters out of a dict (JSON body or query string), typed like DEFAULT_PARAMS"""
+    params = {}
+    for key, default in core.DEFAULT_PARAMS.items():
+        if key not in values:
+            continue
+        value = values[key]
+        if isinstance(default, bool):
+            value = value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, (int, float)):
+            value = type(default)(value)
+        params[key] = value
+    return params
+
+
+class _ThreadOutputRouter:
+    """sys.stdout/sys.stderr replacement that sends each worker thread's output to its own stream.
+    contextlib.redirect_stdout swaps the process-wide stream, which breaks with several workers."""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    def set_target(self, stream):
+        self._local.target = stream
+
+    def write(self, text):
+        target = getattr(self._local, "target", None)
+        return (target or self.fallback).write(text)
+
+    def flush(self):
+        target = getattr(self._local, "target", None)
+        (target or self.fallback).flush()
+
+    def __getattr__(self, name):
+        return getattr(self.fallback, name)
+
+
+class TranscriptionJob:
+    def __init__(self, job_id, audio_path, filename, language, keyword, params, work_dir):
+        self.id = job_id
+        self.audio_path = Path(audio_path)
+        self.filename = filename
+        self.language = language
+        self.keyword = keyword
+        self.params = params
+        self.work_dir = Path(work_dir)      # uploads and results; removed when the job is forgotten
+        self.status = QUEUED
+        self.error = None
+        self.worker = None
+        self.duration = None
+        self.created_at = _now_text()
+        self.started_at = None
+        self.finished_at = None
+        self.elapsed = None
+        self.cached = False                 # served from the result cache
+        self.timings = None                 # StageTimer.as_dict() of a finished job
+        self.segments = []                  # dicts, appended live while whisper prints them
+        self.results = {}                   # format -> file path
+        self.changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def add_segment(self, start, end, text):
+        with self.changed:
+            self.segments.append({"start": round(start, 3), "end": round(end, 3), "text": text})
+            self.changed.notify_all()
+
+    def claim(self, worker):
+        """Mark a queued job as running on worker; False when it was cancelled first"""
+        with self.changed:
+            if self.status != QUEUED:
+                return False
+            self.status, self.worker, self.started_at = RUNNING, worker, _now_text()
+            self.changed.notify_all()
+            return True
+
+    def cancel(self):
+        """Cancel the job if it is still queued; returns the status it ends up with"""
+        with self.changed:
+            if self.status == QUEUED:
+                self.status, self.finished_at = CANCELLED, _now_text()
+                self.changed.notify_all()
+            return self.status
+
+    def set_status(self, status, **fields):
+        with self.changed:
+            self.status = status
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.changed.notify_all()
+
+    def wait_for_segments(self, since, timeout):
+        """Block until there are segments past index since, the job finishes, or timeout"""
+        with self.changed:
+            self.changed.wait_for(lambda: len(self.segments) > since or self.finished, timeout)
+            return self.segments[since:], self.status
+
+    def describe(self, position=None):
+        progress = 0.0
+        if self.status == DONE:
+            progress = 1.0
+        elif self.duration and self.segments:
+            progress = min(self.segments[-1]["end"] / self.duration, 1.0)
+        info = {
+            "id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "language": self.language,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "elapsed": self.elapsed,
+            "progress": round(progress, 4),
+            "segments": len(self.segments),
+            "worker": self.worker,
+            "cached": self.cached,
+            "error": self.error,
+        }
+        if self.timings:
+            info["timings"] = self.timings
+        if position is not None:
+            info["position"] = position
+        if self.results:
+            info["results"] = {fmt: f"/jobs/{self.id}/result.{fmt}" for fmt in self.results}
+        return info
+
+
+class WorkerPool:
+    """Worker threads that each load the model once and then take jobs from a bounded queue.
+    model_loader(model_name, device) and audio_loader(path) can be swapped out for tests.
+    With a ResultCache, uploads already transcribed with the same settings are answered from it."""
+
+    def __init__(self, workers=1, model_name="large-v3", device="cpu", formats=core.OUTPUT_FORMATS,
+                 queue_size=16, chunk_seconds=core.CHUNK_SECONDS, model_loader=None, audio_loader=None,
+                 cache=None, metrics=None):
+        self.model_name = model_name
+        self.device = device
+        self.formats = list(formats)
+        self.chunk_seconds = chunk_seconds
+        self.model_loader = model_loader or core.load_model
+        self.audio_loader = audio_loader or core.load_audio
+        self.cache = cache
+        self.metrics = metrics
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.ready = threading.Event()
+        self.busy = 0
+        self._busy_lock = threading.Lock()
+        self._loaded = 0
+        self.load_errors = []
+        self._routers = ()
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, args=(f"worker-{i + 1}",), daemon=True)
+            self.threads.append(t)
+
+    def start(self):
+        # Route whisper's verbose prints per worker thread so live segments reach the right job
+        sys.stdout = _ThreadOutputRouter(sys.stdout)
+        sys.stderr = _ThreadOutputRouter(sys.stderr)
+        self._routers = (sys.stdout, sys.stderr)
+        for t in self.threads:
+            t.start()
+
+    def stop(self):
+        for _ in self.threads:
+            try:
+                self.queue.put(None, timeout=1)
+            except queue.Full:
+                break
+        for t in self.threads:
+            t.join(timeout=5)
+        if self._routers:
+            sys.stdout, sys.stderr = (router.fallback for router in self._routers)
+            self._routers = ()
+
+    def submit(self, job):
+        """Queue a job; raises queue.Full when the pool is saturated"""
+        self.queue.put_nowait(job)
+
+    def _model_loaded(self, error=None):
+        with self._busy_lock:
+            self._loaded += 1
+            if error:
+                self.load_errors.append(error)
+            if self._loaded == len(self.threads):
+                self.ready.set()
+
+    def _worker(self, name):
+        try:
+            model = self.model_loader(self.model_name, self.device)
+        except Exception as e:
+            print(f"{name}: model loading failed: {e}", file=sys.__stderr__)
+            self._model_loaded(str(e))
+            return
+        self._model_loaded()
+
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            if not job.claim(name):
+                continue                    # cancelled while it was queued
+            with self._busy_lock:
+                self.busy += 1
+            try:
+                self._run(job, model, name)
+            finally:
+                with self._busy_lock:
+                    self.busy -= 1
+
+    def _run(self, job, model, name):
+        t0 = time.perf_counter()
+
+        def route_output(chunk_offset):
+            # transcribe_chunks would swap the process-wide stdout; point this thread's route instead
+            stream = core.SegmentLineStream(job.add_segment, chunk_offset)
+            for router in self._routers:
+                router.set_target(stream)
+            return None
+
+        cache_entry = None
+        try:
+            if self.cache:
+                content_hash, key = self.cache.key_for(job.audio_path, self.model_name, job.language,
+                                                       job.keyword, job.params, self.chunk_seconds)
+                hit = self.cache.get(key)
+                if hit is not None:
+                    self._finish_cached(job, *hit, t0)
+                    return
+                cache_entry = (content_hash, key)
+
+            timer = StageTimer()
+            with timer.stage("decode_audio"):
+                audio = self.audio_loader(str(job.audio_path))
+            job.duration = round(core.audio_duration(audio), 3)
+            lang = None if job.language in (None, "", "auto") else job.language
+            try:
+                store, _ = core.transcribe_chunks(
+                    model, audio,
+                    language=lang,
+                    prompt=core.build_prompt(job.keyword, lang),
+                    params=job.params,
+                    chunk_seconds=self.chunk_seconds,
+                    progress_stream=route_output,
+                    verbose=True,
+                    timer=timer
+                )
+            finally:
+                for router in self._routers:
+                    router.set_target(None)
+            del audio
+
+            # Models that print nothing (or output that could not be parsed) still stream the final segments
+            for seg in list(store)[len(job.segments):]:
+                job.add_segment(seg.start, seg.end, seg.text)
+
+            base = job.work_dir / Path(job.filename).stem
+            written = core.export_result(store, job.filename, base, self.formats, job.language, job.keyword,
+                                         self.model_name, self.device, job.params, timer)
+            results = {fmt: Path(fp) for fmt, fp in zip(self.formats, written)}
+            job.set_status(DONE, results=results, timings=timer.as_dict(), finished_at=_now_text(),
+                           elapsed=round(time.perf_counter() - t0, 3))
+        except Exception as e:
+            job.set_status(FAILED, error=str(e), finished_at=_now_text(),
+                           elapsed=round(time.perf_counter() - t0, 3))
+            if self.metrics:
+                self.metrics.record_failure()
+            return
+        if self.metrics:
+            self.metrics.record(timer, job.duration)
+        if cache_entry:
+            try:
+                self.cache.put(cache_entry[1], cache_entry[0], store, self.model_name, job.language, job.duration)
+            except Exception as e:
+                print(f"warning: caching job {job.id} failed: {e}", file=sys.__stderr__)
+
+    def _finish_cached(self, job, store, duration, t0):
+        job.duration = duration
+        for seg in store:
+            job.add_segment(seg.start, seg.end, seg.text)
+        base = job.work_dir / Path(job.filename).stem
+        written = core.export_result(store, job.filename, base, self.formats, job.language, job.keyword,
+                                     self.model_name, "", job.params)
+        results = {fmt: Path(fp) for fmt, fp in zip(self.formats, written)}
+        job.set_status(DONE, results=results, cached=True, finished_at=_now_text(),
+                       elapsed=round(time.perf_counter() - t0, 3))
+
+    def position(self, job):
+        """1-based place of a queued job, or None"""
+        with self.queue.mutex:
+            pending = [j for j in self.queue.queue if j is not None and j.status == QUEUED]
+        for i, j in enumerate(pending, 1):
+            if j is job:
+                return i
+        return None
+
+
+class TranscriptionServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer holding the job table and the worker pool"""
+    daemon_threads = True
+
+    def __init__(self, address, pool, spool_dir=None, max_upload_bytes=2 * 1024 ** 3, keep_jobs=200,
+                 language="ja", keyword="", params=None, allowed_roots=()):
+        super().__init__(address, JobRequestHandler)
+        self.pool = pool
+        self.allowed_roots = [Path(root).resolve() for root in allowed_roots]
+        self._own_spool = spool_dir is None
+        self.spool_dir = Path(spool_dir or tempfile.mkdtemp(prefix="whisper_jobs_"))
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.max_upload_bytes = max_upload_bytes
+        self.keep_jobs = keep_jobs
+        self.defaults = {"language": language, "keyword": keyword, "params": dict(params or {})}
+        self.jobs = OrderedDict()
+        self.jobs_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def path_allowed(self, path):
+        """True when path resolves to a location under one of the --allow-path directories"""
+        resolved = Path(path).resolve()
+        return any(os.path.commonpath([resolved, root]) == str(root) for root in self.allowed_roots)
+
+    def new_job(self, audio_path, filename, options, job_id=None):
+        job_id = job_id or uuid.uuid4().hex[:12]
+        params = dict(self.defaults["params"])
+        params.update(options.get("params", {}))
+        return TranscriptionJob(
+            job_id, audio_path, filename,
+            language=options.get("language", self.defaults["language"]),
+            keyword=str(options.get("keyword", self.defaults["keyword"])).strip(),
+            params=params,
+            work_dir=self.spool_dir / job_id
+        )
+
+    def accept(self, job):
+        """Register and queue the job; False when the queue is full"""
+        with self.jobs_lock:
+            try:
+                self.pool.submit(job)
+            except queue.Full:
+                return False
+            self.jobs[job.id] = job
+            self._prune()
+        return True
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond keep_jobs together with their files"""
+        finished = [j for j in self.jobs.values() if j.finished]
+        for job in finished[:max(len(finished) - self.keep_jobs, 0)]:
+            self.forget(job)
+
+    def forget(self, job):
+        self.jobs.pop(job.id, None)
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    def server_close(self):
+        super().server_close()
+        if self._own_spool:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "WhisperTranscription/1.0"
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}", file=sys.__stderr__)
+
+    # ---------- helpers ----------
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message, headers=None):
+        self._send_json(status, {"error": message}, headers)
+
+    def _route(self):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        segments = [unquote(p) for p in parts.path.strip("/").split("/") if p]
+        return segments, query
+
+    def _job(self, job_id):
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            self._error(HTTPStatus.NOT_FOUND, f"no job {job_id}")
+        return job
+
+    def _refuse_body(self, status, message, headers=None):
+        # The request body was not read, so the connection cannot be reused
+        self.close_connection = True
+        headers = dict(headers or {})
+        headers["Connection"] = "close"
+        self._error(status, message, headers)
+
+    # ---------- GET ----------
+    def do_GET(self):
+        segments, query = self._route()
+        server = self.server
+        if segments == ["health"]:
+            pool = server.pool
+            return self._send_json(HTTPStatus.OK, {
+                "ready": pool.ready.is_set() and len(pool.load_errors) < len(pool.threads),
+                "model": pool.model_name,
+                "device": pool.device,
+                "workers": len(pool.threads),
+                "busy": pool.busy,
+                "queued": pool.queue.qsize(),
+                "capacity": pool.queue.maxsize,
+                "load_errors": pool.load_errors,
+            })
+        if segments == ["jobs"]:
+            with server.jobs_lock:
+                jobs = list(server.jobs.values())
+            return self._send_json(HTTPStatus.OK, {"jobs": [j.describe() for j in jobs]})
+        if len(segments) < 2 or segments[0] != "jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+
+        job = self._job(segments[1])
+        if job is None:
+            return
+        if len(segments) == 2:
+            position = server.pool.position(job) if job.status == QUEUED else None
+            return self._send_json(HTTPStatus.OK, job.describe(position))
+        if segments[2] == "segments":
+            return self._segments(job, query)
+        if segments[2].startswith("result."):
+            return self._result(job, segments[2].split(".", 1)[1])
+        return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+
+    def _segments(self, job, query):
+        try:
+            since = max(int(query.get("since", 0)), 0)
+            wait = min(max(float(query.get("wait", 0)), 0.0), 60.0)
+        except ValueError:
+            return self._error(HTTPStatus.BAD_REQUEST, "since and wait must be numbers")
+        if query.get("stream", "0") not in ("0", "false", ""):
+            return self._stream_segments(job, since)
+        if wait:
+            segs, status = job.wait_for_segments(since, wait)
+        else:
+            with job.changed:
+                segs, status = job.segments[since:], job.status
+        self._send_json(HTTPStatus.OK, {"status": status, "segments": segs, "next": since + len(segs)})
+
+    def _stream_segments(self, job, since):
+        """Newline-delimited JSON over chunked transfer encoding until the job finishes"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(obj):
+            data = (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+            self.wfile.flush()
+
+        try:
+            while True:
+                segs, status = job.wait_for_segments(since, 15.0)
+                for seg in segs:
+                    send(dict(seg, index=since))
+                    since += 1
+                if job.finished and since >= len(job.segments):
+                    send({"event": status, "job": job.describe()})
+                    break
+                if not segs:
+                    send({"event": "heartbeat", "status": status})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _result(self, job, fmt):
+        if fmt not in core.OUTPUT_FORMATS:
+            return self._error(HTTPStatus.NOT_FOUND, f"unknown format {fmt}")
+        if job.status != DONE:
+            return self._error(HTTPStatus.CONFLICT, f"job is {job.status}")
+        path = job.results.get(fmt)
+        if path is None or not path.exists():
+            return self._error(HTTPStatus.NOT_FOUND, f"{fmt} was not produced by this server")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPES[fmt])
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        self.end_headers()
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, self.wfile, COPY_BLOCK)
+
+    # ---------- POST ----------
+    def do_POST(self):
+        segments, query = self._route()
+        if segments != ["jobs"]:
+            return self._refuse_body(HTTPStatus.NOT_FOUND, "unknown path")
+        server = self.server
+        if server.pool.queue.full():
+            # Refuse before reading a possibly large upload
+            return self._refuse_body(HTTPStatus.SERVICE_UNAVAILABLE, "job queue is full",
+                                     {"Retry-After": "30"})
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            return self._refuse_body(HTTPStatus.LENGTH_REQUIRED, "Content-Length is required")
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            return self._refuse_body(HTTPStatus.BAD_REQUEST, "Content-Length must be a non-negative integer")
+        content_type = self.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+
+        if content_type == "application/json":
+            if length > 1024 * 1024:
+                return self._refuse_body(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "JSON body too large")
+            try:
+                options = json.loads(self.rfile.read(length) or b"{}")
+                path = Path(options["path"])
+                options["params"] = coerce_params(options.get("params", {}))
+            except (ValueError, KeyError, TypeError) as e:
+                return self._error(HTTPStatus.BAD_REQUEST, f"invalid job request: {e}")
+            if not server.path_allowed(path):
+                return self._error(HTTPStatus.FORBIDDEN, f"{path} is not under an --allow-path directory")
+            if not path.is_file():
+                return self._error(HTTPStatus.BAD_REQUEST, f"{path} is not a file")
+            job = server.new_job(path, path.name, options)
+        elif content_type.startswith("multipart/"):
+            return self._refuse_body(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                                     "send the audio as the raw request body")
+        else:
+            if length > server.max_upload_bytes:
+                return self._refuse_body(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                         f"upload exceeds {server.max_upload_bytes} bytes")
+            try:
+                options = {k: query[k] for k in ("language", "keyword") if k in query}
+                options["params"] = coerce_params(query)
+            except ValueError as e:
+                return self._refuse_body(HTTPStatus.BAD_REQUEST, f"invalid parameter: {e}")
+            filename = Path(query.get("filename", "upload.wav")).name or "upload.wav"
+            job_id = uuid.uuid4().hex[:12]
+            work_dir = server.spool_dir / job_id
+            work_dir.mkdir(parents=True)
+            audio_path = work_dir / filename
+            if not self._receive(audio_path, length):
+                shutil.rmtree(work_dir, ignore_errors=True)
+                return
+            job = server.new_job(audio_path, filename, options, job_id=job_id)
+
+        job.work_dir.mkdir(parents=True, exist_ok=True)
+        if not server.accept(job):
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            return self._error(HTTPStatus.SERVICE_UNAVAILABLE, "job queue is full", {"Retry-After": "30"})
+        self._send_json(HTTPStatus.ACCEPTED, job.describe(server.pool.position(job)),
+                        {"Location": f"/jobs/{job.id}"})
+
+    def _receive(self, path, length):
+        """Stream the request body to path in blocks so uploads never sit in memory"""
+        remaining = length
+        with open(path, 'wb') as f:
+            while remaining > 0:
+                block = self.rfile.read(min(COPY_BLOCK, remaining))
+                if not block:
+                    self.close_connection = True
+                    return False
+                f.write(block)
+                remaining -= len(block)
+        return True
+
+    # ---------- DELETE ----------
+    def do_DELETE(self):
+        segments, _ = self._route()
+        if len(segments) != 2 or segments[0] != "jobs":
+            return self._error(HTTPStatus.NOT_FOUND, "unknown path")
+        job = self._job(segments[1])
+        if job is None:
+            return
+        # Checked and set under the job's lock, which a worker also takes to claim it
+        if job.cancel() == RUNNING:
+            return self._error(HTTPStatus.CONFLICT, "a running job cannot be cancelled")
+        with self.server.jobs_lock:
+            self.server.forget(job)
+        self._send_json(HTTPStatus.OK, {"id": job.id, "status": job.status})
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Transcription.py",
+        description="Serve a local HTTP API for transcription jobs")
+    parser.add_argument("--serve", action="store_true", required=True)
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (default: localhost only)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="worker threads, each with its own loaded model")
+    parser.add_argument("--queue-size", type=int, default=16, help="queued jobs accepted before answering 503")
+    parser.add_argument("--max-upload-mb", type=int, default=2048)
+    parser.add_argument("--spool", default=None, help="directory for uploads and results (default: a temp dir)")
+    parser.add_argument("--keep-jobs", type=int, default=200, help="finished jobs kept for download")
+    parser.add_argument("--allow-path", action="append", default=[], metavar="DIR",
+                        help="directory whose files JSON jobs may name by path (repeatable; default: none)")
+    add_transcription_args(parser, file_options=False)
+    parser.set_defaults(formats=",".join(core.OUTPUT_FORMATS))
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    formats = parse_formats(parser, args.formats)
+    if args.workers < 1 or args.queue_size < 1:
+        print("--workers and --queue-size must be at least 1", file=sys.stderr)
+        return EXIT_USAGE
+
+    if not core.setup_pytorch_path():
+        print("PyTorch/Whisper not installed, please run PyTorch Downloader first", file=sys.stderr)
+        return EXIT_NO_WHISPER
+    device = core.default_device() if args.device == "auto" else args.device
+
+    pool = WorkerPool(args.workers, args.model, device, formats, args.queue_size, args.chunk_minutes * 60,
+                      cache=open_cache(args), metrics=open_metrics(args))
+    server = TranscriptionServer((args.host, args.port), pool,
+                                 spool_dir=args.spool,
+                                 max_upload_bytes=args.max_upload_mb * 1024 * 1024,
+                                 keep_jobs=args.keep_jobs,
+                                 language=args.language,
+                                 keyword=args.keyword,
+                                 params=params_from_args(args),
+                                 allowed_roots=args.allow_path)
+    pool.start()
+    print(f"Loading '{args.model}' on {device} in {args.workers} worker(s); serving on {server.url}",
+          file=sys.__stdout__, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    finally:
+        server.server_close()
+        pool.stop()
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""What is installed in a PyTorch runtime folder, and whether it still matches a download request.
+
+PyTorch_Downloader writes pytorch_whisper_installed.json after every install: the variant
+(cpu/cuda), index URL, Python version, platform tag, slim flag, the requested packages and the
+version of every distribution found in the target. A repeated download compares the new
+request against that record and the RECORD file of each installed distribution, so a
+healthy install is left alone and only damaged or missing distributions are reinstalled.
+
+Hashing every file of a CUDA build of torch takes a while, so by default only files
+modified after the recorded install time are hashed; all others are checked by size.
+`deep` hashes everything:
+
+    python install_state.py --deep                  # the active runtime
+    python install_state.py pytorch_runtimes/cpu
+"""
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+
+from wheel_store import normalize_project
+
+INSTALL_INFO_NAME = "pytorch_whisper_installed.json"
+# Fields of the request that must match exactly; any difference means a full reinstall
+REQUEST_FIELDS = ("variant", "index_url", "python", "platform", "slim")
+# Value of a field missing from records written before it existed
+FIELD_DEFAULTS = {"slim": False}
+HASH_BLOCK = 1024 * 1024
+
+
+def python_version():
+    return f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def installed_distributions(target):
+    """{normalized project: (version, dist-info path)} of the distributions in target"""
+    dists = {}
+    for info in Path(target).glob("*.dist-info"):
+        name, _, version = info.name[:-len(".dist-info")].rpartition("-")
+        dists[normalize_project(name)] = (version, info)
+    return dists
+
+
+def record_hash(path):
+    """Hash of a file in the form RECORD uses: sha256=<urlsafe base64 without padding>"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return "sha256=" + base64.urlsafe_b64encode(digest.digest()).rstrip(b"=").decode("ascii")
+
+
+def check_record(target, dist_info, trusted_before=None):
+    """Files of one distribution that are missing or differ from its RECORD.
+    Files not modified after trusted_before (a timestamp) are only checked by size.
+    Returns (problems, files checked)."""
+    record = Path(dist_info) / "RECORD"
+    if not record.exists():
+        return [f"{record.name} missing"], 0
+    problems = []
+    checked = 0
+    with open(record, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 3 or not row[1]:
+                continue                    # RECORD itself and .pyc files carry no hash
+            path, expected, size = row[0], row[1], row[2]
+            if path.startswith(".."):
+                continue                    # console scripts, placed outside the target
+            full = Path(target) / path
+            checked += 1
+            try:
+                st = full.stat()
+            except OSError:
+                problems.append(f"{path} missing")
+                continue
+            if size and st.st_size != int(size):
+                problems.append(f"{path} size {st.st_size} != {size}")
+            elif (trusted_before is None or st.st_mtime > trusted_before) and record_hash(full) != expected:
+                problems.append(f"{path} hash mismatch")
+    return problems, checked
+
+
+def read_install_info(target):
+    path = Path(target) / INSTALL_INFO_NAME
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_install_info(target, request, **extra):
+    """Record request and the versions now installed in target; returns the record"""
+    info = {
+        "version": request.get("variant"),      # kept for older readers of this file
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "installed_at": time.time(),
+        "python_full": sys.version.split()[0],
+        **{field: request.get(field) for field in REQUEST_FIELDS},
+        "requested": sorted(normalize_project(p) for p in request.get("packages", [])),
+        "packages": {name: version for name, (version, _) in sorted(installed_distributions(target).items())},
+        **extra,
+    }
+    with open(Path(target) / INSTALL_INFO_NAME, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+def update_install_info(target, **fields):
+    """Add or replace fields of the existing record (e.g. after a later step of the install)"""
+    info = read_install_info(target) or {}
+    info.update(fields)
+    with open(Path(target) / INSTALL_INFO_NAME, 'w', encoding='utf-8') as f:
+        json.dump(info, f, indent=2)
+    return info
+
+
+class InstallCheck:
+    """Result of comparing target against a request"""
+
+    def __init__(self, mismatch=None, missing=(), damaged=(), files=0, seconds=0.0):
+        self.mismatch = mismatch            # why everything must be reinstalled, or None
+        self.missing = list(missing)        # requested projects that are not installed
+        self.damaged = list(damaged)        # (project, recorded version, first problem)
+        self.files = files
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        return self.mismatch is None and not self.missing and not self.damaged
+
+    def describe(self):
+        if self.mismatch:
+            return self.mismatch
+        parts = [f"{len(self.damaged)} damaged"] if self.damaged else []
+        if self.missing:
+            parts.append(f"missing {', '.join(self.missing)}")
+        return "; ".join(parts) or f"{self.files} files match"
+
+
+def check_installation(target, request, deep=False):
+    """Compare target with request ({variant, index_url, python, platform, slim, packages})"""
+    started = time.perf_counter()
+    info = read_install_info(target)
+    if info is None:
+        return InstallCheck(f"no {INSTALL_INFO_NAME} in {target}")
+    if "packages" not in info:
+        return InstallCheck("installed by an older downloader")
+    for field in REQUEST_FIELDS:
+        recorded = info.get(field, FIELD_DEFAULTS.get(field))
+        if recorded != request.get(field, FIELD_DEFAULTS.get(field)):
+            return InstallCheck(f"{field} changed: {recorded} -> {request.get(field)}")
+
+    on_disk = installed_distributions(target)
+    trusted_before = None if deep else info.get("installed_at")
+    damaged, files = [], 0
+    for name, version in info["packages"].items():
+        if name not in on_disk:
+            damaged.append((name, version, "not installed"))
+            continue
+        disk_version, dist_info = on_disk[name]
+        if disk_version != version:
+            damaged.append((name, version, f"version {disk_version} installed"))
+            continue
+        problems, checked = check_record(target, dist_info, trusted_before)
+        files += checked
+        if problems:
+            damaged.append((name, version, problems[0]))
+
+    missing = sorted({normalize_project(p) for p in request.get("packages", [])}
+                     - set(on_disk) - set(info["packages"]))
+    return InstallCheck(None, missing, damaged, files, time.perf_counter() - started)
+
+
+def main(argv=None):
+    from runtimes import active_runtime     # runtimes imports this module
+
+    parser = argparse.ArgumentParser(description="Check a PyTorch runtime against the RECORD of every installed package")
+    parser.add_argument("target", nargs="?", help="runtime folder (default: the active runtime, see runtimes.py)")
+    parser.add_argument("--deep", action="store_true", help="hash every file, not only recently modified ones")
+    args = parser.parse_args(argv)
+    args.target = args.target or str(active_runtime())
+
+    info = read_install_info(args.target)
+    if info is None:
+        print(f"error: no {INSTALL_INFO_NAME} in {args.target}", file=sys.stderr)
+        return 1
+    request = {field: info.get(field) for field in REQUEST_FIELDS}
+    request["packages"] = info.get("requested", [])
+    check = check_installation(args.target, request, deep=args.deep)
+    for name, version, problem in check.damaged:
+        print(f"{name} {version}: {problem}")
+    print(f"{'OK' if check.ok else 'NOT OK'}: {check.describe()} ({check.seconds:.1f}s)")
+    return 0 if check.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
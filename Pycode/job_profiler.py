@@ -0,0 +1,148 @@
+"""Profile one transcription job and save the profile next to its outputs.
+
+Two modes:
+  cprofile  deterministic, every Python call of the job's thread; <base>.prof opens in
+            `python -m pstats` or snakeviz. Adds noticeable overhead to Python-heavy code.
+  sample    a background thread reads the job thread's stack every few milliseconds;
+            low overhead, so it suits hour-long files. <base>.folded holds collapsed
+            stacks for flamegraph.pl or speedscope.
+Both also write <base>.profile.txt, a plain-text summary of the hottest functions.
+"""
+import collections
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+
+PROFILE_MODES = ("cprofile", "sample")
+SAMPLE_INTERVAL = 0.005
+SUMMARY_LINES = 40
+
+
+class SamplingProfiler:
+    """Counts the stacks of one thread, sampled every interval seconds"""
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def summary(self, limit=SUMMARY_LINES):
+        own = collections.Counter()
+        inclusive = collections.Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        total = self.samples or 1
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "",
+                 "  self%  total%  function (by self time)"]
+        lines += [f"{100.0 * n / total:7.1f} {100.0 * inclusive[label] / total:7.1f}  {label}"
+                  for label, n in own.most_common(limit)]
+        lines += ["", " total%  function (by inclusive time)"]
+        lines += [f"{100.0 * n / total:7.1f}  {label}" for label, n in inclusive.most_common(limit)]
+        return "\n".join(lines)
+
+
+class JobProfile:
+    """Context manager that profiles the calling thread and saves the result under base_path.
+    After the block, paths lists the files written (also when the job raised)."""
+
+    def __init__(self, mode, base_path, interval=SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode {mode!r} (use {' or '.join(PROFILE_MODES)})")
+        self.mode = mode
+        self.base_path = str(base_path)
+        self.interval = interval
+        self.paths = []
+        self._profiler = None
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = SamplingProfiler(interval=self.interval)
+            self._profiler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.mode == "cprofile":
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        wall = time.perf_counter() - self._started
+        try:
+            self.paths = self._save(wall, exc)
+        except OSError as e:
+            print(f"Saving the profile failed: {e}", file=sys.stderr)
+        return False
+
+    def _save(self, wall, exc):
+        directory = os.path.dirname(self.base_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = [f"profile of {os.path.basename(self.base_path)} ({self.mode}), {wall:.1f}s wall time"]
+        if exc is not None:
+            header.append(f"the job failed: {exc}")
+
+        if self.mode == "cprofile":
+            data_path = self.base_path + ".prof"
+            self._profiler.dump_stats(data_path)
+            out = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=out).strip_dirs()
+            stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            stats.sort_stats("tottime").print_stats(SUMMARY_LINES // 2)
+            body = out.getvalue()
+        else:
+            data_path = self.base_path + ".folded"
+            self._profiler.write_folded(data_path)
+            body = self._profiler.summary()
+
+        text_path = self.base_path + ".profile.txt"
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(header) + "\n\n" + body + "\n")
+        return [data_path, text_path]
@@ -0,0 +1,273 @@
+"""Persistent transcription job queue (SQLite) with priorities and retry state"""
+import argparse
+import contextlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_QUEUE_PATH = Path.home() / ".cache" / "whisper_transcription" / "jobs.sqlite3"
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           INTEGER PRIMARY KEY,
+    path         TEXT UNIQUE NOT NULL,
+    size         INTEGER,
+    mtime        REAL,
+    priority     INTEGER NOT NULL DEFAULT 0,
+    status       TEXT NOT NULL DEFAULT 'queued',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    not_before   REAL NOT NULL DEFAULT 0,
+    last_error   TEXT,
+    outputs      TEXT,
+    worker       TEXT,
+    enqueued_at  TEXT,
+    started_at   TEXT,
+    finished_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, id);
+"""
+
+JOB_COLUMNS = ("id", "path", "size", "mtime", "priority", "status", "attempts", "max_attempts",
+               "not_before", "last_error", "outputs", "worker", "enqueued_at", "started_at", "finished_at")
+
+
+def _now_text():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class JobQueue:
+    """One row per audio file. Jobs run highest priority first, then in enqueue order.
+    A failed job is retried with exponential backoff until max_attempts is reached."""
+
+    def __init__(self, db_path=DEFAULT_QUEUE_PATH, retry_delay=30.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.retry_delay = retry_delay
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job["outputs"] = json.loads(job["outputs"]) if job["outputs"] else []
+        return job
+
+    # ---------- producers ----------
+    def enqueue(self, path, priority=0, size=None, mtime=None, max_attempts=3, force=False):
+        """Queue path for transcription and return the job id.
+        Returns None when the same file (unchanged size and mtime) is already known,
+        so rescanning a folder or restarting the service does not redo finished work."""
+        path = str(Path(path).absolute())
+        if size is None or mtime is None:
+            st = Path(path).stat()
+            size, mtime = st.st_size, st.st_mtime
+
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute("SELECT id, size, mtime, status FROM jobs WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                cur = conn.execute(
+                    "INSERT INTO jobs (path, size, mtime, priority, max_attempts, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, size, mtime, priority, max_attempts, _now_text())
+                )
+                return cur.lastrowid
+
+            job_id, old_size, old_mtime, status = row
+            if not force and (old_size, old_mtime) == (size, mtime):
+                return None
+            if status == RUNNING:
+                # The file changed under a running job; that job will finish with stale data,
+                # so leave it and let the next scan pick the new version up
+                return None
+            conn.execute(
+                "UPDATE jobs SET size = ?, mtime = ?, priority = ?, status = 'queued', attempts = 0, "
+                "max_attempts = ?, not_before = 0, last_error = NULL, outputs = NULL, worker = NULL, "
+                "enqueued_at = ?, started_at = NULL, finished_at = NULL WHERE id = ?",
+                (size, mtime, priority, max_attempts, _now_text(), job_id)
+            )
+            return job_id
+
+    # ---------- consumers ----------
+    def claim(self, worker=""):
+        """Atomically take the next runnable job (highest priority, oldest first) and mark it running"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' AND not_before <= ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                "started_at = ?, finished_at = NULL WHERE id = ?",
+                (worker, _now_text(), row[0])
+            )
+            return self._job(conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (row[0],)).fetchone())
+
+    def complete(self, job_id, outputs=()):
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', last_error = NULL, outputs = ?, finished_at = ? WHERE id = ?",
+                (json.dumps([str(o) for o in outputs]), _now_text(), job_id)
+            )
+
+    def fail(self, job_id, error, retry=True):
+        """Record a failure; the job is queued again after a backoff unless attempts are used up.
+        Returns the new status."""
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                status = QUEUED
+                not_before = time.time() + self.retry_delay * 2 ** max(attempts - 1, 0)
+            else:
+                status, not_before = FAILED, 0
+            conn.execute(
+                "UPDATE jobs SET status = ?, not_before = ?, last_error = ?, finished_at = ? WHERE id = ?",
+                (status, not_before, str(error), _now_text(), job_id)
+            )
+            return status
+
+    def release(self, job_id):
+        """Put a running job back without counting the attempt (clean shutdown mid-job)"""
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "started_at = NULL WHERE id = ? AND status = 'running'",
+                (job_id,)
+            )
+
+    def recover(self, host=None):
+        """Requeue jobs left 'running' by a process that died; the lost run still counts as an attempt.
+        Jobs that have used up their attempts are marked failed. With host, only that machine's
+        workers are recovered. Returns the number of jobs touched."""
+        where, args = "status = 'running'", ()
+        if host is not None:
+            where, args = where + " AND worker LIKE ?", (f"{host}:%",)
+        with self._write_lock, self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                "last_error = COALESCE(last_error, 'interrupted'), worker = NULL "
+                f"WHERE {where}", args
+            )
+            return cur.rowcount
+
+    # ---------- maintenance ----------
+    def retry(self, job_ids=None):
+        """Queue failed jobs again with fresh attempts; all failed jobs when job_ids is None"""
+        with self._write_lock, self._connect() as conn:
+            sql = "UPDATE jobs SET status = 'queued', attempts = 0, not_before = 0 WHERE status = 'failed'"
+            if job_ids is None:
+                return conn.execute(sql).rowcount
+            return sum(conn.execute(sql + " AND id = ?", (i,)).rowcount for i in job_ids)
+
+    def set_priority(self, job_id, priority):
+        with self._write_lock, self._connect() as conn:
+            return conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, job_id)).rowcount
+
+    def purge(self, status=DONE):
+        with self._write_lock, self._connect() as conn:
+            return conn.execute("DELETE FROM jobs WHERE status = ?", (status,)).rowcount
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            return self._job(conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def jobs(self, status=None, limit=100):
+        """Jobs in run order (pending first by priority, then the rest newest first)"""
+        sql = f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs"
+        args = ()
+        if status:
+            sql += " WHERE status = ?"
+            args = (status,)
+        sql += (" ORDER BY CASE status WHEN 'running' THEN 0 WHEN 'queued' THEN 1 ELSE 2 END, "
+                "CASE WHEN status IN ('running', 'queued') THEN -priority ELSE 0 END, "
+                "CASE WHEN status IN ('running', 'queued') THEN id ELSE -id END LIMIT ?")
+        with self._connect() as conn:
+            return [self._job(row) for row in conn.execute(sql, args + (limit,))]
+
+    def counts(self):
+        with self._connect() as conn:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            counts.update(dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")))
+            return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and manage the transcription job queue")
+    parser.add_argument("--db", default=str(DEFAULT_QUEUE_PATH), help="queue database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="show jobs in run order")
+    p_list.add_argument("--status", choices=[QUEUED, RUNNING, DONE, FAILED])
+    p_list.add_argument("--limit", type=int, default=50)
+
+    p_add = sub.add_parser("add", help="queue audio files")
+    p_add.add_argument("files", nargs="+")
+    p_add.add_argument("--priority", type=int, default=0)
+    p_add.add_argument("--force", action="store_true", help="queue again even if already transcribed")
+
+    p_retry = sub.add_parser("retry", help="queue failed jobs again (all when no ids are given)")
+    p_retry.add_argument("ids", nargs="*", type=int)
+
+    p_prio = sub.add_parser("priority", help="change the priority of a job")
+    p_prio.add_argument("id", type=int)
+    p_prio.add_argument("priority", type=int)
+
+    sub.add_parser("purge", help="delete finished jobs")
+
+    args = parser.parse_args(argv)
+    jq = JobQueue(args.db)
+
+    if args.command == "list":
+        for job in jq.jobs(args.status, args.limit):
+            line = (f"{job['id']:>6}  {job['status']:<8} p={job['priority']:<3} "
+                    f"try {job['attempts']}/{job['max_attempts']}  {job['path']}")
+            if job["last_error"] and job["status"] != DONE:
+                line += f"  ({job['last_error']})"
+            print(line)
+        counts = jq.counts()
+        print(", ".join(f"{k} {v}" for k, v in counts.items()))
+    elif args.command == "add":
+        for f in args.files:
+            job_id = jq.enqueue(f, priority=args.priority, force=args.force)
+            print(f"{f}: {'job ' + str(job_id) if job_id else 'already queued or done'}")
+    elif args.command == "retry":
+        print(f"requeued {jq.retry(args.ids or None)} jobs")
+    elif args.command == "priority":
+        if not jq.set_priority(args.id, args.priority):
+            print(f"no job {args.id}", file=sys.stderr)
+            return 1
+    elif args.command == "purge":
+        print(f"removed {jq.purge()} finished jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
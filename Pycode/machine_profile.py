@@ -0,0 +1,233 @@
+"""Hardware microbenchmarks and the machine profile Transcription takes its defaults from.
+
+check_in_exe runs these against the active PyTorch runtime and writes
+~/.cache/whisper_transcription/machine_profile.json:
+  - imports: seconds to import torch and whisper, and the slowest modules;
+  - matmul: fp32 GFLOPS on the CPU at 1 thread, half and all logical CPUs (plus fp32 and
+    fp16 on CUDA);
+  - log_mel: seconds of audio turned into a log-mel spectrogram per second;
+  - models: for every checkpoint that is on disk and verified, its load time and one
+    encoder pass over a 30 s window and one incremental decoder step at the default
+    beam size, from which a real-time factor is estimated;
+  - defaults: device, torch threads, fp16 and model chosen from the numbers above.
+
+Transcription uses "defaults" only while the profile still describes the machine and the
+runtime it loaded (same CPU count and torch version); re-run check_in_exe after changing
+either.
+"""
+import functools
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+PROFILE_PATH = Path.home() / ".cache" / "whisper_transcription" / "machine_profile.json"
+PROFILE_VERSION = 1
+
+MATMUL_SIZE = 1024
+MIN_SECONDS = 0.3               # each measurement repeats its work for at least this long
+WINDOW_SECONDS = 30             # whisper decodes audio in 30 s windows
+# Tokens decoded per 30 s window of speech; Japanese runs higher than English
+TOKENS_PER_WINDOW = 120
+# Largest real-time factor (processing time / audio time) a default model may have
+TARGET_REALTIME_FACTOR = 1.0
+# Fewer threads are preferred when they reach this share of the best GFLOPS
+THREADS_TOLERANCE = 0.95
+# fp16 becomes the default on CUDA when its matmul is at least this much faster than fp32
+FP16_SPEEDUP = 1.5
+# A model pass is repeated (best time kept) while the passes so far took less than this,
+# so small models are not timed cold; one pass of a large model is enough
+WARM_SECONDS = 1.0
+DECODER_STEPS = 4
+
+
+def thread_counts():
+    """Thread counts worth measuring: one, half the logical CPUs (the physical cores on
+    machines with SMT) and all of them"""
+    cpus = os.cpu_count() or 1
+    return sorted({1, max(1, cpus // 2), cpus})
+
+
+def _sync(torch, device):
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+
+def _repeat(call, sync):
+    """(calls, seconds) of repeating call() for at least MIN_SECONDS, after one warm-up call"""
+    call()
+    sync()
+    calls, start = 0, time.perf_counter()
+    while True:
+        call()
+        calls += 1
+        sync()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return calls, elapsed
+
+
+def _best_time(call, sync, max_calls):
+    """Fastest of up to max_calls timed calls, stopping once WARM_SECONDS have been spent"""
+    best, spent = None, 0.0
+    for _ in range(max_calls):
+        start = time.perf_counter()
+        call()
+        sync()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        spent += elapsed
+        if spent >= WARM_SECONDS:
+            break
+    return best
+
+
+def bench_matmul(torch, device="cpu", dtype=None, threads=None, size=MATMUL_SIZE):
+    """GFLOPS of a size x size matrix product"""
+    previous = torch.get_num_threads()
+    if threads:
+        torch.set_num_threads(threads)
+    try:
+        a = torch.randn(size, size, device=device, dtype=dtype or torch.float32)
+        b = torch.randn(size, size, device=device, dtype=dtype or torch.float32)
+        calls, seconds = _repeat(lambda: a @ b, lambda: _sync(torch, device))
+    finally:
+        torch.set_num_threads(previous)
+    return round(2 * size ** 3 * calls / seconds / 1e9, 1)
+
+
+def bench_log_mel(whisper, torch, device="cpu"):
+    """Seconds of audio per second turned into an 80-bin log-mel spectrogram"""
+    audio = torch.randn(WINDOW_SECONDS * whisper.audio.SAMPLE_RATE, device=device) * 0.1
+    calls, seconds = _repeat(lambda: whisper.log_mel_spectrogram(audio), lambda: _sync(torch, device))
+    return round(WINDOW_SECONDS * calls / seconds, 1)
+
+
+def bench_model(whisper, torch, path, device="cpu", beam_size=5, fp16=False):
+    """Load time of a checkpoint, an encoder pass over 30 s and an incremental decoder step
+    with beam_size hypotheses (after the prompt is in the key/value cache). Returns a dict
+    with the estimated real-time factor."""
+    start = time.perf_counter()
+    model = whisper.load_model(str(path), device=device)
+    _sync(torch, device)
+    result = {"load_s": round(time.perf_counter() - start, 2)}
+    dtype = torch.float16 if fp16 and device == "cuda" else torch.float32
+    try:
+        mel = whisper.log_mel_spectrogram(torch.zeros(WINDOW_SECONDS * whisper.audio.SAMPLE_RATE),
+                                          n_mels=model.dims.n_mels)
+        mel = mel.unsqueeze(0).to(device=device, dtype=dtype)
+        tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual,
+                                                    num_languages=getattr(model, "num_languages", 99))
+        sync = functools.partial(_sync, torch, device)
+        with torch.no_grad():
+            features = []
+            result["encoder_s"] = round(_best_time(lambda: features.append(model.encoder(mel)), sync, 3), 3)
+
+            audio = features[-1].repeat(beam_size, 1, 1)
+            tokens = torch.tensor([list(tokenizer.sot_sequence)] * beam_size, device=device)
+            cache, hooks = model.install_kv_cache_hooks()
+            try:
+                logits = model.decoder(tokens, audio, kv_cache=cache)
+                next_tokens = logits[:, -1].argmax(dim=-1, keepdim=True)
+
+                def step():
+                    # Each step appends one token to the cache, as during decoding
+                    model.decoder(next_tokens, audio, kv_cache=cache)
+
+                step()
+                sync()
+                result["decoder_step_s"] = round(_best_time(step, sync, DECODER_STEPS), 4)
+            finally:
+                for hook in hooks:
+                    hook.remove()
+    finally:
+        model = None
+        if device == "cuda":
+            torch.cuda.empty_cache()
+    window = result["encoder_s"] + TOKENS_PER_WINDOW * result["decoder_step_s"]
+    result["realtime_factor"] = round(window / WINDOW_SECONDS, 3)
+    return result
+
+
+def _cpu_gflops(profile):
+    return {int(t): g for t, g in profile.get("matmul", {}).get("cpu_fp32", {}).items()}
+
+
+def choose_device(profile):
+    """"cuda" when CUDA is available and its fp32 matmul beats the CPU's best, else "cpu" """
+    cuda = profile.get("cuda") or {}
+    if not cuda.get("available"):
+        return "cpu"
+    return "cuda" if cuda.get("fp32_gflops", 0) > max(_cpu_gflops(profile).values(), default=0) else "cpu"
+
+
+def use_fp16(profile):
+    """fp16 on CUDA when its matmul is at least FP16_SPEEDUP times faster than fp32"""
+    cuda = profile.get("cuda") or {}
+    return bool(choose_device(profile) == "cuda" and cuda.get("fp32_gflops")
+                and cuda.get("fp16_gflops", 0) >= cuda["fp32_gflops"] * FP16_SPEEDUP)
+
+
+def choose_defaults(profile, model_order):
+    """Device, torch threads, fp16 and model for Transcription from a measured profile.
+    model_order lists the models from least to most accurate. The device is only given
+    when CUDA was available to compare against; without it Transcription keeps deciding
+    from torch.cuda.is_available() (a GPU or driver added later is then still used)."""
+    defaults = {}
+    device = choose_device(profile)
+    if (profile.get("cuda") or {}).get("available"):
+        defaults["device"] = device
+
+    cpu_gflops = _cpu_gflops(profile)
+    if cpu_gflops:
+        best = max(cpu_gflops.values())
+        defaults["threads"] = min(t for t, g in cpu_gflops.items() if g >= best * THREADS_TOLERANCE)
+    defaults["fp16"] = use_fp16(profile)
+
+    measured = [name for name in model_order
+                if profile.get("models", {}).get(name, {}).get("device") == device]
+    if measured:
+        fast_enough = [name for name in measured
+                       if profile["models"][name]["realtime_factor"] <= TARGET_REALTIME_FACTOR]
+        defaults["model"] = fast_enough[-1] if fast_enough else min(
+            measured, key=lambda name: profile["models"][name]["realtime_factor"])
+    return defaults
+
+
+def machine_info():
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "system": f"{platform.system()} {platform.release()}",
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def save_profile(profile, path=PROFILE_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_profile(path=PROFILE_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return profile if profile.get("version") == PROFILE_VERSION else None
+
+
+def profile_defaults(torch, path=PROFILE_PATH):
+    """The profile's defaults when it was measured on this machine with this torch, else {}"""
+    profile = load_profile(path)
+    if (not profile or profile.get("machine", {}).get("cpu_count") != os.cpu_count()
+            or profile.get("torch") != getattr(torch, "__version__", None)):
+        return {}
+    return profile.get("defaults", {})
@@ -0,0 +1,297 @@
+"""Process memory tracking per stage, a pre-flight estimate of a job's peak memory, and
+a budget that adapts the job (smaller chunks, then streaming decode) or refuses it
+before anything is loaded, instead of running out of memory halfway through.
+
+The estimate is deliberately simple and errs on the high side. Its terms:
+  - runtime: Python, PyTorch and whisper themselves;
+  - model: fp32 weights on CPU, plus the fp16 checkpoint that is held while loading;
+  - activations: encoder attention and the decoder's key/value cache;
+  - audio: the whole file as float32 (16 kHz), with int16 and float copies while it is decoded;
+  - mel: whisper computes the log-mel spectrogram of a whole chunk at once, including
+    a complex STFT of 201 bins at 100 frames per second, so it grows with chunk length.
+"""
+import contextlib
+import os
+import re
+import sys
+import threading
+import tracemalloc
+
+from transcription_core import SAMPLE_RATE
+
+MB = 1024 ** 2
+GB = 1024 ** 3
+
+MODEL_PARAMETERS = {
+    "tiny": 39e6,
+    "base": 74e6,
+    "small": 244e6,
+    "medium": 769e6,
+    "large": 1550e6,
+    "large-v2": 1550e6,
+    "large-v3": 1550e6,
+    "large-v3-turbo": 809e6,
+}
+RUNTIME_BYTES = 600 * MB
+MIN_CHUNK_SECONDS = 5 * 60
+# Fraction of the memory available at start that the "auto" budget may use
+AUTO_BUDGET_SHARE = 0.9
+
+
+class MemoryBudgetError(RuntimeError):
+    """Raised before a job starts when it cannot fit the memory budget"""
+
+
+# ---------- process memory ----------
+def _windows_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+    psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return counters
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far"""
+    if sys.platform == "win32":
+        return _windows_counters().PeakWorkingSetSize
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024     # Linux reports KiB
+
+
+def current_rss_bytes():
+    """Resident set size of this process now (the peak on systems without a cheap probe)"""
+    if sys.platform == "win32":
+        return _windows_counters().WorkingSetSize
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def available_memory_bytes():
+    """Physical memory available to new allocations, or None if unknown"""
+    if sys.platform == "win32":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def format_bytes(n):
+    return f"{n / GB:.2f} GB" if n >= GB else f"{n / MB:.0f} MB"
+
+
+def parse_budget(value):
+    """'auto', '3.5G', '3500M' or a plain number of MB -> bytes, 'auto' or None"""
+    if value in (None, "", "none", "off"):
+        return None
+    if value == "auto":
+        return "auto"
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)b?\s*", str(value), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"invalid memory budget '{value}' (use e.g. 3.5G, 3500M or auto)")
+    scale = {"": MB, "k": 1024, "m": MB, "g": GB, "t": 1024 * GB}[m.group(2).lower()]
+    return int(float(m.group(1)) * scale)
+
+
+# ---------- estimate and plan ----------
+def estimate_peak_bytes(model_name, duration, chunk_seconds, streaming=False, device="cpu", workers=1):
+    """Rough upper estimate of the job's peak RSS in bytes, and its parts.
+    workers > 1 counts one model and one chunk in flight per scheduler worker."""
+    params = MODEL_PARAMETERS.get(model_name, MODEL_PARAMETERS["large-v3"])
+    n_mels = 128 if model_name.startswith("large-v3") else 80
+    on_gpu = device == "cuda"
+    chunk = min(chunk_seconds, duration) if duration else chunk_seconds
+
+    weights = 0 if on_gpu else params * 4
+    load_peak = params * 6                      # fp32 model + fp16 checkpoint while loading
+    activations = 0 if on_gpu else params * 4 * 0.15 + 200 * MB
+    if streaming:
+        audio = chunk * SAMPLE_RATE * 10        # int16 + float copies of one chunk while decoding
+    else:
+        audio = duration * SAMPLE_RATE * 4 + chunk * SAMPLE_RATE * 6
+    mel = chunk * 100 * (201 * 12 + n_mels * 4) + chunk * SAMPLE_RATE * 4
+
+    parts = {
+        "runtime": RUNTIME_BYTES,
+        "model": max(weights, load_peak) * workers,
+        "activations": activations * workers,
+        "audio": audio * workers,
+        "mel": mel * workers,
+    }
+    running = RUNTIME_BYTES + (weights + activations + audio + mel) * workers
+    loading = RUNTIME_BYTES + weights * (workers - 1) + load_peak
+    return int(max(running, loading)), {k: int(v) for k, v in parts.items()}
+
+
+class MemoryPlan:
+    """How a job will run under the budget: chunk length, streaming decode, estimate"""
+
+    def __init__(self, chunk_seconds, streaming, estimate, parts, budget, fits=True, adjusted=None):
+        self.chunk_seconds = chunk_seconds
+        self.streaming = streaming
+        self.estimate = estimate
+        self.parts = parts
+        self.budget = budget
+        self.fits = fits
+        self.adjusted = adjusted or []          # human-readable changes made to fit the budget
+
+    def describe(self):
+        text = f"estimated peak {format_bytes(self.estimate)}"
+        if self.budget:
+            text += f" of {format_bytes(self.budget)} budget"
+        if self.adjusted:
+            text += f" ({'; '.join(self.adjusted)})"
+        return text
+
+    def as_dict(self):
+        return {
+            "estimate_bytes": self.estimate,
+            "budget_bytes": self.budget,
+            "chunk_seconds": self.chunk_seconds,
+            "streaming": self.streaming,
+            "adjusted": self.adjusted,
+        }
+
+
+def resolve_budget(budget):
+    """Bytes for a parse_budget() value; "auto" becomes most of the memory available now"""
+    if budget == "auto":
+        available = available_memory_bytes()
+        return int(available * AUTO_BUDGET_SHARE) if available else None
+    return budget
+
+
+def plan_memory(model_name, duration, chunk_seconds, budget=None, device="cpu", enforce=True,
+                streaming=False, workers=1):
+    """Fit the job into budget bytes: first shorter chunks, then streaming decode.
+    Raises MemoryBudgetError when it cannot fit and enforce is set; otherwise the
+    returned plan has fits=False. streaming=True plans for a caller that always streams
+    (the batch scheduler), so only the chunk length can change."""
+    budget = resolve_budget(budget)
+    duration = duration or 0.0
+
+    estimate, parts = estimate_peak_bytes(model_name, duration, chunk_seconds, streaming, device, workers)
+    if budget is None or estimate <= budget:
+        return MemoryPlan(chunk_seconds, streaming, estimate, parts, budget)
+
+    candidates = []
+    chunk = chunk_seconds
+    while chunk / 2 >= MIN_CHUNK_SECONDS:
+        chunk /= 2
+        candidates.append((chunk, streaming))
+    if not streaming:
+        chunk = chunk_seconds
+        candidates.append((chunk, True))
+        while chunk / 2 >= MIN_CHUNK_SECONDS:
+            chunk /= 2
+            candidates.append((chunk, True))
+
+    for chunk, streams in candidates:
+        estimate, parts = estimate_peak_bytes(model_name, duration, chunk, streams, device, workers)
+        if estimate <= budget:
+            adjusted = []
+            if chunk != chunk_seconds:
+                adjusted.append(f"chunks shortened to {chunk / 60:g} min")
+            if streams and not streaming:
+                adjusted.append("streaming decode")
+            return MemoryPlan(chunk, streams, estimate, parts, budget, adjusted=adjusted)
+
+    plan = MemoryPlan(chunk, True, estimate, parts, budget, fits=False)
+    if enforce:
+        largest = max(parts, key=parts.get)
+        who = f"{workers} workers of '{model_name}'" if workers > 1 else f"'{model_name}'"
+        raise MemoryBudgetError(
+            f"{who} on {duration / 60:.1f} min of audio need about {format_bytes(estimate)} with streaming "
+            f"decode and {chunk / 60:g}-minute chunks, over the {format_bytes(budget)} budget "
+            f"(largest part: {largest} {format_bytes(parts[largest])}); raise the budget or use a smaller model")
+    return plan
+
+
+# ---------- measurement ----------
+class MemoryTracker:
+    """RSS before, after and at its peak during each stage (sampled on a background thread),
+    plus the peak of Python allocations (tracemalloc, which also sees numpy arrays) when
+    trace_python is set. tracemalloc slows allocation-heavy code, so it is opt-in."""
+
+    def __init__(self, trace_python=False, interval=0.05):
+        self.trace_python = trace_python
+        self.interval = interval
+        self.stages = {}
+        if trace_python and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        before = current_rss_bytes()
+        peak = [before]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(self.interval):
+                peak[0] = max(peak[0], current_rss_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        if self.trace_python:
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            done.set()
+            sampler.join()
+            after = current_rss_bytes()
+            info = {"rss_before": before, "rss_after": after, "rss_peak": max(peak[0], after)}
+            if self.trace_python:
+                info["python_peak"] = tracemalloc.get_traced_memory()[1]
+            self.stages[name] = info
+
+    def as_dict(self):
+        return {name: {k: round(v / MB, 1) for k, v in info.items()} for name, info in self.stages.items()}
+
+    def summary_line(self):
+        parts = []
+        for name, info in self.stages.items():
+            text = (f"{name.replace('_', ' ')} {format_bytes(info['rss_peak'])} peak "
+                    f"({(info['rss_after'] - info['rss_before']) / MB:+.0f} MB)")
+            if "python_peak" in info:
+                text += f", python {format_bytes(info['python_peak'])}"
+            parts.append(text)
+        return " | ".join(parts)
+
@@ -0,0 +1,350 @@
+"""Download Whisper checkpoints with parallel HTTP range requests, resume and SHA-256 check.
+
+whisper.load_model() downloads a missing checkpoint in a single stream at transcription
+time, starts over after an interrupted download, and re-reads the whole file to hash it on
+every load. Here the file is fetched in CHUNK_BYTES ranges by several threads into
+<name>.pt.part; <name>.pt.part.json records the finished ranges, so an interrupted
+download resumes where it stopped. The finished file is checked against the SHA-256 in
+the model URL before it is renamed into place, and its size and mtime are recorded in
+verified.json, so later checks are a stat() instead of a hash.
+
+Used by both programs; from the command line:
+    python model_fetcher.py fetch small --workers 8
+    python model_fetcher.py serve ./mirror --port 8765        # range-capable test server
+    python model_fetcher.py fetch tiny --base-url http://127.0.0.1:8765
+A mirror directory holds <sha256>/<file> like the official URLs; WHISPER_MODEL_MIRROR
+sets the base URL for both programs.
+"""
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+OFFICIAL_BASE_URL = "https://openaipublic.azureedge.net/main/whisper/models"
+# <sha256>/<file name> under the base URL, as in whisper._MODELS
+MODEL_URLS = {
+    "tiny": "65147644a518d12f04e32d6f3b26facc3f8dd46e5390956a9424a650c0ce22b9/tiny.pt",
+    "base": "ed3a0b6b1c0edf879ad9b11b1af5a0e6ab5db9205f891f668f8b0e6c6326e34e/base.pt",
+    "small": "9ecf779972d90ba49c06d968637d720dd632c55bbf19d441fb42bf17a411e794/small.pt",
+    "medium": "345ae4da62f9b3d59415adc60127b97c714f32e89e936602e85993674d08dcb1/medium.pt",
+    "large": "e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb/large-v3.pt",
+    "large-v2": "81f7c96c852ee8fc832187b0132e569d6c3065a3252ed18e56effd0b6a73e524/large-v2.pt",
+    "large-v3": "e5b1a55b89c1367dacf97e3e19bfd829a01529dbfdeefa8caeb59b3f1b81dadb/large-v3.pt",
+    "large-v3-turbo": "aff26ae408abcba5fbf8813c21e62b0941638c5f6eebfb145be0c9839262a19a/large-v3-turbo.pt",
+}
+MODEL_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "whisper"
+VERIFIED_NAME = "verified.json"
+CHUNK_BYTES = 16 * 1024 * 1024
+DEFAULT_WORKERS = 8
+READ_BLOCK = 1024 * 1024
+RETRIES = 3
+TIMEOUT = 30
+
+_index_lock = threading.Lock()
+
+
+class FetchError(RuntimeError):
+    """The model could not be downloaded or does not match its SHA-256"""
+
+
+def model_url(name, base_url=None):
+    base_url = base_url or os.getenv("WHISPER_MODEL_MIRROR") or OFFICIAL_BASE_URL
+    return f"{base_url.rstrip('/')}/{MODEL_URLS[name]}"
+
+
+def expected_sha256(name):
+    return MODEL_URLS[name].split("/")[0]
+
+
+def model_path(name, root=MODEL_DIR):
+    """Where whisper keeps the checkpoint (large is saved as large-v3.pt)"""
+    return Path(root) / MODEL_URLS[name].split("/")[-1]
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ---------- verified-state index ----------
+def _read_index(root):
+    try:
+        with open(Path(root) / VERIFIED_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _record_verified(path, sha256):
+    st = path.stat()
+    with _index_lock:
+        index = _read_index(path.parent)
+        index[path.name] = {"sha256": sha256, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        tmp = path.parent / (VERIFIED_NAME + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, path.parent / VERIFIED_NAME)
+
+
+def is_verified(name, root=MODEL_DIR):
+    """True when the checkpoint was verified and has not changed since (a stat, no hashing)"""
+    path = model_path(name, root)
+    entry = _read_index(root).get(path.name)
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    return (entry is not None and entry["sha256"] == expected_sha256(name)
+            and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns)
+
+
+def model_ready(name, root=MODEL_DIR):
+    """True when a good checkpoint is on disk. A file not in the index yet (e.g. downloaded
+    by whisper itself) is hashed once; a corrupt or truncated one counts as missing."""
+    if is_verified(name, root):
+        return True
+    path = model_path(name, root)
+    if not path.is_file():
+        return False
+    if sha256_file(path) != expected_sha256(name):
+        return False
+    _record_verified(path, expected_sha256(name))
+    return True
+
+
+# ---------- download ----------
+def _open(url, start=None, end=None):
+    request = urllib.request.Request(url, headers={"User-Agent": "whisper-transcription"})
+    if start is not None:
+        request.add_header("Range", f"bytes={start}-{end}")
+    return urllib.request.urlopen(request, timeout=TIMEOUT)
+
+
+def _probe(url):
+    """(total size, response) of a one-byte range request; response is the open 200
+    response when the server ignores ranges (the caller then streams it), else None"""
+    response = _open(url, 0, 0)
+    if response.status == 206:
+        match = re.search(r"/(\d+)$", response.headers.get("Content-Range", ""))
+        response.close()
+        if match:
+            return int(match.group(1)), None
+        raise FetchError(f"{url}: unexpected Content-Range {response.headers.get('Content-Range')}")
+    return int(response.headers.get("Content-Length") or 0), response
+
+
+class _Progress:
+    """Thread-safe byte counter that calls progress(done, total) at most every 0.2 s"""
+
+    def __init__(self, total, callback, done=0):
+        self.total = total
+        self.done = done
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def add(self, n):
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if self.callback and (now - self._last >= 0.2 or self.done >= self.total):
+                self._last = now
+                self.callback(self.done, self.total)
+
+
+def _fetch_range(url, part, start, end, progress):
+    for attempt in range(RETRIES):
+        written = 0
+        try:
+            with _open(url, start, end) as response, open(part, 'r+b') as f:
+                if response.status != 206:
+                    raise FetchError(f"{url}: range request answered with HTTP {response.status}")
+                f.seek(start)
+                for block in iter(lambda: response.read(READ_BLOCK), b""):
+                    f.write(block)
+                    written += len(block)
+                    progress.add(len(block))
+            if written != end - start + 1:
+                raise FetchError(f"{url}: short read for bytes {start}-{end}")
+            return
+        except (OSError, FetchError) as e:      # URLError and timeouts are OSErrors
+            progress.add(-written)
+            if attempt == RETRIES - 1:
+                raise FetchError(f"download of bytes {start}-{end} failed: {e}") from e
+            time.sleep(2 ** attempt)
+
+
+def _fetch_ranges(url, part, size, workers, progress_cb):
+    state_path = part.with_name(part.name + ".json")
+    state = {}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if (state.get("url") != url or state.get("size") != size or state.get("chunk") != CHUNK_BYTES
+            or not part.exists() or part.stat().st_size != size):
+        state = {"url": url, "size": size, "chunk": CHUNK_BYTES, "done": []}
+        with open(part, 'wb') as f:
+            f.truncate(size)
+    done = set(state["done"])
+    chunks = [i for i in range((size + CHUNK_BYTES - 1) // CHUNK_BYTES) if i not in done]
+    progress = _Progress(size, progress_cb, done=sum(min(CHUNK_BYTES, size - i * CHUNK_BYTES) for i in done))
+    lock = threading.Lock()
+
+    def fetch(i):
+        start = i * CHUNK_BYTES
+        _fetch_range(url, part, start, min(size, start + CHUNK_BYTES) - 1, progress)
+        with lock:
+            state["done"].append(i)
+            with open(state_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(fetch, i) for i in chunks]:
+            future.result()
+    return state_path
+
+
+def _fetch_stream(response, part, size, progress_cb):
+    """Single stream for servers without range support (no resume possible)"""
+    progress = _Progress(size, progress_cb)
+    with response, open(part, 'wb') as f:
+        for block in iter(lambda: response.read(READ_BLOCK), b""):
+            f.write(block)
+            progress.add(len(block))
+
+
+def fetch_model(name, root=MODEL_DIR, workers=DEFAULT_WORKERS, base_url=None, progress=None):
+    """Path of a verified checkpoint for name, downloading it first when needed.
+    progress(done_bytes, total_bytes) is called from the download threads."""
+    if name not in MODEL_URLS:
+        raise ValueError(f"unknown model {name!r} (choose from {', '.join(MODEL_URLS)})")
+    root = Path(root)
+    path = model_path(name, root)
+    if model_ready(name, root):
+        return path
+
+    root.mkdir(parents=True, exist_ok=True)
+    url = model_url(name, base_url)
+    part = path.with_name(path.name + ".part")
+    try:
+        size, response = _probe(url)
+    except urllib.error.URLError as e:
+        raise FetchError(f"cannot reach {url}: {e}") from e
+    if response is None:
+        state_path = _fetch_ranges(url, part, size, workers, progress)
+    else:
+        state_path = None
+        _fetch_stream(response, part, size, progress)
+
+    sha256 = sha256_file(part)
+    if state_path is not None:
+        state_path.unlink(missing_ok=True)
+    if sha256 != expected_sha256(name):
+        part.unlink(missing_ok=True)
+        raise FetchError(f"{path.name}: SHA-256 {sha256} does not match {expected_sha256(name)}; removed, please retry")
+    os.replace(part, path)
+    _record_verified(path, sha256)
+    return path
+
+
+# ---------- test server ----------
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler plus single-range GET support (bytes=a-b)"""
+
+    def send_head(self):
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if start > end:
+            self.send_error(416, "Requested Range Not Satisfiable")
+            return None
+        f = open(path, 'rb')
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self._remaining = end - start + 1
+        return f
+
+    def copyfile(self, source, outputfile):
+        remaining = getattr(self, "_remaining", None)
+        if remaining is None:
+            return super().copyfile(source, outputfile)
+        while remaining > 0:
+            block = source.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            outputfile.write(block)
+            remaining -= len(block)
+        self._remaining = None
+
+
+# ---------- command line ----------
+def _print_progress(done, total):
+    print(f"\r{done / 1024 ** 2:8.1f} / {total / 1024 ** 2:.1f} MB", end="", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download Whisper checkpoints in parallel, with resume and SHA-256 check")
+    sub = parser.add_subparsers(dest="command", required=True)
+    fetch = sub.add_parser("fetch")
+    fetch.add_argument("models", nargs="+", choices=list(MODEL_URLS))
+    fetch.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    fetch.add_argument("--root", default=str(MODEL_DIR))
+    fetch.add_argument("--base-url", help="mirror holding <sha256>/<file> (default: the official URL)")
+    check = sub.add_parser("check")
+    check.add_argument("models", nargs="+", choices=list(MODEL_URLS))
+    check.add_argument("--root", default=str(MODEL_DIR))
+    serve = sub.add_parser("serve")
+    serve.add_argument("directory")
+    serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        handler = lambda *a, **kw: RangeRequestHandler(*a, directory=args.directory, **kw)
+        with http.server.ThreadingHTTPServer(("127.0.0.1", args.port), handler) as server:
+            print(f"serving {args.directory} on http://127.0.0.1:{args.port}", flush=True)
+            server.serve_forever()
+        return 0
+    if args.command == "check":
+        ok = True
+        for name in args.models:
+            ready = model_ready(name, args.root)
+            ok &= ready
+            print(f"{name}: {'verified' if ready else 'missing or corrupt'} ({model_path(name, args.root)})")
+        return 0 if ok else 1
+
+    for name in args.models:
+        t0 = time.perf_counter()
+        try:
+            path = fetch_model(name, args.root, args.workers, args.base_url, progress=_print_progress)
+        except (FetchError, OSError) as e:
+            print(f"\nerror: {name}: {e}", file=sys.stderr)
+            return 1
+        print(f"\n{name}: {path} ({time.perf_counter() - t0:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Offline bundles for air-gapped machines: a single zip with every wheel installed in a
+PyTorch runtime, the embedded openai_whisper wheel, chosen Whisper model files and a
+manifest of SHA-256 hashes.
+
+Export the active runtime on a machine where the downloader has run (the wheels come from
+its wheel cache):
+    python offline_bundle.py export --out whisper-cpu.zip --model ~/.cache/whisper/small.pt
+Import on the offline machine, into pytorch_runtimes/<variant of the bundle>, which then
+becomes the active runtime:
+    python offline_bundle.py import whisper-cpu.zip
+
+Members are stored uncompressed (wheels and models do not compress), so the import can
+extract them in parallel, hashing each one as it is written. Any hash, size, Python or
+platform mismatch stops the import before the runtime folder is touched. The wheels are then
+installed with pip --no-index --no-deps, and the models are placed in whisper's model
+cache (model_fetcher.MODEL_DIR, which follows XDG_CACHE_HOME) and recorded as verified.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from install_state import INSTALL_INFO_NAME, installed_distributions, python_version, write_install_info
+from model_fetcher import MODEL_DIR, _record_verified
+from precompile_libs import compile_tree
+from runtimes import VARIANTS, active_runtime, runtime_dir, set_active_runtime
+from wheel_store import WheelStore, parse_wheel_name
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+COPY_BLOCK = 4 * 1024 * 1024
+
+
+class BundleError(RuntimeError):
+    """The bundle cannot be exported or does not match its manifest or this machine"""
+
+
+def _copy_hashed(src, dst=None):
+    """Copy a file object to another (or just read it), returning (sha256, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: src.read(COPY_BLOCK), b""):
+        digest.update(block)
+        if dst is not None:
+            dst.write(block)
+        size += len(block)
+    return digest.hexdigest(), size
+
+
+# ---------- export ----------
+def export_bundle(out_path, target=None, models=(), extra_wheels=(), store=None, log=print):
+    """Write a bundle of the installation in target (default: the active runtime); returns the
+    manifest. Every installed distribution must come from a wheel in the wheel cache or extra_wheels."""
+    target = Path(target) if target is not None else active_runtime()
+    info_path = target / INSTALL_INFO_NAME
+    if not info_path.exists():
+        raise BundleError(f"{target} has no {INSTALL_INFO_NAME}; install with the downloader first")
+    with open(info_path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+
+    store = store or WheelStore()
+    # (wheel name, file); stored wheels are files named by their hash
+    wheels = [(name, store.wheel_path(name)) for name in store.installed_wheels(target)]
+    wheels += [(Path(w).name, Path(w)) for w in extra_wheels]
+    covered = {parse_wheel_name(name) for name, _ in wheels}
+    installed = {(name, version) for name, (version, _) in installed_distributions(target).items()}
+    missing = sorted(f"{name}-{version}" for name, version in installed - covered)
+    if missing:
+        raise BundleError(f"no cached wheel for {', '.join(missing)}; run the download again to cache them")
+
+    # The embedded whisper wheel may also be in the cache; keep one copy per name
+    unique = dict(wheels)
+    members = [(unique[name], f"wheels/{name}", "wheel") for name in sorted(unique)]
+    members += [(Path(m), f"models/{Path(m).name}", "model") for m in models]
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "variant": info.get("variant", info.get("version")),
+        "index_url": info.get("index_url"),
+        "platform": info.get("platform"),
+        "python": ".".join(str(info.get("python", python_version())).split(".")[:2]),
+        "requested": info.get("requested", []),
+        "files": [],
+    }
+
+    out_path = Path(out_path)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_STORED, allowZip64=True) as bundle:
+        for n, (path, name, kind) in enumerate(members, 1):
+            log(f"[{n}/{len(members)}] {name} ({path.stat().st_size / 1024 ** 2:.0f} MB)")
+            with open(path, 'rb') as src, bundle.open(name, 'w', force_zip64=True) as dst:
+                sha256, size = _copy_hashed(src, dst)
+            manifest["files"].append({"name": name, "kind": kind, "sha256": sha256, "size": size})
+        bundle.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    log("verifying the bundle...")
+    verify_members(tmp, manifest["files"])
+    os.replace(tmp, out_path)
+    return manifest
+
+
+# ---------- import ----------
+def read_manifest(bundle_path):
+    try:
+        with zipfile.ZipFile(bundle_path) as bundle:
+            manifest = json.loads(bundle.read(MANIFEST_NAME))
+    except (KeyError, zipfile.BadZipFile, ValueError) as e:
+        raise BundleError(f"{bundle_path} is not an offline bundle: {e}") from e
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise BundleError(f"unsupported bundle format {manifest.get('format')}")
+    return manifest
+
+
+def check_compatible(manifest, platform_tag=None):
+    """Raise BundleError when the bundle was built for another Python or platform"""
+    if manifest.get("python") != python_version():
+        raise BundleError(f"bundle is for Python {manifest.get('python')}, this is Python {python_version()}")
+    if platform_tag and manifest.get("platform") and manifest["platform"] != platform_tag:
+        raise BundleError(f"bundle is for {manifest['platform']}, this machine is {platform_tag}")
+
+
+def _extract_one(bundle_path, entry, directory):
+    """Extract one member (or only hash it when directory is None), checking the manifest"""
+    dest = None
+    with zipfile.ZipFile(bundle_path) as bundle, bundle.open(entry["name"]) as src:
+        if directory is None:
+            sha256, size = _copy_hashed(src)
+        else:
+            dest = Path(directory) / entry["name"]
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with open(dest, 'wb') as dst:
+                sha256, size = _copy_hashed(src, dst)
+    if sha256 != entry["sha256"] or size != entry["size"]:
+        if dest is not None:
+            dest.unlink(missing_ok=True)
+        raise BundleError(f"{entry['name']} is corrupt (SHA-256 or size does not match the manifest)")
+    return dest
+
+
+def verify_members(bundle_path, entries, directory=None, workers=None, log=None):
+    """Check entries against the manifest in parallel, extracting them into directory if given"""
+    workers = workers or min(8, os.cpu_count() or 1)
+    with zipfile.ZipFile(bundle_path) as bundle:
+        names = set(bundle.namelist())
+    unsafe = [e["name"] for e in entries if Path(e["name"]).is_absolute() or ".." in Path(e["name"]).parts]
+    if unsafe:
+        raise BundleError(f"bundle has unsafe member names: {', '.join(unsafe)}")
+    absent = [e["name"] for e in entries if e["name"] not in names]
+    if absent:
+        raise BundleError(f"bundle is missing {', '.join(absent)}")
+    paths = {}
+    # Largest first, so one big torch wheel does not start last
+    ordered = sorted(entries, key=lambda e: -e["size"])
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {e["name"]: pool.submit(_extract_one, bundle_path, e, directory) for e in ordered}
+        for n, entry in enumerate(ordered, 1):
+            paths[entry["name"]] = futures[entry["name"]].result()
+            if log:
+                log(f"[{n}/{len(ordered)}] {entry['name']} OK")
+    return paths
+
+
+def runtime_for(manifest, base="."):
+    """Runtime folder a bundle is imported into by default: the one of its variant"""
+    variant = manifest.get("variant")
+    if variant not in VARIANTS:
+        raise BundleError(f"unknown runtime variant {variant!r}")
+    return runtime_dir(base, variant)
+
+
+def import_bundle(bundle_path, run_pip, target=None, platform_tag=None,
+                  model_dir=MODEL_DIR, store=None, log=print, before_install=None, after_install=None):
+    """Verify the bundle, install its wheels into target (default: the runtime folder of its
+    variant) and its models into model_dir.
+    run_pip(args, label) runs pip and raises RuntimeError on failure; before_install()
+    runs once every file has been verified (e.g. to remove the old installation),
+    after_install() once the wheels are installed and before they are compiled.
+    Returns the manifest."""
+    manifest = read_manifest(bundle_path)
+    check_compatible(manifest, platform_tag)
+    target = Path(target) if target is not None else runtime_for(manifest)
+    target.mkdir(parents=True, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix="bundle-", dir=target.parent.absolute()) as staging:
+        log(f"extracting {len(manifest['files'])} files...")
+        paths = verify_members(bundle_path, manifest["files"], staging, log=log)
+        wheels = [str(paths[e["name"]]) for e in manifest["files"] if e["kind"] == "wheel"]
+        models = [(paths[e["name"]], e["sha256"]) for e in manifest["files"] if e["kind"] == "model"]
+
+        if before_install:
+            before_install()
+        run_pip(["install", "--no-index", "--no-deps", "--upgrade", "--no-cache-dir", "--no-compile",
+                 "--target", str(target), *wheels], "offline-bundle")
+        if models:
+            Path(model_dir).mkdir(parents=True, exist_ok=True)
+            for model, sha256 in models:
+                dest = Path(model_dir) / model.name
+                shutil.move(str(model), str(dest))
+                # Hashed against the manifest while extracting; spare model_ready() a second pass
+                _record_verified(dest, sha256)
+                log(f"model {model.name} -> {model_dir}")
+        try:
+            (store or WheelStore()).add_directory(Path(staging) / "wheels")
+        except Exception as e:
+            log(f"warning: could not add the wheels to the wheel cache: {e}")
+
+    if after_install:
+        after_install()
+    bytecode = compile_tree(target, log=log)
+    request = {field: manifest.get(field) for field in ("variant", "index_url", "python", "platform")}
+    request["slim"] = False         # the wheels are installed whole, even from a slim install
+    request["packages"] = manifest.get("requested", [])
+    write_install_info(target, request, bundle=Path(bundle_path).name, bytecode=bytecode)
+    return manifest
+
+
+# ---------- command line ----------
+def _subprocess_pip(args, label):
+    print(f"[{label}] pip {' '.join(args[:8])}{' ...' if len(args) > 8 else ''}", flush=True)
+    rc = subprocess.call([sys.executable, "-m", "pip", *args])
+    if rc != 0:
+        raise RuntimeError(f"{label} failed with exit-code {rc}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import an offline PyTorch/Whisper bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("--out", required=True)
+    export.add_argument("--target", help="runtime folder to export (default: the active runtime)")
+    export.add_argument("--model", action="append", default=[], help="Whisper .pt file to include")
+    export.add_argument("--wheel", action="append", default=[], help="extra wheel to include")
+    imp = sub.add_parser("import")
+    imp.add_argument("bundle")
+    imp.add_argument("--target", help="folder to install into (default: the runtime of the bundle's "
+                     "variant, which is then made the active runtime)")
+    imp.add_argument("--model-dir", default=str(MODEL_DIR))
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            manifest = export_bundle(args.out, args.target, args.model, args.wheel)
+            print(f"wrote {args.out}: {len(manifest['files'])} files")
+        else:
+            manifest = import_bundle(args.bundle, _subprocess_pip, args.target, model_dir=args.model_dir)
+            if args.target is None:
+                set_active_runtime(".", manifest["variant"])
+            print(f"installed {manifest.get('variant')} bundle into {args.target or runtime_for(manifest)}")
+    except (BundleError, RuntimeError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Compile every .py file in a PyTorch runtime folder to bytecode, in parallel, right after an install.
+
+Without this the first `import torch` / `import whisper` compiles thousands of modules one
+at a time (or on every launch, when the folder is not writable). The downloader installs
+with `pip --no-compile` and then runs compile_tree(), which spreads the files over a pool
+of processes. The result is stored under "bytecode" in pytorch_whisper_installed.json;
+is_compiled() tells whether that record still applies to the running interpreter.
+
+    python precompile_libs.py pytorch_runtimes/cuda --workers 8
+"""
+import argparse
+import compileall
+import functools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+# Files per task handed to a worker; small enough to balance a few huge modules
+MAX_CHUNK = 64
+
+
+def python_files(target):
+    """Every .py file below target, skipping __pycache__ directories"""
+    files = []
+    for root, dirs, names in os.walk(target):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        files += [os.path.join(root, name) for name in names if name.endswith(".py")]
+    return files
+
+
+def _compile_serial(files, compile_one):
+    return [compile_one(f) for f in files]
+
+
+def compile_tree(target, workers=None, log=None):
+    """Write .pyc files for target (up-to-date ones are left alone) and return the record:
+    {files, failed, seconds, workers, cache_tag, optimize}. A .py that does not compile for
+    this Python (templates, files for other versions) only counts as failed."""
+    started = time.perf_counter()
+    files = python_files(target)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files) or 1))
+    compile_one = functools.partial(compileall.compile_file, quiet=2, optimize=-1)
+    if log:
+        log(f"compiling {len(files)} files with {workers} workers")
+
+    results = None
+    if workers > 1:
+        chunk = max(1, min(MAX_CHUNK, len(files) // (workers * 4)))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(compile_one, files, chunksize=chunk))
+        except (BrokenProcessPool, OSError, NotImplementedError) as e:
+            if log:
+                log(f"process pool unavailable ({e}); compiling in this process")
+            workers = 1
+    if results is None:
+        results = _compile_serial(files, compile_one)
+
+    return {
+        "files": len(files),
+        "failed": results.count(False),
+        "seconds": round(time.perf_counter() - started, 1),
+        "workers": workers,
+        "cache_tag": sys.implementation.cache_tag,
+        "optimize": sys.flags.optimize,
+    }
+
+
+def is_compiled(info):
+    """True when an install record says the tree was compiled for this interpreter"""
+    bytecode = (info or {}).get("bytecode") or {}
+    return (bytecode.get("cache_tag") == sys.implementation.cache_tag
+            and bytecode.get("optimize") == sys.flags.optimize)
+
+
+def main(argv=None):
+    from runtimes import active_runtime
+
+    parser = argparse.ArgumentParser(description="Compile a PyTorch runtime to bytecode in parallel")
+    parser.add_argument("target", nargs="?", help="runtime folder (default: the active runtime, see runtimes.py)")
+    parser.add_argument("--workers", type=int, help="processes to use (default: one per CPU)")
+    args = parser.parse_args(argv)
+    args.target = args.target or str(active_runtime())
+
+    if not Path(args.target).is_dir():
+        print(f"error: {args.target} is not a directory", file=sys.stderr)
+        return 1
+    result = compile_tree(args.target, args.workers, log=print)
+    print(f"compiled {result['files']} files in {result['seconds']}s with {result['workers']} workers "
+          f"({result['failed']} failed, {result['cache_tag']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""Local store of finished transcripts keyed by audio content hash, model and parameters.
+A renamed or re-uploaded copy of a recording is served from here instead of being
+transcribed again."""
+import contextlib
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+from segment_store import SegmentStore
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "whisper_transcription" / "results.sqlite3"
+HASH_BLOCK = 1024 * 1024
+
+# Parameters that change the transcript itself; export-only options (e.g. resegment_subtitles)
+# are applied after a cache hit and must not split the cache
+TRANSCRIPT_PARAMS = ("temperature", "best_of", "beam_size", "logprob_threshold", "no_speech_threshold",
+                     "condition_on_previous_text", "word_timestamps", "fp16")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key          TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    model        TEXT,
+    language     TEXT,
+    duration     REAL,
+    segments     BLOB NOT NULL,
+    created_at   TEXT,
+    last_used    TEXT,
+    hits         INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER,
+    mtime_ns     INTEGER,
+    content_hash TEXT NOT NULL
+);
+"""
+
+
+def _now_text():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def hash_file(path):
+    """SHA-256 of the file content, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def result_key(content_hash, model, language, keyword, params, chunk_seconds):
+    """Cache key: the audio content plus everything that shapes the transcript"""
+    from transcription_core import DEFAULT_PARAMS
+
+    effective = dict(DEFAULT_PARAMS)
+    effective.update(params or {})
+    settings = {
+        "model": model,
+        "language": (language or "auto").split(' - ')[0],
+        "keyword": (keyword or "").strip(),
+        "chunk_seconds": chunk_seconds,
+        "params": {k: effective.get(k) for k in TRANSCRIPT_PARAMS},
+    }
+    blob = content_hash + json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed result store. File hashes are remembered by (path, size, mtime), so
+    looking up an unchanged file twice does not read it twice."""
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_entries=5000):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._write_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def content_hash(self, path):
+        path = Path(path).absolute()
+        st = path.stat()
+        with self._connect() as conn:
+            row = conn.execute("SELECT size, mtime_ns, content_hash FROM file_hashes WHERE path = ?",
+                               (str(path),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        digest = hash_file(path)
+        with self._write_lock, self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, content_hash) "
+                         "VALUES (?, ?, ?, ?)", (str(path), st.st_size, st.st_mtime_ns, digest))
+        return digest
+
+    def key_for(self, path, model, language, keyword, params, chunk_seconds):
+        """(content_hash, key) of path transcribed with these settings"""
+        digest = self.content_hash(path)
+        return digest, result_key(digest, model, language, keyword, params, chunk_seconds)
+
+    def get(self, key):
+        """(SegmentStore, duration) for a stored result, or None"""
+        with self._write_lock, self._connect() as conn:
+            row = conn.execute("SELECT segments, duration FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE results SET hits = hits + 1, last_used = ? WHERE key = ?", (_now_text(), key))
+        rows = json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        return SegmentStore.from_dicts(rows), row[1]
+
+    def put(self, key, content_hash, store, model="", language="", duration=None):
+        blob = zlib.compress(json.dumps(store.to_dicts(), ensure_ascii=False).encode('utf-8'))
+        now = _now_text()
+        with self._write_lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, content_hash, model, language, duration, segments, "
+                "created_at, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, content_hash, model, (language or "").split(' - ')[0], duration, blob, now, now)
+            )
+            # Keep the most recently used entries
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            )
+
+    def stats(self):
+        with self._connect() as conn:
+            count, hits, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(LENGTH(segments)), 0) FROM results"
+            ).fetchone()
+        return {"entries": count, "hits": hits, "bytes": size}
@@ -0,0 +1,260 @@
+"""Verify a PyTorch runtime folder in a fresh process: import torch and whisper with a per-module
+import-time breakdown, then run a tiny CPU forward pass and report the cold-start cost.
+
+The check always runs in a child process, so a torch already imported by the caller, or a
+torch installed elsewhere, cannot hide a broken runtime. Import times come from a
+meta-path hook that times every module's loading (like `python -X importtime`, which
+cannot be passed to a frozen executable): self time excludes the modules it imported,
+cumulative time includes them. Extension modules count their DLL loading.
+
+    python runtime_check.py                 # the active runtime
+    python runtime_check.py pytorch_runtimes/cpu
+A frozen program re-launches its own executable with CHILD_FLAG (see child_command()).
+"""
+import argparse
+import importlib.abc
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+CHILD_FLAG = "--verify-runtime"
+TOP_IMPORTS = 20
+TIMEOUT = 600
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """Meta-path finder that delegates to the other finders and times each module's loader"""
+
+    def __init__(self):
+        self.modules = {}       # name -> [self seconds, cumulative seconds, depth]
+        self._stack = []        # seconds spent in nested imports, one entry per active import
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def remove(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in list(sys.meta_path):
+            find = getattr(finder, "find_spec", None)
+            if finder is self or find is None:
+                continue
+            spec = find(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def measure(self, name, call, *args):
+        depth = len(self._stack)
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            entry = self.modules.setdefault(name, [0.0, 0.0, depth])
+            entry[0] += elapsed - nested
+            entry[1] += elapsed
+
+    def top(self, limit=TOP_IMPORTS):
+        """[(module, self ms, cumulative ms)] of the slowest modules by self time"""
+        ranked = sorted(self.modules.items(), key=lambda item: -item[1][0])[:limit]
+        return [(name, round(s * 1000, 1), round(c * 1000, 1)) for name, (s, c, _) in ranked]
+
+    def cumulative_ms(self, name):
+        entry = self.modules.get(name)
+        return round(entry[1] * 1000, 1) if entry else None
+
+
+class _TimedLoader:
+    """Wraps a loader for one import; the module gets its real loader back once executed"""
+
+    def __init__(self, loader, timer):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._timer.measure(spec.name, self._loader.create_module, spec)
+
+    def exec_module(self, module):
+        try:
+            self._timer.measure(module.__name__, self._loader.exec_module, module)
+        finally:
+            if getattr(module, "__spec__", None) is not None:
+                module.__spec__.loader = self._loader
+            try:
+                module.__loader__ = self._loader
+            except AttributeError:
+                pass        # e.g. torch's config modules refuse new attributes; the wrapper delegates
+
+
+# ---------- child ----------
+def _timed(report, key, call):
+    start = time.perf_counter()
+    result = call()
+    report["timings_ms"][key] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def run_checks(target):
+    """Import torch and whisper from target and run a tiny model; returns the report dict"""
+    started = time.perf_counter()
+    target = Path(target).absolute()
+    report = {"ok": False, "target": str(target), "python": sys.version.split()[0],
+              "frozen": bool(getattr(sys, "frozen", False)), "timings_ms": {}, "warnings": []}
+    sys.path.insert(0, str(target))
+    timer = ImportTimer().install()
+    try:
+        torch = _timed(report, "import_torch", lambda: __import__("torch"))
+        whisper = _timed(report, "import_whisper", lambda: __import__("whisper"))
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+        report["traceback"] = traceback.format_exc()
+        return report
+    finally:
+        timer.remove()
+        report["top_imports"] = timer.top()
+        report["package_imports_ms"] = {name: timer.cumulative_ms(name)
+                                        for name in ("torch", "numpy", "whisper", "numba", "tiktoken")
+                                        if timer.cumulative_ms(name) is not None}
+
+    report.update({
+        "torch": torch.__version__,
+        "torch_file": torch.__file__,
+        "cuda_build": torch.version.cuda,
+        "cuda_available": torch.cuda.is_available(),
+        "threads": torch.get_num_threads(),
+        "whisper": getattr(whisper, "__version__", "?"),
+    })
+    for module in (torch, whisper):
+        if not Path(module.__file__).absolute().is_relative_to(target):
+            report["warnings"].append(f"{module.__name__} was imported from {module.__file__}, not {target}")
+
+    try:
+        from whisper.model import ModelDimensions, Whisper
+
+        # Mel filters and the tokenizer come from whisper/assets; a broken layout fails here
+        mel = _timed(report, "log_mel", lambda: whisper.log_mel_spectrogram(
+            whisper.pad_or_trim(torch.zeros(whisper.audio.SAMPLE_RATE))))
+        tokenizer = _timed(report, "tokenizer", lambda: whisper.tokenizer.get_tokenizer(multilingual=True))
+        dims = ModelDimensions(n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2,
+                               n_audio_layer=1, n_vocab=tokenizer.encoding.n_vocab, n_text_ctx=448,
+                               n_text_state=64, n_text_head=2, n_text_layer=1)
+        model = _timed(report, "model_init", lambda: Whisper(dims).eval())
+        tokens = torch.tensor([list(tokenizer.sot_sequence)])
+
+        def forward():
+            with torch.no_grad():
+                return model.decoder(tokens, model.encoder(mel.unsqueeze(0)))
+
+        logits = _timed(report, "forward_cold", forward)
+        _timed(report, "forward_warm", forward)
+        if not torch.isfinite(logits).all():
+            raise RuntimeError("the forward pass produced non-finite values")
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+        report["traceback"] = traceback.format_exc()
+        return report
+
+    report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["ok"] = True
+    return report
+
+
+# ---------- parent ----------
+def child_command(target, report_path):
+    """Command line for the check; a frozen program runs its own executable with CHILD_FLAG"""
+    if getattr(sys, "frozen", False):
+        return [sys.executable, CHILD_FLAG, str(target), "--report", str(report_path)]
+    return [sys.executable, "-u", str(Path(__file__).absolute()), str(target), "--report", str(report_path)]
+
+
+def verify_runtime(target, timeout=TIMEOUT):
+    """Run the check in a fresh process; returns the report (ok False with error on failure).
+    The report travels through a file: a windowed executable may have no usable stdout."""
+    with tempfile.TemporaryDirectory(prefix="runtime-check-") as tmp:
+        report_path = Path(tmp) / "report.json"
+        started = time.perf_counter()
+        try:
+            proc = subprocess.run(child_command(target, report_path), capture_output=True, text=True,
+                                  errors="replace", timeout=timeout,
+                                  creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        except subprocess.TimeoutExpired:
+            return {"ok": False, "error": f"the check did not finish within {timeout}s", "warnings": []}
+        try:
+            with open(report_path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            output = (proc.stderr or proc.stdout or "").strip().splitlines()
+            return {"ok": False, "warnings": [],
+                    "error": f"the check process exited with code {proc.returncode}: "
+                             f"{output[-1] if output else 'no output'}"}
+    report["process_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+
+def format_report(report):
+    """Human-readable lines for a report"""
+    lines = []
+    if "torch" in report:
+        lines.append(f"Torch {report['torch']} (CUDA build {report['cuda_build']}, available: "
+                     f"{report['cuda_available']}, {report['threads']} threads), Whisper {report['whisper']}")
+    timings = report.get("timings_ms", {})
+    if timings:
+        lines.append("Cold start: " + ", ".join(f"{key} {ms:.0f} ms" for key, ms in timings.items()))
+    if "process_ms" in report:
+        lines.append(f"Fresh process total: {report['process_ms'] / 1000:.1f}s")
+    if report.get("package_imports_ms"):
+        lines.append("Import (cumulative): " + ", ".join(
+            f"{name} {ms:.0f} ms" for name, ms in report["package_imports_ms"].items()))
+    if report.get("top_imports"):
+        lines.append("Slowest modules (self / cumulative ms):")
+        lines += [f"  {self_ms:8.1f} {cum_ms:9.1f}  {name}" for name, self_ms, cum_ms in report["top_imports"][:10]]
+    lines += [f"warning: {w}" for w in report.get("warnings", [])]
+    if not report.get("ok"):
+        lines.append(f"error: {report.get('error')}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a PyTorch runtime in a fresh process and time its cold start")
+    parser.add_argument("target", nargs="?", help="runtime folder (default: the active runtime, see runtimes.py)")
+    parser.add_argument("--report", help="(child) write the JSON report here and exit")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        report = run_checks(args.target)
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return 0 if report["ok"] else 1
+
+    from runtimes import active_runtime
+
+    report = verify_runtime(args.target or str(active_runtime()))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("\n".join(format_report(report)))
+    return 0 if report.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
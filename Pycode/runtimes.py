@@ -0,0 +1,188 @@
+"""Side-by-side PyTorch runtimes and the selector telling Transcription which one to load.
+
+The downloader installs each variant into its own folder next to the programs:
+
+    pytorch_runtimes/cpu/       pip --target tree with its own pytorch_whisper_installed.json
+    pytorch_runtimes/cuda/
+    pytorch_runtimes/active.json    {"variant": "cuda"}
+
+so switching between CPU and CUDA needs no download: the downloader (or
+`python runtimes.py use cpu`) rewrites active.json and the next start of Transcription
+imports from that folder. The WHISPER_RUNTIME environment variable overrides the selector
+for one run. Files that are identical in both trees (the PyPI dependencies and most of
+torch's Python sources) are hard links to a single copy; see dedupe().
+
+A pytorch_libs folder from an older downloader is still loaded when no runtime is
+installed, and migrate_legacy() moves it to the folder of its recorded variant.
+
+    python runtimes.py list
+    python runtimes.py use cuda
+    python runtimes.py dedupe
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from install_state import INSTALL_INFO_NAME, read_install_info, record_hash
+
+RUNTIMES_DIR_NAME = "pytorch_runtimes"
+LEGACY_DIR_NAME = "pytorch_libs"
+SELECTOR_NAME = "active.json"
+VARIANTS = ("cpu", "cuda")
+
+
+def runtimes_root(base="."):
+    return Path(base) / RUNTIMES_DIR_NAME
+
+
+def runtime_dir(base, variant):
+    if variant not in VARIANTS:
+        raise ValueError(f"unknown runtime {variant!r} (expected one of {', '.join(VARIANTS)})")
+    return runtimes_root(base) / variant
+
+
+def installed_runtimes(base="."):
+    """{variant: folder} of the runtimes that have an install record"""
+    return {variant: runtime_dir(base, variant) for variant in VARIANTS
+            if (runtime_dir(base, variant) / INSTALL_INFO_NAME).exists()}
+
+
+def selected_variant(base="."):
+    """Variant named by WHISPER_RUNTIME or active.json, or None"""
+    if os.environ.get("WHISPER_RUNTIME"):
+        return os.environ["WHISPER_RUNTIME"]
+    try:
+        with open(runtimes_root(base) / SELECTOR_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f).get("variant")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def set_active_runtime(base, variant):
+    """Make variant the runtime Transcription loads from its next start"""
+    folder = runtime_dir(base, variant)
+    if not (folder / INSTALL_INFO_NAME).exists():
+        raise FileNotFoundError(f"no {variant} runtime installed in {folder}")
+    selector = runtimes_root(base) / SELECTOR_NAME
+    tmp = selector.with_name(SELECTOR_NAME + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"variant": variant, "time": time.strftime("%Y-%m-%d %H:%M:%S")}, f, indent=2)
+    os.replace(tmp, selector)
+    return folder
+
+
+def active_runtime(base="."):
+    """Folder to import torch and whisper from: the selected runtime when it is installed,
+    else any installed runtime, else the legacy pytorch_libs folder (which may not exist)"""
+    installed = installed_runtimes(base)
+    variant = selected_variant(base)
+    if variant in installed:
+        return installed[variant]
+    if installed:
+        return next(iter(installed.values()))
+    return Path(base) / LEGACY_DIR_NAME
+
+
+def migrate_legacy(base="."):
+    """Move an old pytorch_libs folder to the runtime folder of its recorded variant.
+    Returns the new folder, or None when there was nothing to move."""
+    info = read_install_info(Path(base) / LEGACY_DIR_NAME) or {}
+    variant = info.get("variant") or info.get("version")    # "version" in older records
+    if variant not in VARIANTS or runtime_dir(base, variant).exists():
+        return None
+    runtimes_root(base).mkdir(parents=True, exist_ok=True)
+    os.replace(Path(base) / LEGACY_DIR_NAME, runtime_dir(base, variant))
+    if selected_variant(base) not in installed_runtimes(base):
+        set_active_runtime(base, variant)
+    return runtime_dir(base, variant)
+
+
+def _record_entries(root):
+    """{relative path: (hash, size)} from the RECORD of every distribution in root"""
+    entries = {}
+    for record in Path(root).glob("*.dist-info/RECORD"):
+        try:
+            with open(record, newline='', encoding='utf-8') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 3 and row[1] and not row[0].startswith(".."):
+                        entries[row[0]] = (row[1], row[2])
+        except OSError:
+            continue
+    return entries
+
+
+def dedupe(target, sources, log=None):
+    """Replace files of target that have the same path and RECORD hash as a file in one of
+    sources with hard links to that file; the source copy is hashed first, so a damaged
+    file is never shared. Stops quietly where the file system has no hard links.
+    Returns (files linked, bytes saved)."""
+    wanted = _record_entries(target)
+    linked, saved = 0, 0
+    for source in sources:
+        for relative, entry in _record_entries(source).items():
+            if wanted.get(relative) != entry:
+                continue
+            src, dst = Path(source) / relative, Path(target) / relative
+            try:
+                if not dst.exists() or os.path.samefile(src, dst) or record_hash(src) != entry[0]:
+                    continue
+            except OSError:
+                continue
+            tmp = dst.with_name(dst.name + ".link-tmp")
+            try:
+                os.link(src, tmp)
+            except OSError as e:
+                if log:
+                    log(f"hard links unavailable ({e}); keeping separate copies")
+                return linked, saved
+            try:
+                os.replace(tmp, dst)
+            except OSError:
+                tmp.unlink(missing_ok=True)
+                continue
+            del wanted[relative]
+            linked += 1
+            saved += int(entry[1] or 0)
+    return linked, saved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List, select and deduplicate the installed PyTorch runtimes")
+    parser.add_argument("--base", default=".", help="folder holding pytorch_runtimes (default: current folder)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    use = sub.add_parser("use", help="select the runtime Transcription loads")
+    use.add_argument("variant", choices=VARIANTS)
+    sub.add_parser("dedupe", help="hard-link files shared by the installed runtimes")
+    args = parser.parse_args(argv)
+
+    installed = installed_runtimes(args.base)
+    if args.command == "list":
+        active = active_runtime(args.base)
+        for variant, folder in installed.items():
+            info = read_install_info(folder) or {}
+            torch_version = info.get("packages", {}).get("torch", "?")
+            print(f"{'*' if folder == active else ' '} {variant:5} torch {torch_version:16} {folder}")
+        if not installed:
+            print(f"no runtimes installed; loading {active}")
+        return 0
+    if args.command == "use":
+        try:
+            print(f"active runtime: {set_active_runtime(args.base, args.variant)}")
+        except FileNotFoundError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    folders = list(installed.values())
+    for i, folder in enumerate(folders[1:], 1):
+        linked, saved = dedupe(folder, folders[:i], log=print)
+        print(f"{folder}: linked {linked} files, {saved / 1024 ** 2:.0f} MB saved")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
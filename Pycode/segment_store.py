@@ -0,0 +1,221 @@
+"""Compact columnar storage for transcription segments"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+Segment = namedtuple("Segment", ["start", "end", "text", "confidence"])
+Word = namedtuple("Word", ["start", "end", "word", "probability"])
+
+
+class WordStore:
+    """Columnar per-word timings: start/end/probability arrays and a UTF-8 text arena"""
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.probabilities = array('f')
+        self.text_offsets = array('Q', [0])
+        self.text_arena = bytearray()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        lo, hi = self.text_offsets[i], self.text_offsets[i + 1]
+        return Word(self.starts[i], self.ends[i],
+                    str(memoryview(self.text_arena)[lo:hi], 'utf-8'),
+                    self.probabilities[i])
+
+    def append(self, start, end, word, probability):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.probabilities.append(probability)
+        self.text_arena += word.encode('utf-8')
+        self.text_offsets.append(len(self.text_arena))
+
+    def buffers(self):
+        return {
+            "start": memoryview(self.starts),
+            "end": memoryview(self.ends),
+            "probability": memoryview(self.probabilities),
+            "text_offsets": memoryview(self.text_offsets),
+            "text": memoryview(self.text_arena),
+        }
+
+    @property
+    def nbytes(self):
+        return (self.starts.itemsize * len(self.starts) * 2
+                + self.probabilities.itemsize * len(self.probabilities)
+                + self.text_offsets.itemsize * len(self.text_offsets)
+                + len(self.text_arena))
+
+
+class SegmentStore:
+    """Columnar segment container: float arrays for start/end, one UTF-8 text arena with
+    offsets, and optional per-segment confidence"""
+
+    def __init__(self):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.confidences = None          # array('f'), created on first confidence value
+        self.text_offsets = array('Q', [0])
+        self.text_arena = bytearray()
+        self.words = None                # WordStore, created on first segment with word timings
+        self.word_offsets = None         # segment i owns words[word_offsets[i]:word_offsets[i + 1]]
+        # Running maximum of starts for the time lookups to bisect; only kept once a start
+        # went backwards (whisper may overlap chunk boundaries), otherwise starts serves
+        self.search_starts = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __bool__(self):
+        return len(self.starts) > 0
+
+    def __iter__(self):
+        for i in range(len(self.starts)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.starts)
+        if not 0 <= i < len(self.starts):
+            raise IndexError("segment index out of range")
+        conf = self.confidences[i] if self.confidences is not None else None
+        if conf is not None and math.isnan(conf):
+            conf = None
+        return Segment(self.starts[i], self.ends[i], self.text(i), conf)
+
+    def text(self, i):
+        """Decode the text of segment i straight from the arena"""
+        lo, hi = self.text_offsets[i], self.text_offsets[i + 1]
+        return str(memoryview(self.text_arena)[lo:hi], 'utf-8')
+
+    @property
+    def has_words(self):
+        return self.words is not None and len(self.words) > 0
+
+    def words_of(self, i):
+        """Word timings of segment i (empty when word timestamps were not requested)"""
+        if self.words is None:
+            return []
+        return [self.words[j] for j in range(self.word_offsets[i], self.word_offsets[i + 1])]
+
+    def append(self, start, end, text, confidence=None, words=None):
+        """Append one segment with whisper's timestamps as they are.
+        words is an optional iterable of (start, end, word, probability)."""
+        if self.search_starts is not None:
+            self.search_starts.append(max(start, self.search_starts[-1]))
+        elif self.starts and start < self.starts[-1]:
+            self.search_starts = array('d', self.starts)
+            self.search_starts.append(self.starts[-1])
+        if words is not None and self.words is None:
+            self.words = WordStore()
+            self.word_offsets = array('Q', [0]) * (len(self.starts) + 1)
+        if self.words is not None:
+            for w in (words or ()):
+                self.words.append(*w)
+            self.word_offsets.append(len(self.words))
+        self.starts.append(start)
+        self.ends.append(end)
+        if confidence is not None and self.confidences is None:
+            self.confidences = array('f', [math.nan]) * (len(self.starts) - 1)
+        if self.confidences is not None:
+            self.confidences.append(math.nan if confidence is None else confidence)
+        self.text_arena += text.encode('utf-8')
+        self.text_offsets.append(len(self.text_arena))
+
+    def extend_whisper_segments(self, segments, offset=0.0):
+        """Append segments from a whisper transcribe() result, shifted by offset seconds"""
+        for seg in segments:
+            logprob = seg.get("avg_logprob")
+            words = None
+            if "words" in seg:
+                words = [(w["start"] + offset, w["end"] + offset, w["word"], w.get("probability", 0.0))
+                         for w in seg["words"]]
+            self.append(seg["start"] + offset,
+                        seg["end"] + offset,
+                        seg["text"].strip(),
+                        math.exp(logprob) if logprob is not None else None,
+                        words)
+
+    def clear(self):
+        self.__init__()
+
+    def _search_starts(self):
+        return self.starts if self.search_starts is None else self.search_starts
+
+    def index_at(self, t):
+        """Index of the segment covering time t (seconds), or -1; O(log n)"""
+        i = bisect_right(self._search_starts(), t) - 1
+        if i >= 0 and t < self.ends[i]:
+            return i
+        return -1
+
+    def index_range(self, t0, t1):
+        """(lo, hi) index range of segments starting before t1 and ending after t0"""
+        starts = self._search_starts()
+        lo = bisect_right(starts, t0) - 1
+        if lo < 0 or self.ends[lo] <= t0:
+            lo += 1
+        hi = bisect_left(starts, t1)
+        return lo, max(lo, hi)
+
+    def buffers(self):
+        """Zero-copy views of the underlying columns.
+        The store cannot grow while any of these views are alive."""
+        views = {
+            "start": memoryview(self.starts),
+            "end": memoryview(self.ends),
+            "text_offsets": memoryview(self.text_offsets),
+            "text": memoryview(self.text_arena),
+        }
+        if self.confidences is not None:
+            views["confidence"] = memoryview(self.confidences)
+        if self.words is not None:
+            views["word_offsets"] = memoryview(self.word_offsets)
+            views["words"] = self.words.buffers()
+        return views
+
+    @property
+    def nbytes(self):
+        total = (self.starts.itemsize * len(self.starts)
+                 + self.ends.itemsize * len(self.ends)
+                 + self.text_offsets.itemsize * len(self.text_offsets)
+                 + len(self.text_arena))
+        if self.confidences is not None:
+            total += self.confidences.itemsize * len(self.confidences)
+        if self.words is not None:
+            total += self.word_offsets.itemsize * len(self.word_offsets) + self.words.nbytes
+        if self.search_starts is not None:
+            total += self.search_starts.itemsize * len(self.search_starts)
+        return total
+
+    def to_dicts(self):
+        """List of {"start", "end", "text"} dicts, the format of saved JSON transcripts, plus
+        "confidence" (exp of whisper's avg_logprob) when known and "words" with word timestamps"""
+        rows = []
+        for i, seg in enumerate(self):
+            row = {"start": seg.start, "end": seg.end, "text": seg.text}
+            if seg.confidence is not None:
+                row["confidence"] = round(seg.confidence, 4)
+            if self.words is not None:
+                row["words"] = [
+                    {"word": w.word, "start": round(w.start, 3), "end": round(w.end, 3),
+                     "probability": round(w.probability, 4)}
+                    for w in self.words_of(i)
+                ]
+            rows.append(row)
+        return rows
+
+    @classmethod
+    def from_dicts(cls, rows):
+        store = cls()
+        for row in rows:
+            words = None
+            if "words" in row:
+                words = [(w["start"], w["end"], w["word"], w.get("probability", 0.0))
+                         for w in row["words"]]
+            store.append(row["start"], row["end"], row["text"], row.get("confidence"), words)
+        return store
@@ -0,0 +1,181 @@
+"""Whisper weights shared between worker processes through one memory-mapped file.
+
+whisper.load_model() reads the fp16 checkpoint and copies it into a fresh fp32 model, so
+N worker processes hold N private copies. Here the checkpoint is converted once to an
+fp32 file next to the whisper cache. Every worker then opens it with torch.load(mmap=True)
+and installs those tensors with load_state_dict(assign=True). The weights stay in the
+OS page cache once and are mapped copy-on-write (effectively read-only) by every
+process. CPU only: CUDA workers need their own device copy anyway.
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from pathlib import Path
+
+import transcription_core as core
+from model_fetcher import MODEL_URLS, fetch_model
+from stage_timing import StageTimer
+
+SHARED_DIR = Path.home() / ".cache" / "whisper" / "shared"
+
+
+def shared_weights_path(model_name):
+    return SHARED_DIR / f"{model_name}.fp32.pt"
+
+
+def prepare_shared_weights(model_name, progress=print):
+    """Create the fp32 weight file for model_name once (downloading the checkpoint if needed)"""
+    torch = core.torch
+    target = shared_weights_path(model_name)
+    if target.exists():
+        return target
+    if model_name not in MODEL_URLS:
+        raise ValueError(f"Unknown model {model_name}")
+
+    checkpoint_file = fetch_model(model_name)
+    progress(f"Converting {model_name} to a shared fp32 weight file (one time)...")
+    checkpoint = torch.load(checkpoint_file, map_location="cpu", weights_only=True)
+    state = {k: v.float().contiguous() if v.is_floating_point() else v
+             for k, v in checkpoint["model_state_dict"].items()}
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+    torch.save({"dims": checkpoint["dims"], "model_state_dict": state}, tmp)
+    os.replace(tmp, target)
+    return target
+
+
+def load_shared_model(model_name):
+    """Whisper model whose parameters are views of the memory-mapped shared weight file"""
+    torch, whisper = core.torch, core.whisper
+    from whisper.model import AudioEncoder, ModelDimensions, TextDecoder, Whisper
+
+    path = shared_weights_path(model_name)
+    try:
+        checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except TypeError:
+        raise RuntimeError("Shared weights need PyTorch 2.1 or newer (torch.load(mmap=True))")
+    dims = ModelDimensions(**checkpoint["dims"])
+
+    try:
+        # Build the layers on the meta device so no throw-away fp32 copy is allocated and
+        # initialised. Whisper.__init__ itself cannot run there (to_sparse has no meta kernel),
+        # so its two submodules are created directly.
+        model = Whisper.__new__(Whisper)
+        torch.nn.Module.__init__(model)
+        model.dims = dims
+        with torch.device("meta"):
+            model.encoder = AudioEncoder(dims.n_mels, dims.n_audio_ctx, dims.n_audio_state,
+                                         dims.n_audio_head, dims.n_audio_layer)
+            model.decoder = TextDecoder(dims.n_vocab, dims.n_text_ctx, dims.n_text_state,
+                                        dims.n_text_head, dims.n_text_layer)
+    except Exception:
+        model = Whisper(dims)
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+
+    # Non-persistent buffers are not in the state dict; rebuild them on the CPU
+    n_ctx = dims.n_text_ctx
+    model.decoder.register_buffer(
+        "mask", torch.empty(n_ctx, n_ctx).fill_(-float("inf")).triu_(1), persistent=False)
+    heads = whisper._ALIGNMENT_HEADS.get(model_name)
+    if heads is not None:
+        model.set_alignment_heads(heads)
+    else:
+        all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+        all_heads[dims.n_text_layer // 2:] = True
+        model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+    return model.eval()
+
+
+# ---------- worker processes ----------
+def _slim_segments(segments):
+    """Only the fields SegmentStore keeps; whisper's token lists would just bloat the pipe"""
+    keep = ("start", "end", "text", "avg_logprob", "words")
+    return [{k: seg[k] for k in keep if k in seg} for seg in segments]
+
+
+def _process_main(conn, model_name, threads):
+    """Child process: attach the shared model, then transcribe pieces sent over the pipe"""
+    if not core.setup_pytorch_path():
+        conn.send(("error", "PyTorch/Whisper not installed"))
+        return
+    core.torch.set_num_threads(threads)
+    try:
+        model = load_shared_model(model_name)
+    except Exception as e:
+        conn.send(("error", f"model loading failed: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        request = conn.recv()
+        if request is None:
+            return
+        path, offset, length, language, prompt, params, verbose = request
+        try:
+            timer = StageTimer()
+            with timer.stage("decode_audio"):
+                audio = core.load_audio_range(path, offset, length)
+            audio_seconds = core.audio_duration(audio)
+            with timer.watch(model):
+                result = core.transcribe_chunk(model, audio, language=language, prompt=prompt,
+                                               params=params, verbose=verbose)
+            conn.send(("ok", (_slim_segments(result["segments"]), audio_seconds, timer.to_raw())))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+class ModelProcess:
+    """Handle to one worker process holding a shared-weight model.
+    Used by BatchScheduler in place of an in-process model (see transcribe_piece)."""
+
+    def __init__(self, model_name, threads=1):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_process_main, args=(child, model_name, threads), daemon=True)
+        self.process.start()
+        child.close()
+        self._lock = threading.Lock()
+        status, value = self.conn.recv()
+        if status != "ready":
+            self.process.join(5)
+            raise RuntimeError(value)
+        self.pid = value
+
+    def transcribe_piece(self, path, offset, length, language=None, prompt=None, params=None, verbose=None):
+        """Transcribe [offset, offset + length) of path in the worker;
+        returns (segments, audio_seconds, StageTimer.to_raw())"""
+        with self._lock:
+            self.conn.send((str(path), offset, length, language, prompt, params, verbose))
+            status, value = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def threads_per_process(processes):
+    """Split the cores between processes so N workers do not each spawn a full set of threads"""
+    return max(1, (os.cpu_count() or 1) // processes)
+
+
+def shared_size_text(model_name):
+    size = shared_weights_path(model_name).stat().st_size
+    return f"{size / 1024 ** 3:.2f} GB"
+
+
+if __name__ == "__main__":
+    # Convert ahead of time: python shared_weights.py large-v3
+    if not core.setup_pytorch_path():
+        sys.exit(3)
+    for name in sys.argv[1:]:
+        print(prepare_shared_weights(name))
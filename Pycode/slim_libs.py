@@ -0,0 +1,198 @@
+"""Optional slimming of a PyTorch runtime folder after an install.
+
+Transcription only needs torch, whisper and their runtime dependencies. This removes:
+  - distributions outside the dependency closure of the requested packages (read from
+    each METADATA's Requires-Dist; optional extras only where a requirement asks for them),
+    e.g. torchvision, torchaudio and pillow left over from a full install;
+  - test suites (`tests` directories), C/C++ headers (`include` directories, *.h, *.hpp,
+    *.cuh), static and import libraries (*.a, *.lib) and CMake files of the rest.
+
+Removed files are first moved to a sibling staging directory and a fresh-process import
+smoke test (runtime_check) runs against the slimmed tree; only when it passes are they
+deleted and the RECORD files rewritten, otherwise everything is moved back.
+
+    python slim_libs.py pytorch_runtimes/cpu --keep torch numpy openai-whisper --dry-run
+"""
+import argparse
+import csv
+import os
+import re
+import shutil
+import sys
+from pathlib import Path
+
+from install_state import installed_distributions
+from wheel_store import normalize_project
+
+JUNK_DIR_NAMES = {"tests", "include", "cmake"}
+JUNK_SUFFIXES = (".h", ".hpp", ".cuh", ".a", ".lib")
+# Installed without pip metadata pointing at them, but needed at import
+ALWAYS_KEEP = {"typing_extensions", "setuptools"}
+# Compile kernels at run time against their bundled headers (whisper's CUDA timing ops)
+KEEP_HEADERS = {"triton"}
+
+
+def _requirements(dist_info, extras=()):
+    """{project: extras} a distribution requires; requirements behind an extra are only
+    followed for the extras asked for (torch needs cuda-toolkit[cudart,...], for one)"""
+    try:
+        text = (Path(dist_info) / "METADATA").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return {}
+    required = {}
+    for line in text.splitlines():
+        if not line.startswith("Requires-Dist:"):
+            continue
+        spec, _, marker = line[len("Requires-Dist:"):].partition(";")
+        needs_extra = set(re.findall(r"extra\s*==\s*[\"']([^\"']+)[\"']", marker))
+        if needs_extra and not needs_extra & set(extras):
+            continue
+        match = re.match(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[([^\]]*)\])?", spec)
+        if match:
+            wanted = {normalize_project(e.strip()) for e in (match.group(2) or "").split(",") if e.strip()}
+            required.setdefault(normalize_project(match.group(1)), set()).update(wanted)
+    return required
+
+
+def dependency_closure(target, roots):
+    """Normalized projects reachable from roots through the installed metadata"""
+    dists = installed_distributions(target)
+    extras = {}                 # project -> extras already followed
+    pending = [(normalize_project(r), set()) for r in roots] + [(p, set()) for p in sorted(ALWAYS_KEEP)]
+    while pending:
+        name, wanted = pending.pop()
+        if name in extras and wanted <= extras[name]:
+            continue
+        extras[name] = extras.get(name, set()) | wanted
+        if name in dists:
+            pending.extend(_requirements(dists[name][1], extras[name]).items())
+    return set(extras)
+
+
+def _record_paths(dist_info):
+    record = Path(dist_info) / "RECORD"
+    try:
+        with open(record, newline='', encoding='utf-8') as f:
+            return [row[0] for row in csv.reader(f) if row and not row[0].startswith("..")]
+    except OSError:
+        return []
+
+
+def _is_junk(relative):
+    parts = Path(relative).parts
+    return (any(part in JUNK_DIR_NAMES for part in parts[1:-1])
+            or relative.endswith(JUNK_SUFFIXES))
+
+
+class PrunePlan:
+    """Files to remove from target, relative to it"""
+
+    def __init__(self, projects, files, sizes):
+        self.projects = projects        # distributions removed entirely
+        self.files = files
+        self.bytes = sum(sizes)
+
+    def describe(self):
+        text = f"{len(self.files)} files, {self.bytes / 1024 ** 2:.0f} MB"
+        if self.projects:
+            text += f" (packages: {', '.join(self.projects)})"
+        return text
+
+
+def plan_prune(target, keep_projects):
+    target = Path(target)
+    keep = dependency_closure(target, keep_projects)
+    projects, files = [], []
+    for name, (version, dist_info) in sorted(installed_distributions(target).items()):
+        paths = _record_paths(dist_info)
+        if name not in keep:
+            projects.append(f"{name}-{version}")
+            files += paths
+            files += [str(p.relative_to(target)) for p in dist_info.rglob("*") if p.is_file()]
+        elif name not in KEEP_HEADERS:
+            files += [p for p in paths if _is_junk(p)]
+    files = sorted({f for f in files if (target / f).is_file()})
+    return PrunePlan(projects, files, [(target / f).stat().st_size for f in files])
+
+
+def _move_all(files, src_root, dst_root):
+    for relative in files:
+        dst = dst_root / relative
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src_root / relative, dst)
+
+
+def _remove_empty_dirs(root):
+    for directory in sorted((p for p in Path(root).rglob("*") if p.is_dir()), key=lambda p: -len(p.parts)):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+
+def _rewrite_records(target, removed):
+    removed = set(removed)
+    for _, (_, dist_info) in installed_distributions(target).items():
+        record = dist_info / "RECORD"
+        try:
+            with open(record, newline='', encoding='utf-8') as f:
+                rows = list(csv.reader(f))
+        except OSError:
+            continue
+        kept = [row for row in rows if not row or row[0] not in removed]
+        if len(kept) != len(rows):
+            tmp = record.with_name("RECORD.tmp")
+            with open(tmp, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(kept)
+            os.replace(tmp, record)
+
+
+def apply_prune(target, plan, smoke_test=None, log=print):
+    """Move the planned files aside, run smoke_test() -> (ok, message) on the slimmed tree,
+    then delete them (ok) or move them back. Returns (ok, message)."""
+    target = Path(target).absolute()
+    if smoke_test is None:
+        from runtime_check import verify_runtime
+
+        def smoke_test():
+            report = verify_runtime(target)
+            return report.get("ok", False), report.get("error") or f"{report.get('process_ms', 0) / 1000:.1f}s cold start"
+
+    staging = target.parent / f".{target.name}.pruned"
+    shutil.rmtree(staging, ignore_errors=True)
+    log(f"pruning {plan.describe()}")
+    _move_all(plan.files, target, staging)
+    ok, message = smoke_test()
+    if not ok:
+        log(f"smoke test failed ({message}); restoring the pruned files")
+        _move_all(plan.files, staging, target)
+        shutil.rmtree(staging, ignore_errors=True)
+        return False, message
+    _rewrite_records(target, plan.files)
+    _remove_empty_dirs(target)
+    shutil.rmtree(staging, ignore_errors=True)
+    return True, message
+
+
+def main(argv=None):
+    from runtimes import active_runtime
+
+    parser = argparse.ArgumentParser(description="Remove unused packages, tests and headers from a PyTorch runtime")
+    parser.add_argument("target", nargs="?", help="runtime folder (default: the active runtime, see runtimes.py)")
+    parser.add_argument("--keep", nargs="+", default=["torch", "numpy", "openai-whisper"],
+                        help="packages (with their dependencies) to keep")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+    args.target = args.target or str(active_runtime())
+
+    plan = plan_prune(args.target, args.keep)
+    if args.dry_run:
+        print("would remove " + plan.describe())
+        return 0
+    ok, message = apply_prune(args.target, plan)
+    print(f"{'pruned' if ok else 'kept everything'}: {message}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Per-stage timing of a transcription job: audio decode (ffmpeg), log-mel spectrogram,
+encoder, token decoding, word alignment and writing the outputs, plus per-30-second-window
+encoder/decoder time and temperature fallbacks.
+
+whisper gives no hooks for this, so StageTimer.watch(model) wraps the pieces it calls:
+log_mel_spectrogram and add_word_timestamps in whisper.transcribe (dispatching to the timer
+of the current thread, so concurrent jobs do not see each other's timings), forward hooks
+on the encoder and the model's decode() method. Every decode() call on the same mel window
+after the first is a temperature fallback.
+"""
+import contextlib
+import os
+import sys
+import threading
+import time
+
+STAGES = ("decode_audio", "mel", "encode", "decode_tokens", "align", "write")
+STAGE_LABELS = {
+    "decode_audio": "audio decode",
+    "mel": "mel",
+    "encode": "encode",
+    "decode_tokens": "decode tokens",
+    "align": "word alignment",
+    "write": "write",
+}
+
+_local = threading.local()
+_install_lock = threading.Lock()
+_installed = set()
+
+
+def _install_module_hooks():
+    """Wrap whisper.transcribe's mel and alignment functions once per process"""
+    module = sys.modules.get("whisper.transcribe")
+    if module is None:
+        return
+    with _install_lock:
+        for name, stage in (("log_mel_spectrogram", "mel"), ("add_word_timestamps", "align")):
+            if (id(module), name) in _installed or not hasattr(module, name):
+                continue
+            original = getattr(module, name)
+
+            def timed(*args, _original=original, _stage=stage, **kwargs):
+                timer = getattr(_local, "timer", None)
+                if timer is None:
+                    return _original(*args, **kwargs)
+                with timer.stage(_stage):
+                    return _original(*args, **kwargs)
+
+            setattr(module, name, timed)
+            _installed.add((id(module), name))
+
+
+class StageTimer:
+    """Accumulates seconds per stage and per decoded window for one job"""
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.windows = []           # [encode seconds, decode seconds, fallbacks] per 30 s window
+        self._sync = None
+        self._last_segment = None
+        self._in_decode = False
+        self._encode_started = None
+
+    @property
+    def fallbacks(self):
+        return sum(w[2] for w in self.windows)
+
+    @property
+    def total(self):
+        return sum(self.seconds.values())
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._sync:
+                self._sync()
+            self.seconds[name] += time.perf_counter() - t0
+
+    @contextlib.contextmanager
+    def watch(self, model):
+        """Time the whisper internals while model transcribes on this thread"""
+        _install_module_hooks()
+        torch = sys.modules.get("torch")
+        try:
+            on_cuda = next(model.parameters()).is_cuda
+        except (AttributeError, StopIteration):
+            on_cuda = False
+        self._sync = torch.cuda.synchronize if on_cuda and torch is not None else None
+
+        hooks = []
+        encoder = getattr(model, "encoder", None)
+        if encoder is not None and hasattr(encoder, "register_forward_hook"):
+            hooks.append(encoder.register_forward_pre_hook(self._encoder_start))
+            hooks.append(encoder.register_forward_hook(self._encoder_end))
+        decode = getattr(model, "decode", None)
+        if decode is not None:
+            model.decode = self._timed_decode(decode)
+
+        previous, _local.timer = getattr(_local, "timer", None), self
+        try:
+            yield self
+        finally:
+            _local.timer = previous
+            for hook in hooks:
+                hook.remove()
+            if decode is not None:
+                try:
+                    del model.decode        # back to the class method
+                except AttributeError:
+                    model.decode = decode
+            self._last_segment = None
+            self._sync = None
+
+    def _encoder_start(self, module, inputs):
+        if self._in_decode:
+            if self._sync:
+                self._sync()
+            self._encode_started = time.perf_counter()
+
+    def _encoder_end(self, module, inputs, output):
+        if self._in_decode and self._encode_started is not None:
+            if self._sync:
+                self._sync()
+            seconds = time.perf_counter() - self._encode_started
+            self._encode_started = None
+            self.seconds["encode"] += seconds
+            self.windows[-1][0] += seconds
+
+    def _timed_decode(self, decode):
+        def timed(mel, *args, **kwargs):
+            # decode_with_fallback passes the same mel tensor again for each higher temperature
+            if mel is self._last_segment and self.windows:
+                self.windows[-1][2] += 1
+            else:
+                self.windows.append([0.0, 0.0, 0])
+                self._last_segment = mel
+            window = self.windows[-1]
+            encode_before = window[0]
+            self._in_decode = True
+            t0 = time.perf_counter()
+            try:
+                return decode(mel, *args, **kwargs)
+            finally:
+                self._in_decode = False
+                if self._sync:
+                    self._sync()
+                seconds = time.perf_counter() - t0 - (window[0] - encode_before)
+                self.seconds["decode_tokens"] += seconds
+                window[1] += seconds
+        return timed
+
+    # ---------- results ----------
+    def merge(self, raw):
+        """Add the timings of another timer (or its to_raw() dict, e.g. from a worker process)"""
+        if isinstance(raw, StageTimer):
+            raw = raw.to_raw()
+        for name, seconds in raw.get("seconds", {}).items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.windows.extend(list(w) for w in raw.get("windows", []))
+
+    def to_raw(self):
+        return {"seconds": dict(self.seconds), "windows": [list(w) for w in self.windows]}
+
+    def as_dict(self, slowest=5):
+        """Summary stored in the JSON metadata"""
+        info = {
+            "stages": {name: round(seconds, 3) for name, seconds in self.seconds.items()},
+            "windows": len(self.windows),
+            "fallbacks": self.fallbacks,
+        }
+        if self.windows:
+            times = sorted(w[0] + w[1] for w in self.windows)
+            info["window_seconds"] = {
+                "mean": round(sum(times) / len(times), 3),
+                "p95": round(times[min(len(times) - 1, int(0.95 * len(times)))], 3),
+                "max": round(times[-1], 3),
+            }
+            ranked = sorted(range(len(self.windows)), key=lambda i: -(self.windows[i][0] + self.windows[i][1]))
+            info["slowest_windows"] = [
+                {"index": i, "encode": round(self.windows[i][0], 3), "decode": round(self.windows[i][1], 3),
+                 "fallbacks": self.windows[i][2]}
+                for i in ranked[:slowest]
+            ]
+        return info
+
+    def summary_line(self):
+        parts = [f"{STAGE_LABELS[name]} {self.seconds[name]:.1f}s"
+                 for name in STAGES if self.seconds[name] > 0 or name in ("encode", "decode_tokens")]
+        line = " | ".join(parts)
+        if self.windows:
+            line += f" | {len(self.windows)} windows, {self.fallbacks} fallbacks"
+        return line
+
+
+class MetricsTextfile:
+    """Cumulative counters written in the Prometheus text format, for node_exporter's
+    textfile collector (--collector.textfile.directory). Rewritten atomically after every job."""
+
+    PREFIX = "whisper_transcription"
+
+    def __init__(self, path, labels=None):
+        self.path = str(path)
+        self.labels = dict(labels or {})
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.files = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.windows = 0
+        self.fallbacks = 0
+        self.last = None
+        self._lock = threading.Lock()
+
+    def _labels(self, **extra):
+        labels = dict(self.labels, **extra)
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+    def record(self, timer, audio_seconds):
+        with self._lock:
+            for name, seconds in timer.seconds.items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.files += 1
+            self.audio_seconds += audio_seconds or 0.0
+            self.windows += len(timer.windows)
+            self.fallbacks += timer.fallbacks
+            self.last = (timer, audio_seconds)
+            self._write()
+
+    def record_failure(self):
+        with self._lock:
+            self.failed += 1
+            self._write()
+
+    def render(self):
+        p = self.PREFIX
+        lines = [
+            f"# HELP {p}_stage_seconds_total Time spent per pipeline stage.",
+            f"# TYPE {p}_stage_seconds_total counter",
+        ]
+        lines += [f"{p}_stage_seconds_total{self._labels(stage=name)} {seconds:.6f}"
+                  for name, seconds in self.stage_seconds.items()]
+        for name, kind, value, text in (
+                ("files_total", "counter", self.files, "Files transcribed."),
+                ("failures_total", "counter", self.failed, "Files that failed."),
+                ("audio_seconds_total", "counter", self.audio_seconds, "Audio transcribed, in seconds."),
+                ("windows_total", "counter", self.windows, "30-second windows decoded."),
+                ("fallbacks_total", "counter", self.fallbacks, "Temperature fallbacks.")):
+            lines += [f"# HELP {p}_{name} {text}", f"# TYPE {p}_{name} {kind}",
+                      f"{p}_{name}{self._labels()} {value}"]
+        if self.last is not None:
+            timer, audio_seconds = self.last
+            lines += [f"# HELP {p}_last_stage_seconds Stage times of the most recent file.",
+                      f"# TYPE {p}_last_stage_seconds gauge"]
+            lines += [f"{p}_last_stage_seconds{self._labels(stage=name)} {seconds:.6f}"
+                      for name, seconds in timer.seconds.items()]
+            if audio_seconds:
+                lines += [f"# HELP {p}_last_real_time_factor Processing time over audio time of the most recent file.",
+                          f"# TYPE {p}_last_real_time_factor gauge",
+                          f"{p}_last_real_time_factor{self._labels()} {timer.total / audio_seconds:.6f}"]
+        return "\n".join(lines) + "\n"
+
+    def _write(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
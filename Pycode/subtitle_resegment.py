@@ -0,0 +1,195 @@
+"""Re-segment transcription cues to meet subtitle reading-speed and layout rules"""
+import math
+import re
+
+from segment_store import SegmentStore
+
+
+# Kana, CJK ideographs and half-width katakana are written without spaces,
+# so every character is a potential break point.
+_CJK = "぀-ヿ㐀-䶿一-鿿豈-﫿ｦ-ﾟ"
+_PUNCT = "、。，．！？!?,.;:…」』）)"
+TOKEN_RE = re.compile(rf"\s*(?:[{_CJK}][{re.escape(_PUNCT)}]*|[^\s{_CJK}]+)")
+SENTENCE_END = tuple("。．.!?！？…")
+BREAK_AFTER = SENTENCE_END + tuple("、，,;:")
+
+
+class SubtitleRules:
+    """Layout and timing limits for one subtitle cue"""
+
+    def __init__(self, max_chars_per_line=42, max_lines=2, min_duration=1.0,
+                 max_duration=7.0, max_cps=20.0, split_gap=1.0):
+        self.max_chars_per_line = max_chars_per_line
+        self.max_lines = max_lines
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.max_cps = max_cps
+        self.split_gap = split_gap
+
+    @property
+    def max_chars(self):
+        return self.max_chars_per_line * self.max_lines
+
+    @classmethod
+    def for_language(cls, lang, **overrides):
+        """Broadcast-style presets; CJK scripts use fewer, denser characters per line"""
+        presets = {
+            "ja": dict(max_chars_per_line=16, max_cps=6.0),
+            "zh": dict(max_chars_per_line=16, max_cps=9.0),
+            "ko": dict(max_chars_per_line=16, max_cps=12.0),
+        }
+        params = dict(presets.get(lang or "", {}))
+        params.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**params)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _units_from_store(store, rules):
+    """Yield timed units (start, end, text, probability): whisper words when available,
+    else proportional splits of each segment's text"""
+    starts, ends = store.starts, store.ends
+    word_offsets = store.word_offsets
+    words = store.words
+    findall = TOKEN_RE.findall
+    for i in range(len(starts)):
+        if words is not None and word_offsets[i + 1] > word_offsets[i]:
+            for j in range(word_offsets[i], word_offsets[i + 1]):
+                w = words[j]
+                if w.word.strip():
+                    yield (w.start, w.end, w.word, w.probability)
+            continue
+
+        text = store.text(i)
+        if not text:
+            continue
+        gap = "" if _is_cjk(text[:1]) else " "      # segment texts are stripped; restore the word gap
+        seg_start = starts[i]
+        if len(text) <= rules.max_chars_per_line and ends[i] - seg_start <= rules.max_duration:
+            # Already fits on one line: keep the segment whole
+            yield (seg_start, ends[i], gap + text, 1.0)
+            continue
+
+        tokens = findall(text)
+        tokens[0] = gap + tokens[0]
+        weights = [len(tok.strip()) or 1 for tok in tokens]
+        scale = max(ends[i] - seg_start, 0.0) / sum(weights)
+        t = seg_start
+        for tok, weight in zip(tokens, weights):
+            t_end = t + scale * weight
+            yield (t, t_end, tok, 1.0)
+            t = t_end
+
+
+_CJK_RE = re.compile(f"[{_CJK}]")
+
+
+def _is_cjk(ch):
+    return _CJK_RE.match(ch) is not None
+
+
+def _cue_text(units):
+    return "".join([u[2] for u in units]).strip()
+
+
+def _break_lines(units, rules):
+    """Split a cue's units into at most max_lines lines at unit boundaries"""
+    widths = [len(u[2]) for u in units]
+    total = sum(widths)
+    n_lines = min(rules.max_lines, math.ceil(total / rules.max_chars_per_line))
+    if n_lines < 2 or len(units) < 2:
+        return [units]
+
+    if n_lines > 2:
+        # Greedy fill for three or more lines
+        lines, current, width = [], [], 0
+        for u, w in zip(units, widths):
+            if current and width + w > rules.max_chars_per_line and len(lines) < n_lines - 1:
+                lines.append(current)
+                current, width = [], 0
+            current.append(u)
+            width += w
+        lines.append(current)
+        return lines
+
+    # Two lines: most balanced boundary, each candidate scored in O(1)
+    best_k, best_score = 1, None
+    first = 0
+    for k in range(1, len(units)):
+        first += widths[k - 1]
+        score = max(first, total - first)
+        if units[k - 1][2].endswith(BREAK_AFTER):
+            score -= 2          # prefer breaking after punctuation
+        if best_score is None or score < best_score:
+            best_k, best_score = k, score
+    return [units[:best_k], units[best_k:]]
+
+
+def resegment(store, rules=None):
+    """Return a new SegmentStore whose cues satisfy the rules as far as the timings allow.
+    Runs in O(n) over words (or proportional text units)."""
+    rules = rules or SubtitleRules()
+    max_chars, max_duration = rules.max_chars, rules.max_duration
+    min_duration, split_gap = rules.min_duration, rules.split_gap
+
+    # Pass 1: greedy packing of units into cues; each cue is [units, char_count]
+    cues = []
+    current, chars = [], 0
+    for unit in _units_from_store(store, rules):
+        start, end, text, _ = unit
+        if current:
+            if (chars + len(text) > max_chars or end - current[0][0] > max_duration
+                    or start - current[-1][1] > split_gap):
+                cues.append([current, chars])
+                current = []
+        if not current:
+            text = text.lstrip()
+            current, chars = [(start, end, text, unit[3])], len(text)
+        else:
+            current.append(unit)
+            chars += len(text)
+        if text.endswith(SENTENCE_END) and end - current[0][0] >= min_duration:
+            cues.append([current, chars])
+            current = []
+    if current:
+        cues.append([current, chars])
+
+    # Pass 2: fold cues shorter than min_duration into the following cue when it fits
+    merged = []
+    for cue in cues:
+        if merged:
+            prev, prev_chars = merged[-1]
+            units, n = cue
+            if (prev[-1][1] - prev[0][0] < min_duration
+                    and prev_chars + n + 1 <= max_chars
+                    and units[-1][1] - prev[0][0] <= max_duration
+                    and units[0][0] - prev[-1][1] <= split_gap):
+                head = units[0]
+                if not _is_cjk(prev[-1][2][-1:]) and not _is_cjk(head[2][:1]):
+                    head = (head[0], head[1], " " + head[2], head[3])
+                    n += 1
+                merged[-1] = [prev + [head] + units[1:], prev_chars + n]
+                continue
+        merged.append(cue)
+
+    # Pass 3: timing and line layout
+    out = SegmentStore()
+    has_words = store.has_words
+    for i, (units, chars) in enumerate(merged):
+        start, end = units[0][0], units[-1][1]
+        wanted = max(end, start + min_duration, start + chars / rules.max_cps if rules.max_cps else end)
+        limit = min(start + max_duration, merged[i + 1][0][0][0] if i + 1 < len(merged) else wanted)
+        end = max(end, min(wanted, limit))
+
+        lines = _break_lines(units, rules)
+        if len(lines) == 1:
+            text = _cue_text(units)
+        else:
+            for line in lines[1:]:
+                head = line[0]
+                line[0] = (head[0], head[1], "\n" + head[2].lstrip(), head[3])
+            units = [u for line in lines for u in line]
+            text = "\n".join([_cue_text(line) for line in lines])
+        out.append(start, end, text, None, [u[:4] for u in units] if has_words else None)
+    return out
@@ -0,0 +1,40 @@
+"""Shared fixtures. The modules under test live flat in Pycode/ and import each other by
+name, as they do when the scripts run, so Pycode/ goes on sys.path."""
+import base64
+import hashlib
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _record_line(name, data):
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+    return f"{name},sha256={digest},{len(data)}"
+
+
+def build_wheel(folder, project, version, body=""):
+    """Write a minimal pure-Python wheel pip can install; returns its path"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    dist_info = f"{project}-{version}.dist-info"
+    files = {
+        f"{project}/__init__.py": f"VERSION = {version!r}\n{body}".encode(),
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {project}\nVersion: {version}\n".encode(),
+        f"{dist_info}/WHEEL": b"Wheel-Version: 1.0\nGenerator: tests\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = "\n".join([_record_line(n, d) for n, d in files.items()] + [f"{dist_info}/RECORD,,"]) + "\n"
+    path = folder / f"{project}-{version}-py3-none-any.whl"
+    with zipfile.ZipFile(path, "w") as whl:
+        for name, data in files.items():
+            whl.writestr(name, data)
+        whl.writestr(f"{dist_info}/RECORD", record)
+    return path
+
+
+@pytest.fixture
+def make_wheel():
+    return build_wheel
@@ -0,0 +1,49 @@
+"""BatchScheduler failure paths, with loaders that need no model or audio"""
+from pathlib import Path
+
+from batch_scheduler import BatchScheduler
+
+
+class FakeModel:
+    """transcribe_piece stands in for a worker process; every piece yields one segment"""
+
+    def transcribe_piece(self, path, offset, length, **kwargs):
+        return [{"start": 0.0, "end": 1.0, "text": f"{path.name} {offset}"}], length or 1.0, None
+
+
+def scheduler(tmp_path, model_loader, workers=2):
+    sched = BatchScheduler(workers, "tiny", "cpu", ["json"], {}, language="en", keyword="",
+                           chunk_seconds=10, model_loader=model_loader, report_seconds=60)
+    files = [(Path(tmp_path / f"{name}.wav"), tmp_path / name, seconds, False)
+             for name, seconds in (("long", 35.0), ("short", 5.0))]
+    return sched, sched.add_files(files)
+
+
+def test_every_file_fails_when_no_worker_loads_a_model(tmp_path):
+    def broken_loader(name, device):
+        raise RuntimeError("no such model")
+
+    sched, tasks = scheduler(tmp_path, broken_loader)
+    failed, done = [], []
+    sched.on_file_failed = lambda task, error: failed.append((task.input_file.name, str(error)))
+    sched.on_file_done = lambda *args: done.append(args)
+    sched.run()
+
+    assert sorted(failed) == [("long.wav", "no such model"), ("short.wav", "no such model")]
+    assert done == [] and sched.pieces == 0
+
+
+def test_a_raising_callback_does_not_stop_the_worker(tmp_path):
+    sched, tasks = scheduler(tmp_path, lambda name, device: FakeModel(), workers=1)
+    done = []
+
+    def on_done(task, store, written, busy):
+        done.append(task.input_file.name)
+        raise OSError("disk full")
+
+    sched.on_file_done = on_done
+    sched.on_file_failed = lambda task, error: None
+    sched.run()
+
+    assert sorted(done) == ["long.wav", "short.wav"]
+    assert sched.stats[0].items == 5
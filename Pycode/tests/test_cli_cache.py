@@ -0,0 +1,27 @@
+"""--cache lookups in the batch CLI are keyed by the chunk length a file is actually transcribed with"""
+from memory_budget import MemoryPlan
+from result_cache import ResultCache
+from segment_store import SegmentStore
+from transcription_cli import BatchReport, build_parser, cache_lookup, serve_cached
+
+
+def test_cached_result_of_a_shortened_chunk_is_found_only_with_that_plan(tmp_path):
+    audio = tmp_path / "talk.wav"
+    audio.write_bytes(b"RIFF" + b"\0" * 64)
+    args = build_parser().parse_args(["--batch", str(audio), "--chunk-minutes", "30"])
+    cache = ResultCache(tmp_path / "cache.sqlite3")
+    store = SegmentStore()
+    store.append(0.0, 1.0, "hello")
+    plan = MemoryPlan(600, False, 0, {}, None, adjusted=["chunk 30 -> 10 min"])
+    content_hash, key, hit = cache_lookup(cache, audio, args, {}, 600)
+    assert hit is None
+    cache.put(key, content_hash, store, args.model, args.language, 1.0)
+
+    pending = [(1, audio, tmp_path / "talk")]
+    remaining, keys = serve_cached(args, pending, 1, ["json"], {}, cache, None, BatchReport())
+    assert remaining == pending and keys[audio][1] != key
+
+    report = BatchReport()
+    remaining, _ = serve_cached(args, pending, 1, ["json"], {}, cache, None, report, {audio: plan})
+    assert remaining == [] and report.cached_count == 1
+    assert (tmp_path / "talk.json").exists()
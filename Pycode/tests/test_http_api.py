@@ -0,0 +1,125 @@
+"""HTTP job API error paths, with a worker pool whose audio loader is held by the test"""
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from http_api import CANCELLED, FAILED, RUNNING, TranscriptionServer, WorkerPool
+
+
+class HeldAudio:
+    """audio_loader that blocks each job until release() and then fails it (no model needed)"""
+
+    def __init__(self):
+        self.release_event = threading.Event()
+        self.started = threading.Event()
+        self.loaded = []
+
+    def __call__(self, path):
+        self.loaded.append(path)
+        self.started.set()
+        self.release_event.wait(10)
+        raise RuntimeError("test audio is not decoded")
+
+    def release(self):
+        self.release_event.set()
+
+
+@pytest.fixture
+def api(tmp_path):
+    audio = HeldAudio()
+    pool = WorkerPool(workers=1, model_name="tiny", queue_size=1, formats=["json"],
+                      model_loader=lambda name, device: object(), audio_loader=audio)
+    allowed = tmp_path / "allowed"
+    allowed.mkdir()
+    server = TranscriptionServer(("127.0.0.1", 0), pool, spool_dir=tmp_path / "spool", allowed_roots=[allowed])
+    pool.start()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, audio, allowed
+    finally:
+        audio.release()
+        server.shutdown()
+        server.server_close()
+        pool.stop()
+
+
+def request(server, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), json.loads(response.read() or b"null")
+    finally:
+        conn.close()
+
+
+def upload(server, data=b"RIFF0000"):
+    return request(server, "POST", "/jobs?filename=a.wav", data, {"Content-Type": "audio/wav"})
+
+
+def test_non_numeric_content_length_is_a_bad_request(api):
+    server = api[0]
+    with socket.create_connection(server.server_address[:2], timeout=10) as sock:
+        sock.sendall(b"POST /jobs HTTP/1.1\r\nHost: x\r\nContent-Type: audio/wav\r\nContent-Length: abc\r\n\r\n")
+        status_line = sock.makefile("rb").readline()
+    assert status_line.split()[1] == b"400"
+
+
+def test_invalid_json_and_parameters_are_bad_requests(api):
+    server, _, allowed = api
+    status, _, body = request(server, "POST", "/jobs", b"{not json", {"Content-Type": "application/json"})
+    assert status == 400 and "invalid job request" in body["error"]
+    status, _, _ = request(server, "POST", "/jobs?beam_size=wide", b"RIFF", {"Content-Type": "audio/wav"})
+    assert status == 400
+    status, _, _ = request(server, "POST", "/jobs", json.dumps({"path": str(allowed / "missing.wav")}),
+                           {"Content-Type": "application/json"})
+    assert status == 400
+
+
+def test_paths_outside_the_allowed_roots_are_refused(api, tmp_path):
+    server, _, allowed = api
+    outside = tmp_path / "secret.wav"
+    outside.write_bytes(b"RIFF")
+    for path in (outside, allowed / ".." / "secret.wav"):
+        status, _, _ = request(server, "POST", "/jobs", json.dumps({"path": str(path)}),
+                               {"Content-Type": "application/json"})
+        assert status == 403
+
+    inside = allowed / "talk.wav"
+    inside.write_bytes(b"RIFF")
+    status, headers, body = request(server, "POST", "/jobs", json.dumps({"path": str(inside)}),
+                                    {"Content-Type": "application/json"})
+    assert status == 202 and headers["Location"] == f"/jobs/{body['id']}"
+
+
+def test_full_queue_running_job_and_cancelled_job(api):
+    server, audio, _ = api
+    status, _, running = upload(server)
+    assert status == 202
+    assert audio.started.wait(10)
+    assert server.jobs[running["id"]].status == RUNNING
+
+    status, _, queued = upload(server)              # fills the single queue slot
+    assert status == 202
+    status, headers, body = upload(server)
+    assert status == 503 and headers["Retry-After"] == "30" and "full" in body["error"]
+
+    status, _, _ = request(server, "GET", f"/jobs/{running['id']}/result.json")
+    assert status == 409
+    status, _, _ = request(server, "DELETE", f"/jobs/{running['id']}")
+    assert status == 409
+
+    status, _, body = request(server, "DELETE", f"/jobs/{queued['id']}")
+    assert status == 200 and body["status"] == CANCELLED
+    job = server.jobs[running["id"]]
+    audio.release()
+    with job.changed:
+        job.changed.wait_for(lambda: job.finished, 10)
+    assert job.status == FAILED
+    # The cancelled job was never claimed by the worker
+    server.pool.stop()
+    assert len(audio.loaded) == 1
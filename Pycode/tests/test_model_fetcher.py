@@ -0,0 +1,121 @@
+"""fetch_model against RangeRequestHandler serving a mirror directory"""
+import functools
+import hashlib
+import http.server
+import os
+import threading
+
+import pytest
+
+import model_fetcher
+from model_fetcher import FetchError, RangeRequestHandler, fetch_model, is_verified, model_path
+
+CHUNK = 64 * 1024
+
+
+class RecordingHandler(RangeRequestHandler):
+    """Records every Range header; fails each range start listed in fail_starts once"""
+    requests = []
+    fail_starts = set()
+
+    def send_head(self):
+        rng = self.headers.get("Range", "")
+        type(self).requests.append(rng)
+        start = int(rng[len("bytes="):].split("-")[0]) if rng else None
+        if start in type(self).fail_starts:
+            type(self).fail_starts.discard(start)
+            self.send_error(500, "injected failure")
+            return None
+        return super().send_head()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class NoRangeHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, handler):
+    handler_class = type(handler.__name__, (handler,), {"requests": [], "fail_starts": set()})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0),
+                                             functools.partial(handler_class, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler_class
+
+
+@pytest.fixture
+def mirror(tmp_path, monkeypatch):
+    """A fake model of five chunks published under <sha256>/fake.pt, plus a fast retry policy"""
+    data = os.urandom(4 * CHUNK + 1234)
+    sha256 = hashlib.sha256(data).hexdigest()
+    (tmp_path / "mirror" / sha256).mkdir(parents=True)
+    (tmp_path / "mirror" / sha256 / "fake.pt").write_bytes(data)
+    monkeypatch.setitem(model_fetcher.MODEL_URLS, "fake", f"{sha256}/fake.pt")
+    monkeypatch.setattr(model_fetcher, "CHUNK_BYTES", CHUNK)
+    monkeypatch.setattr(model_fetcher, "RETRIES", 1)
+    servers = []
+
+    def start(handler=RecordingHandler):
+        server, handler_class = serve(tmp_path / "mirror", handler)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", handler_class
+
+    yield data, tmp_path / "models", start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parallel_download_is_verified_and_not_repeated(mirror):
+    data, root, start = mirror
+    base_url, handler = start()
+    path = fetch_model("fake", root, workers=4, base_url=base_url)
+    assert path == model_path("fake", root) and path.read_bytes() == data
+    assert is_verified("fake", root)
+    assert len(handler.requests) == 1 + 5            # probe plus one request per chunk
+
+    handler.requests.clear()
+    assert fetch_model("fake", root, base_url=base_url) == path
+    assert handler.requests == []
+
+
+def test_interrupted_download_resumes_with_the_missing_range(mirror):
+    data, root, start = mirror
+    base_url, handler = start()
+    handler.fail_starts.add(2 * CHUNK)
+    with pytest.raises(FetchError):
+        fetch_model("fake", root, workers=1, base_url=base_url)
+    assert not model_path("fake", root).exists()
+
+    handler.requests.clear()
+    path = fetch_model("fake", root, workers=1, base_url=base_url)
+    assert path.read_bytes() == data
+    assert handler.requests == ["bytes=0-0", f"bytes={2 * CHUNK}-{3 * CHUNK - 1}"]
+    assert not path.with_name(path.name + ".part.json").exists()
+
+
+def test_sha256_mismatch_removes_the_download(mirror, tmp_path):
+    data, root, start = mirror
+    served = next((tmp_path / "mirror").rglob("fake.pt"))
+    served.write_bytes(b"x" * len(data))
+    base_url, _ = start()
+    with pytest.raises(FetchError, match="does not match"):
+        fetch_model("fake", root, base_url=base_url)
+    path = model_path("fake", root)
+    assert not path.exists() and not path.with_name(path.name + ".part").exists()
+
+
+def test_truncated_checkpoint_is_downloaded_again(mirror):
+    data, root, start = mirror
+    base_url, _ = start()
+    root.mkdir()
+    model_path("fake", root).write_bytes(data[:1000])
+    assert fetch_model("fake", root, base_url=base_url).read_bytes() == data
+
+
+def test_server_without_ranges_is_streamed(mirror):
+    data, root, start = mirror
+    base_url, _ = start(NoRangeHandler)
+    assert fetch_model("fake", root, base_url=base_url).read_bytes() == data
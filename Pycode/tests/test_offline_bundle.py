@@ -0,0 +1,43 @@
+"""Offline bundle export and import between runtime folders, with a small wheel standing in for torch"""
+import hashlib
+import json
+import subprocess
+import sys
+
+from install_state import installed_distributions, python_version, write_install_info
+from model_fetcher import VERIFIED_NAME
+from offline_bundle import export_bundle, import_bundle, runtime_for
+from runtimes import active_runtime, runtime_dir
+from wheel_store import WheelStore
+
+
+def run_pip(args, label):
+    rc = subprocess.call([sys.executable, "-m", "pip", "-q", "--disable-pip-version-check", *args],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if rc:
+        raise RuntimeError(f"{label} failed with exit-code {rc}")
+
+
+def test_active_runtime_is_exported_and_imported_into_its_variant(tmp_path, make_wheel, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("WHISPER_RUNTIME", raising=False)
+    wheel = make_wheel(tmp_path / "wheels", "fakepkg", "1.0+cpu")
+    source = runtime_dir(".", "cpu")
+    run_pip(["install", "--no-deps", "--target", str(source), str(wheel)], "setup")
+    write_install_info(source, {"variant": "cpu", "python": python_version(), "packages": ["fakepkg"]})
+    assert active_runtime() == source
+
+    model = tmp_path / "tiny.pt"
+    model.write_bytes(b"weights" * 1000)
+    manifest = export_bundle(tmp_path / "bundle.zip", models=[model], extra_wheels=[wheel],
+                             store=WheelStore(tmp_path / "store"), log=lambda message: None)
+    assert [e["name"] for e in manifest["files"]] == [f"wheels/{wheel.name}", "models/tiny.pt"]
+
+    monkeypatch.chdir(tmp_path / "wheels")          # an empty machine: no runtime installed
+    manifest = import_bundle(tmp_path / "bundle.zip", run_pip, store=WheelStore(tmp_path / "store2"),
+                             model_dir=tmp_path / "models", log=lambda message: None)
+    assert runtime_for(manifest) == runtime_dir(".", "cpu")
+    assert installed_distributions(runtime_dir(".", "cpu"))["fakepkg"][0] == "1.0+cpu"
+    # The imported model is recorded as verified, so model_ready() does not hash it again
+    verified = json.loads((tmp_path / "models" / VERIFIED_NAME).read_text(encoding="utf-8"))
+    assert verified["tiny.pt"]["sha256"] == hashlib.sha256(model.read_bytes()).hexdigest()
@@ -0,0 +1,15 @@
+"""SegmentStore keeps whisper's timestamps and still finds segments by time"""
+from segment_store import SegmentStore
+
+
+def test_a_start_before_the_previous_start_is_kept_and_looked_up():
+    store = SegmentStore()
+    store.append(0.0, 2.0, "a")
+    store.append(4.0, 4.5, "b")
+    store.append(3.9, 5.0, "c")          # next chunk begins 100 ms before the previous segment
+    store.append(6.0, 7.0, "d")
+
+    assert [(seg.start, seg.end) for seg in store] == [(0.0, 2.0), (4.0, 4.5), (3.9, 5.0), (6.0, 7.0)]
+    assert store.to_dicts()[2]["start"] == 3.9
+    assert [store.index_at(t) for t in (1.0, 3.0, 4.7, 5.5, 6.5)] == [0, -1, 2, -1, 3]
+    assert store.index_range(4.6, 6.5) == (2, 4)
@@ -0,0 +1,55 @@
+"""TranscriptIndex: incremental reindexing and removal of documents"""
+import json
+
+from transcript_index import TranscriptIndex
+
+
+def write_transcript(path, *texts):
+    segments = [{"start": i, "end": i + 1, "text": text} for i, text in enumerate(texts)]
+    path.write_text(json.dumps({"transcription": segments, "source_file": "a.wav", "model": "tiny",
+                                "language": "en"}), encoding="utf-8")
+
+
+def test_reindex_keeps_documents_indexed_under_their_audio(tmp_path):
+    root = tmp_path / "jobs"
+    root.mkdir()
+    audio = root / "meeting.wav"
+    audio.write_bytes(b"RIFF")
+    index = TranscriptIndex(tmp_path / "index.sqlite3")
+    index.index_segments(audio, [(0.0, 1.5, "quarterly budget review")], source_file=audio.name)
+
+    assert index.reindex([root])["removed"] == 0
+    assert [hit["path"] for hit in index.search("budget")] == [str(audio)]
+
+    audio.unlink()
+    assert index.reindex([root])["removed"] == 1
+    assert index.search("budget") == []
+
+
+def test_reindex_updates_and_drops_json_documents(tmp_path):
+    transcript = tmp_path / "talk.json"
+    write_transcript(transcript, "first version")
+    index = TranscriptIndex(tmp_path / "index.sqlite3")
+    assert index.reindex([tmp_path])["indexed"] == 1
+    assert index.reindex([tmp_path])["unchanged"] == 1
+
+    write_transcript(transcript, "second edition of the talk")
+    index.reindex([tmp_path])
+    assert index.search("first version") == []
+    assert len(index.search("second edition")) == 1
+
+    transcript.unlink()
+    assert index.reindex([tmp_path])["removed"] == 1
+    assert index.document_count() == 0
+
+
+def test_non_transcript_json_is_parsed_once(tmp_path, monkeypatch):
+    (tmp_path / "settings.json").write_text('{"theme": "dark"}', encoding="utf-8")
+    index = TranscriptIndex(tmp_path / "index.sqlite3")
+    assert index.reindex([tmp_path])["skipped"] == 1
+
+    parsed = []
+    monkeypatch.setattr(index, "index_file", lambda path: parsed.append(path))
+    assert index.reindex([tmp_path])["skipped"] == 1
+    assert parsed == []
+
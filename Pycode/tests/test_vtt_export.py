@@ -0,0 +1,14 @@
+"""WebVTT export escapes cue text"""
+import transcription_core as core
+from segment_store import SegmentStore
+
+
+def test_plain_and_karaoke_cues_are_escaped(tmp_path):
+    store = SegmentStore()
+    store.append(0.0, 1.0, "if a < b && c > d")
+    store.append(1.0, 2.0, "<b>tags</b>", words=[(1.0, 1.5, " <b>", 0.9), (1.5, 2.0, " R&D", 0.8)])
+    path = tmp_path / "out.vtt"
+    core.write_vtt(path, store)
+    cues = path.read_text(encoding="utf-8").split("\n\n")
+    assert cues[1].splitlines()[1] == "if a &lt; b &amp;&amp; c &gt; d"
+    assert cues[2].splitlines()[1] == "<c>&lt;b&gt;</c><00:00:01.500><c> R&amp;D</c>"
@@ -0,0 +1,76 @@
+"""WheelStore against local directory indexes standing in for the CPU and CUDA indexes"""
+import subprocess
+import sys
+
+import pytest
+
+from install_state import installed_distributions
+from wheel_store import WheelStore
+
+
+class Pip:
+    """run_pip for WheelStore.install that records the label of every pip run"""
+
+    def __init__(self):
+        self.labels = []
+
+    def __call__(self, args, label):
+        self.labels.append(label)
+        rc = subprocess.call([sys.executable, "-m", "pip", "-q", "--disable-pip-version-check", *args],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if rc:
+            raise RuntimeError(f"{label} failed with exit-code {rc}")
+
+
+@pytest.fixture
+def indexes(tmp_path, make_wheel):
+    """A CPU and a CUDA wheelhouse publishing the same project under different local labels"""
+    cpu, cuda = tmp_path / "index-cpu", tmp_path / "index-cuda"
+    make_wheel(cpu, "fakepkg", "1.0+cpu")
+    make_wheel(cuda, "fakepkg", "1.0+cu126")
+    return str(cpu), str(cuda)
+
+
+def installed_version(target):
+    return installed_distributions(target)["fakepkg"][0]
+
+
+def test_miss_downloads_then_hit_installs_offline(tmp_path, indexes):
+    cpu, _ = indexes
+    store, pip = WheelStore(tmp_path / "store"), Pip()
+
+    downloaded = store.install(pip, ["fakepkg"], tmp_path / "first", cpu, ["--only-binary", ":all:"])
+    assert downloaded == ["fakepkg-1.0+cpu-py3-none-any.whl"]
+    assert pip.labels == ["pip (wheel cache)", "pip (download)", "pip"]
+
+    pip.labels.clear()
+    assert store.install(pip, ["fakepkg"], tmp_path / "second", cpu, ["--only-binary", ":all:"]) == []
+    assert pip.labels == ["pip (wheel cache)"]
+    assert installed_version(tmp_path / "second") == "1.0+cpu"
+
+
+def test_cached_wheel_of_another_index_is_not_used(tmp_path, indexes):
+    cpu, cuda = indexes
+    store, pip = WheelStore(tmp_path / "store"), Pip()
+
+    store.install(pip, ["fakepkg"], tmp_path / "cuda", cuda, ["--only-binary", ":all:"])
+    downloaded = store.install(pip, ["fakepkg"], tmp_path / "cpu", cpu, ["--only-binary", ":all:"])
+
+    assert downloaded == ["fakepkg-1.0+cpu-py3-none-any.whl"]
+    assert installed_version(tmp_path / "cuda") == "1.0+cu126"
+    assert installed_version(tmp_path / "cpu") == "1.0+cpu"
+    # Switching back is a cache hit that still gets the CUDA build
+    pip.labels.clear()
+    assert store.install(pip, ["fakepkg"], tmp_path / "cuda-again", cuda, ["--only-binary", ":all:"]) == []
+    assert installed_version(tmp_path / "cuda-again") == "1.0+cu126"
+
+
+def test_exact_versions_resolve_across_sources(tmp_path, indexes):
+    cpu, cuda = indexes
+    store, pip = WheelStore(tmp_path / "store"), Pip()
+    store.install(pip, ["fakepkg"], tmp_path / "cpu", cpu, ["--only-binary", ":all:"])
+    store.install(pip, ["fakepkg"], tmp_path / "cuda", cuda, ["--only-binary", ":all:"])
+
+    pip(["install", "fakepkg==1.0+cu126", "--target", str(tmp_path / "repair"), *store.offline_args()], "repair")
+    assert installed_version(tmp_path / "repair") == "1.0+cu126"
+
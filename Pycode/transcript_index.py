@@ -0,0 +1,298 @@
+"""Local full-text search index over saved transcripts (SQLite FTS5)"""
+import argparse
+import contextlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path.home() / ".cache" / "whisper_transcription" / "transcripts.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id          INTEGER PRIMARY KEY,
+    path        TEXT UNIQUE NOT NULL,
+    mtime       REAL,
+    size        INTEGER,
+    source_file TEXT,
+    model       TEXT,
+    language    TEXT,
+    indexed_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS segment_rows (
+    id          INTEGER PRIMARY KEY,
+    doc_id      INTEGER NOT NULL,
+    start_ms    INTEGER,
+    end_ms      INTEGER,
+    text        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segment_rows_doc ON segment_rows (doc_id);
+-- JSON files that are not transcripts, so reindex() does not parse them again
+CREATE TABLE IF NOT EXISTS ignored_files (
+    path        TEXT PRIMARY KEY,
+    mtime       REAL,
+    size        INTEGER
+);
+"""
+
+# segments is an external-content FTS5 table over segment_rows; these keep it in step,
+# so a document's segments are removed through the doc_id index instead of a full scan
+TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS segment_rows_insert AFTER INSERT ON segment_rows BEGIN
+    INSERT INTO segments (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segment_rows_delete AFTER DELETE ON segment_rows BEGIN
+    INSERT INTO segments (segments, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def format_ms(ms):
+    """Format milliseconds as HH:MM:SS.mmm"""
+    seconds, millis = divmod(int(ms), 1000)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+
+class TranscriptIndex:
+    """FTS5 index of transcript segments with their timestamps, source file, model and language"""
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, log=None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self._write_lock = threading.Lock()
+        self._worker = None
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            self.tokenizer = self._create_fts_table(conn)
+            conn.executescript(TRIGGERS)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _create_fts_table(self, conn):
+        """Create the segment table; trigram tokenization matches ja/zh/ko text without word breaks"""
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'segments'").fetchone()
+        if row:
+            return "trigram" if "trigram" in row[0] else "unicode61"
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE segments USING fts5("
+                    f"text, content='segment_rows', content_rowid='id', tokenize='{tokenizer}')"
+                )
+                return tokenizer
+            except sqlite3.OperationalError:
+                continue
+        raise RuntimeError("SQLite FTS5 is not available in this Python build")
+
+    # ---------- indexing ----------
+    def index_segments(self, path, segments, source_file="", model="", language="", mtime=None, size=None):
+        """Replace the document stored under path with the given (start, end, text) segments"""
+        path = str(path)
+        language = (language or "").split(' - ')[0]
+        rows = []
+        for seg in segments:
+            if isinstance(seg, dict):
+                start, end, text = seg["start"], seg["end"], seg["text"]
+            else:
+                start, end, text = seg[0], seg[1], seg[2]
+            if text:
+                rows.append((text, int(round(start * 1000)), int(round(end * 1000))))
+
+        with self._write_lock, self._connect() as conn:
+            self._delete(conn, path)
+            cur = conn.execute(
+                "INSERT INTO documents (path, mtime, size, source_file, model, language, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, mtime, size, source_file, model, language,
+                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            doc_id = cur.lastrowid
+            conn.executemany(
+                "INSERT INTO segment_rows (text, doc_id, start_ms, end_ms) VALUES (?, ?, ?, ?)",
+                [(text, doc_id, s, e) for text, s, e in rows]
+            )
+            conn.execute("DELETE FROM ignored_files WHERE path = ?", (path,))
+        return len(rows)
+
+    def index_file(self, json_path):
+        """Index one transcript JSON written by save_transcription; returns the segment count or None"""
+        json_path = Path(json_path).absolute()
+        st = json_path.stat()
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("transcription"), list):
+            return None
+        return self.index_segments(
+            json_path, data["transcription"],
+            source_file=data.get("source_file", ""),
+            model=data.get("model", ""),
+            language=data.get("language", ""),
+            mtime=st.st_mtime, size=st.st_size
+        )
+
+    def remove(self, path):
+        with self._write_lock, self._connect() as conn:
+            self._delete(conn, str(path))
+            conn.execute("DELETE FROM ignored_files WHERE path = ?", (str(path),))
+
+    def ignore(self, path, mtime, size):
+        """Remember a JSON file that is not a transcript (dropping any document indexed under it)"""
+        with self._write_lock, self._connect() as conn:
+            self._delete(conn, str(path))
+            conn.execute("INSERT OR REPLACE INTO ignored_files (path, mtime, size) VALUES (?, ?, ?)",
+                         (str(path), mtime, size))
+
+    def _delete(self, conn, path):
+        row = conn.execute("SELECT id FROM documents WHERE path = ?", (path,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM segment_rows WHERE doc_id = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+
+    def reindex(self, directories, progress=None):
+        """Incrementally index every *.json under the directories.
+        Files whose mtime and size are unchanged are skipped; documents whose file (the
+        JSON, or the audio for jobs indexed without one) no longer exists are dropped.
+        Returns a dict of counts."""
+        stats = {"indexed": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+        with self._connect() as conn:
+            known = {row[0]: (row[1], row[2])
+                     for row in conn.execute("SELECT path, mtime, size FROM documents")}
+            ignored = {row[0]: (row[1], row[2])
+                       for row in conn.execute("SELECT path, mtime, size FROM ignored_files")}
+
+        seen = set()
+        roots = [Path(d).absolute() for d in directories]
+        for root in roots:
+            for json_path in root.rglob("*.json"):
+                key = str(json_path)
+                seen.add(key)
+                try:
+                    st = json_path.stat()
+                except OSError:
+                    continue
+                if known.get(key) == (st.st_mtime, st.st_size):
+                    stats["unchanged"] += 1
+                    continue
+                if ignored.get(key) == (st.st_mtime, st.st_size):
+                    stats["skipped"] += 1
+                    continue
+                if self.index_file(json_path) is None:
+                    self.ignore(key, st.st_mtime, st.st_size)
+                    stats["skipped"] += 1
+                else:
+                    stats["indexed"] += 1
+                if progress:
+                    progress(key, stats)
+
+        for key in set(known) | set(ignored):
+            under_root = any(key.startswith(str(root) + os.sep) for root in roots)
+            if under_root and key not in seen and not os.path.exists(key):
+                self.remove(key)
+                if key in known:
+                    stats["removed"] += 1
+        return stats
+
+    def reindex_async(self, directories, on_done=None, progress=None):
+        """Run reindex() on a background thread; on_done receives the stats or the exception"""
+        def task():
+            try:
+                result = self.reindex(directories, progress)
+            except Exception as e:
+                result = e
+            if on_done:
+                on_done(result)
+
+        self._worker = threading.Thread(target=task, daemon=True)
+        self._worker.start()
+        return self._worker
+
+    def index_async(self, fn, *args, **kwargs):
+        """Run one indexing call (index_file / index_segments) on a background thread"""
+        def task():
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                self.log(f"Transcript indexing failed: {e}")
+
+        threading.Thread(target=task, daemon=True).start()
+
+    # ---------- search ----------
+    def search(self, query, limit=100):
+        """Return hits as dicts with path, source_file, model, language, start_ms, end_ms and text"""
+        query = query.strip()
+        if not query:
+            return []
+        columns = "SELECT d.path, d.source_file, d.model, d.language, r.start_ms, r.end_ms, r.text "
+        with self._connect() as conn:
+            if self.tokenizer == "trigram" and len(query) < 3:
+                # Trigram index cannot serve one- or two-character queries
+                like = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                rows = conn.execute(columns + "FROM segment_rows r JOIN documents d ON d.id = r.doc_id "
+                                    "WHERE r.text LIKE ? ESCAPE '\\' LIMIT ?", (like, limit)).fetchall()
+            else:
+                phrase = '"' + query.replace('"', '""') + '"'
+                rows = conn.execute(columns + "FROM segments JOIN segment_rows r ON r.id = segments.rowid "
+                                    "JOIN documents d ON d.id = r.doc_id "
+                                    "WHERE segments MATCH ? ORDER BY rank LIMIT ?", (phrase, limit)).fetchall()
+        keys = ("path", "source_file", "model", "language", "start_ms", "end_ms", "text")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def document_count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search and index saved Whisper transcripts")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="index database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="incrementally index transcript JSON files under directories")
+    p_index.add_argument("directories", nargs="+")
+
+    p_search = sub.add_parser("search", help="search indexed transcripts for a phrase")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=50)
+    p_search.add_argument("--json", action="store_true", help="print hits as JSON lines")
+
+    args = parser.parse_args(argv)
+    index = TranscriptIndex(args.db)
+
+    if args.command == "index":
+        stats = index.reindex(args.directories)
+        print(f"indexed {stats['indexed']}, unchanged {stats['unchanged']}, "
+              f"skipped {stats['skipped']}, removed {stats['removed']} "
+              f"({index.document_count()} documents in {index.db_path})")
+        return 0
+
+    hits = index.search(args.query, args.limit)
+    for hit in hits:
+        if args.json:
+            print(json.dumps(hit, ensure_ascii=False))
+        else:
+            print(f"{format_ms(hit['start_ms'])} ({hit['start_ms']} ms)  "
+                  f"{hit['source_file'] or Path(hit['path']).name}  "
+                  f"[{hit['model']}, {hit['language']}]  {hit['text']}")
+    return 0 if hits else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,572 @@
+"""Headless batch transcription.
+
+    python Transcription.py --batch inputs/ --model large-v3 --out out/ --formats srt,json
+
+Uses the same model loading, chunking and export code as the GUI, without tkinter.
+Exit codes: 0 all files succeeded, 1 one or more files failed, 2 usage error or no inputs,
+3 PyTorch/Whisper not installed, 4 model could not be loaded, 130 interrupted.
+"""
+import argparse
+import contextlib
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import transcription_core as core
+from job_profiler import PROFILE_MODES, JobProfile
+from memory_budget import MemoryBudgetError, MemoryTracker, format_bytes, parse_budget, plan_memory, resolve_budget
+from result_cache import ResultCache
+from stage_timing import MetricsTextfile, StageTimer
+from transcript_index import TranscriptIndex
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_NO_WHISPER = 3
+EXIT_MODEL_FAILED = 4
+EXIT_INTERRUPTED = 130
+
+
+def add_transcription_args(parser, file_options=True):
+    """Options shared by every headless mode (model, outputs and whisper parameters).
+    file_options adds the ones only the file modes (--batch, --watch) implement: directory
+    walking, profiling, the memory budget and whisper's console output."""
+    parser.add_argument("--model", default="large-v3", choices=core.MODEL_NAMES)
+    parser.add_argument("--formats", default="srt,json",
+                        help=f"comma-separated output formats: {','.join(core.OUTPUT_FORMATS)}")
+    parser.add_argument("--language", default="ja", help="language code, or 'auto' to detect")
+    parser.add_argument("--keyword", default="", help="topic keyword used as the initial prompt")
+    parser.add_argument("--device", default="auto", choices=["auto", "cpu", "cuda"])
+    parser.add_argument("--chunk-minutes", type=float, default=core.CHUNK_SECONDS / 60)
+    if file_options:
+        parser.add_argument("--recursive", action="store_true", help="descend into subdirectories")
+        parser.add_argument("--overwrite", action="store_true", help="redo files whose outputs already exist")
+        parser.add_argument("--no-index", action="store_true",
+                            help="do not add results to the transcript search index")
+        parser.add_argument("--profile", nargs="?", const="cprofile", default=None, choices=PROFILE_MODES,
+                            help="profile each job and save <name>.prof/.folded and <name>.profile.txt next to "
+                                 "its outputs; 'sample' is a low-overhead sampling profiler (default: cprofile)")
+        parser.add_argument("--memory-budget", default="auto", metavar="SIZE",
+                            help="memory a job may use, e.g. 3.5G; longer files get shorter chunks or streaming "
+                                 "decode, and jobs that still do not fit are refused before they start. "
+                                 "'auto' (default) adapts to the free memory but never refuses; 'off' disables")
+        parser.add_argument("--trace-memory", action="store_true",
+                            help="also record Python/numpy allocation peaks per stage (tracemalloc; slower)")
+        parser.add_argument("--verbose", action="store_true", help="print whisper's per-segment output")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always transcribe, even when an identical recording was done with the same settings")
+    parser.add_argument("--metrics-file", default=None, metavar="PATH",
+                        help="keep per-stage timing counters in this Prometheus textfile (node_exporter)")
+
+    p = core.DEFAULT_PARAMS
+    parser.add_argument("--temperature", type=float, default=p["temperature"])
+    parser.add_argument("--best-of", type=int, default=p["best_of"])
+    parser.add_argument("--beam-size", type=int, default=p["beam_size"])
+    parser.add_argument("--logprob-threshold", type=float, default=p["logprob_threshold"])
+    parser.add_argument("--no-speech-threshold", type=float, default=p["no_speech_threshold"])
+    parser.add_argument("--condition-on-previous-text", action="store_true")
+    parser.add_argument("--word-timestamps", action="store_true")
+    parser.add_argument("--resegment", action="store_true",
+                        help="re-segment SRT/VTT cues to line length and reading-speed limits")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Transcription.py",
+        description="Transcribe audio files or whole directories without the GUI")
+    parser.add_argument("--batch", nargs="+", required=True, metavar="PATH",
+                        help="audio files and/or directories to transcribe")
+    parser.add_argument("--out", default=None,
+                        help="output directory (default: next to each input)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="models loaded side by side; above 1, work is scheduled longest-first in chunks")
+    parser.add_argument("--report-seconds", type=float, default=30.0,
+                        help="interval of the per-worker utilization report (with --workers)")
+    parser.add_argument("--shared-weights", action="store_true",
+                        help="run the workers as processes that map one shared fp32 copy of the weights (CPU)")
+    add_transcription_args(parser)
+    return parser
+
+
+def params_from_args(args):
+    return {
+        "temperature": args.temperature,
+        "best_of": args.best_of,
+        "beam_size": args.beam_size,
+        "logprob_threshold": args.logprob_threshold,
+        "no_speech_threshold": args.no_speech_threshold,
+        "condition_on_previous_text": args.condition_on_previous_text,
+        "word_timestamps": args.word_timestamps,
+        "resegment_subtitles": args.resegment,
+    }
+
+
+def collect_inputs(paths, recursive=False):
+    """Expand files and directories into (input_file, root_dir) pairs of audio files"""
+    found = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            pattern = "**/*" if recursive else "*"
+            for f in sorted(path.glob(pattern)):
+                if f.is_file() and f.suffix.lower() in core.AUDIO_EXTENSIONS:
+                    found.append((f, path))
+        elif path.is_file():
+            found.append((path, path.parent))
+        else:
+            print(f"warning: {raw} does not exist", file=sys.stderr)
+    return found
+
+
+def output_base(input_file, root, out_dir):
+    """Output path without extension; keeps the input's layout below root inside out_dir"""
+    if out_dir is None:
+        return input_file.with_suffix("")
+    rel = input_file.relative_to(root).with_suffix("")
+    return Path(out_dir) / rel
+
+
+def parse_formats(parser, value):
+    formats = [f.strip().lower() for f in value.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in core.OUTPUT_FORMATS]
+    if not formats or unknown:
+        parser.error(f"unsupported formats: {', '.join(unknown) or '(none)'}")
+    return formats
+
+
+def open_index(args):
+    """TranscriptIndex unless --no-index was given or the database cannot be opened"""
+    if args.no_index:
+        return None
+    try:
+        return TranscriptIndex()
+    except Exception as e:
+        print(f"warning: transcript index unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def open_cache(args):
+    """ResultCache unless --no-cache was given or the database cannot be opened"""
+    if args.no_cache:
+        return None
+    try:
+        return ResultCache()
+    except Exception as e:
+        print(f"warning: result cache unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def open_metrics(args):
+    """MetricsTextfile for --metrics-file, or None"""
+    if not args.metrics_file:
+        return None
+    return MetricsTextfile(args.metrics_file, {"model": args.model})
+
+
+def profile_job(args, base):
+    """JobProfile for --profile, or a context that does nothing"""
+    if not getattr(args, "profile", None):
+        return contextlib.nullcontext()
+    return JobProfile(args.profile, base)
+
+
+def report_profile(profile):
+    if getattr(profile, "paths", None):
+        print(f"    profile: {', '.join(profile.paths)}", flush=True)
+
+
+def chunk_seconds_for(args, plan):
+    """Chunk length a file is transcribed with: the memory plan's, else --chunk-minutes"""
+    return plan.chunk_seconds if plan else args.chunk_minutes * 60
+
+
+def cache_lookup(cache, input_file, args, params, chunk_seconds):
+    """(content_hash, key, hit) for input_file transcribed in chunk_seconds chunks;
+    hit is (store, duration) or None"""
+    content_hash, key = cache.key_for(input_file, args.model, args.language, args.keyword,
+                                      params, chunk_seconds)
+    return content_hash, key, cache.get(key)
+
+
+def remember_result(cache, cache_keys, input_file, store, duration, args):
+    """Store a fresh transcript so identical input is served from the cache next time"""
+    if cache is None or input_file not in cache_keys:
+        return
+    content_hash, key = cache_keys[input_file]
+    try:
+        cache.put(key, content_hash, store, args.model, args.language, duration)
+    except Exception as e:
+        print(f"warning: caching the result failed: {e}", file=sys.stderr)
+
+
+def select_device(args):
+    """Make PyTorch/Whisper importable and pick the device; None when they are not installed"""
+    if not core.setup_pytorch_path():
+        print("PyTorch/Whisper not installed, please run PyTorch Downloader first", file=sys.stderr)
+        return None
+    return core.default_device() if args.device == "auto" else args.device
+
+
+def load_resident_model(args):
+    """Load the model once for a headless run; returns (model, device) or (None, exit_code)"""
+    device = select_device(args)
+    if device is None:
+        return None, EXIT_NO_WHISPER
+    progress = None
+    if not core.check_model_exists(args.model):
+        print(f"Downloading model '{args.model}' ({core.MODEL_SIZES.get(args.model)})...")
+        if sys.stdout.isatty():
+            progress = lambda done, total: print(f"\r  {done / 2 ** 20:.0f} / {total / 2 ** 20:.0f} MB", end="", flush=True)
+    t0 = time.perf_counter()
+    memory = MemoryTracker()
+    try:
+        with memory.stage("model_load"):
+            model = core.load_model(args.model, device, progress=progress)
+    except Exception as e:
+        print(f"Model loading failed: {e}", file=sys.stderr)
+        return None, EXIT_MODEL_FAILED
+    if progress is not None:
+        print()
+    info = memory.stages["model_load"]
+    print(f"Model '{args.model}' loaded on {device} in {time.perf_counter() - t0:.1f}s "
+          f"(RSS {(info['rss_after'] - info['rss_before']) / 2 ** 20:+.0f} MB, peak {format_bytes(info['rss_peak'])})")
+    return model, device
+
+
+def memory_settings(parser, args):
+    """(budget bytes or None, enforce) for --memory-budget; "auto" is measured once, before loading"""
+    try:
+        budget = parse_budget(args.memory_budget)
+    except ValueError as e:
+        parser.error(str(e))
+    return resolve_budget(budget), budget not in (None, "auto")
+
+
+def plan_files(args, pending, total, budget, enforce, report):
+    """Pre-flight memory check of each pending file; returns (runnable files, {input_file: MemoryPlan})"""
+    from batch_scheduler import probe_durations
+
+    device = "cpu" if args.device == "auto" else args.device      # the CPU estimate is the larger one
+    durations = probe_durations([input_file for _, input_file, _ in pending])
+    runnable = []
+    plans = {}
+    for n, input_file, base in pending:
+        prefix = f"[{n}/{total}] {input_file}"
+        try:
+            plan = plan_memory(args.model, durations[input_file][0], args.chunk_minutes * 60, budget,
+                               device, enforce)
+        except MemoryBudgetError as e:
+            report.fail(input_file, prefix, e)
+            continue
+        if plan.adjusted or not plan.fits:
+            print(f"{prefix} ... memory: {plan.describe()}"
+                  + ("" if plan.fits else ", may run out of memory"))
+        plans[input_file] = plan
+        runnable.append((n, input_file, base))
+    return runnable, plans
+
+
+def prepare_shared(args):
+    """Set up --shared-weights; returns the device ("cpu") or an exit code"""
+    device = select_device(args)
+    if device is None:
+        return EXIT_NO_WHISPER
+    if device != "cpu":
+        print("--shared-weights maps the weights in host memory; running the workers on cpu")
+    from shared_weights import prepare_shared_weights, shared_size_text
+    try:
+        path = prepare_shared_weights(args.model)
+    except Exception as e:
+        print(f"Preparing shared weights failed: {e}", file=sys.stderr)
+        return EXIT_MODEL_FAILED
+    print(f"{args.workers} worker process(es) share {path} ({shared_size_text(args.model)})")
+    return "cpu"
+
+
+def index_result(index, input_file, base, formats, store, args):
+    if "json" in formats:
+        index.index_file(f"{base}.json")
+    else:
+        index.index_segments(Path(input_file).absolute(), list(store),
+                             source_file=Path(input_file).name, model=args.model, language=args.language)
+
+
+def file_line(prefix, store, duration, elapsed, written):
+    rtf = elapsed / duration if duration > 0 else 0.0
+    return (f"{prefix} ... ok: {len(store)} segments, "
+            f"{timedelta(seconds=int(duration))} audio in {elapsed:.1f}s (RTF {rtf:.2f}) "
+            f"-> {', '.join(os.path.basename(w) for w in written)}")
+
+
+def serve_cached(args, pending, total, formats, params, cache, index, report, plans=None):
+    """Export files whose transcript is already cached; returns (still pending, cache keys)"""
+    remaining = []
+    cache_keys = {}
+    for n, input_file, base in pending:
+        try:
+            chunk_seconds = chunk_seconds_for(args, (plans or {}).get(input_file))
+            content_hash, key, hit = cache_lookup(cache, input_file, args, params, chunk_seconds)
+        except Exception as e:
+            print(f"warning: cache lookup for {input_file} failed: {e}", file=sys.stderr)
+            remaining.append((n, input_file, base))
+            continue
+        if hit is None:
+            cache_keys[input_file] = (content_hash, key)
+            remaining.append((n, input_file, base))
+            continue
+        store, duration = hit
+        prefix = f"[{n}/{total}] {input_file}"
+        try:
+            written = core.export_result(store, input_file, base, formats, args.language, args.keyword.strip(),
+                                         args.model, "", params)
+        except Exception as e:
+            report.fail(input_file, prefix, e)
+            continue
+        report.cached(prefix, store, duration, written)
+        if index:
+            index_result(index, input_file, base, formats, store, args)
+    return remaining, cache_keys
+
+
+def scheduled_chunk_seconds(args, pending, budget, enforce):
+    """Chunk length that keeps --workers models with one chunk each inside the budget,
+    or None when even the shortest chunks do not fit an explicit budget"""
+    from batch_scheduler import probe_durations
+
+    device = "cpu" if args.device == "auto" else args.device
+    longest = max(seconds for seconds, _ in probe_durations([f for _, f, _ in pending]).values())
+    try:
+        plan = plan_memory(args.model, longest, args.chunk_minutes * 60, budget, device, enforce,
+                           streaming=True, workers=args.workers)
+    except MemoryBudgetError as e:
+        print(f"Memory budget: {e}", file=sys.stderr)
+        return None
+    if plan.adjusted or not plan.fits:
+        print(f"Memory: {plan.describe()}" + ("" if plan.fits else ", may run out of memory"))
+    return plan.chunk_seconds
+
+
+def run_sequential(args, pending, total, formats, params, model, device, index, report,
+                   cache=None, cache_keys=None, plans=None):
+    """One file after another on a single model"""
+    for n, input_file, base in pending:
+        prefix = f"[{n}/{total}] {input_file}"
+        t_file = time.perf_counter()
+        timer = StageTimer()
+        memory = MemoryTracker(args.trace_memory)
+        plan = (plans or {}).get(input_file)
+        profile = profile_job(args, base)
+        try:
+            with profile:
+                store, duration, written = core.transcribe_file(
+                    model, input_file, base, formats,
+                    language=args.language,
+                    keyword=args.keyword.strip(),
+                    model_name=args.model,
+                    device=device,
+                    params=params,
+                    chunk_seconds=chunk_seconds_for(args, plan),
+                    verbose=True if args.verbose else None,
+                    timer=timer,
+                    memory=memory,
+                    streaming=plan.streaming if plan else False
+                )
+        except Exception as e:
+            report.fail(input_file, prefix, e)
+            report_profile(profile)
+            continue
+
+        report.done(prefix, store, duration, time.perf_counter() - t_file, written, timer, memory)
+        report_profile(profile)
+        remember_result(cache, cache_keys, input_file, store, duration, args)
+        if index:
+            index_result(index, input_file, base, formats, store, args)
+
+
+def run_scheduled(args, pending, total, formats, params, model, device, index, report,
+                  cache=None, cache_keys=None, plans=None):
+    """Chunks of all files spread longest-first over --workers models"""
+    from batch_scheduler import BatchScheduler, probe_durations
+
+    t0 = time.perf_counter()
+    durations = probe_durations([input_file for _, input_file, _ in pending])
+    estimated = sum(1 for _, est in durations.values() if est)
+    audio_total = sum(d for d, _ in durations.values())
+    print(f"Probed {len(pending)} files in {time.perf_counter() - t0:.1f}s: "
+          f"{timedelta(seconds=int(audio_total))} audio"
+          + (f" ({estimated} estimated from file size)" if estimated else ""))
+
+    if model is None:
+        # --shared-weights: each worker is a process attached to the memory-mapped weight file
+        from shared_weights import ModelProcess, threads_per_process
+        threads = threads_per_process(args.workers)
+
+        def model_loader(name, dev):
+            return ModelProcess(name, threads)
+    else:
+        preloaded = [model]
+        preload_lock = threading.Lock()
+
+        def model_loader(name, dev):
+            # The model loaded (and downloaded if needed) up front serves the first worker
+            with preload_lock:
+                if preloaded:
+                    return preloaded.pop()
+            return core.load_model(name, dev)
+
+    scheduler = BatchScheduler(
+        args.workers, args.model, device, formats, params,
+        language=args.language,
+        keyword=args.keyword.strip(),
+        chunk_seconds=args.chunk_minutes * 60,
+        model_loader=model_loader,
+        report_seconds=args.report_seconds,
+        verbose=True if args.verbose else None
+    )
+    numbers = {input_file: n for n, input_file, _ in pending}
+    scheduler.add_files((input_file, base) + durations[input_file] for _, input_file, base in pending)
+    print(f"{scheduler.pieces} pieces on {args.workers} workers, "
+          f"predicted makespan {timedelta(seconds=int(scheduler.predicted_makespan()))} of audio per worker")
+
+    report_lock = threading.Lock()
+
+    def on_done(task, store, written, busy):
+        prefix = f"[{numbers[task.input_file]}/{total}] {task.input_file}"
+        with report_lock:
+            report.done(prefix, store, task.duration, busy, written, task.timer)
+            remember_result(cache, cache_keys, task.input_file, store, task.duration, args)
+            if index:
+                try:
+                    index_result(index, task.input_file, task.base, formats, store, args)
+                except Exception as e:
+                    print(f"warning: indexing failed: {e}", file=sys.stderr)
+
+    def on_failed(task, error):
+        with report_lock:
+            report.fail(task.input_file, f"[{numbers[task.input_file]}/{total}] {task.input_file}", error)
+
+    scheduler.on_file_done = on_done
+    scheduler.on_file_failed = on_failed
+    scheduler.run()
+    print("Worker utilization:")
+    for line in scheduler.summary_lines():
+        print(line)
+
+
+class BatchReport:
+    """Per-file result lines and the totals printed at the end of a batch"""
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics
+        self.done_count = 0
+        self.cached_count = 0
+        self.failed_files = []
+        self.audio_total = 0.0
+        self.busy_total = 0.0
+
+    def done(self, prefix, store, duration, elapsed, written, timer=None, memory=None):
+        self.done_count += 1
+        self.audio_total += duration
+        self.busy_total += elapsed
+        print(file_line(prefix, store, duration, elapsed, written), flush=True)
+        if timer is not None:
+            print(f"    stages: {timer.summary_line()}", flush=True)
+            if self.metrics:
+                self.metrics.record(timer, duration)
+        if memory is not None and memory.stages:
+            print(f"    memory: {memory.summary_line()}", flush=True)
+
+    def cached(self, prefix, store, duration, written):
+        self.cached_count += 1
+        print(f"{prefix} ... served from cache: {len(store)} segments, "
+              f"{timedelta(seconds=int(duration or 0))} audio "
+              f"-> {', '.join(os.path.basename(w) for w in written)}", flush=True)
+
+    def fail(self, input_file, prefix, error):
+        self.failed_files.append(str(input_file))
+        print(f"{prefix} ... FAILED: {error}", flush=True)
+        if self.metrics:
+            self.metrics.record_failure()
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    formats = parse_formats(parser, args.formats)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    budget, enforce = memory_settings(parser, args)
+    if args.profile and (args.workers > 1 or args.shared_weights):
+        parser.error("--profile profiles one job at a time; use it without --workers or --shared-weights")
+
+    inputs = collect_inputs(args.batch, args.recursive)
+    if not inputs:
+        print("No audio files found.", file=sys.stderr)
+        return EXIT_USAGE
+
+    total = len(inputs)
+    pending = []
+    skipped = 0
+    for n, (input_file, root) in enumerate(inputs, 1):
+        base = output_base(input_file, root, args.out)
+        if not args.overwrite and core.outputs_exist(base, formats):
+            print(f"[{n}/{total}] {input_file} ... skipped (outputs exist)")
+            skipped += 1
+        else:
+            pending.append((n, input_file, base))
+
+    report = BatchReport(open_metrics(args))
+    params = params_from_args(args)
+    index = open_index(args) if pending else None
+    cache = open_cache(args) if pending else None
+    scheduled = args.workers > 1 or args.shared_weights
+    plans = None
+    # Plan memory first: a shortened chunk is part of the cache key
+    if pending and budget is not None:
+        if scheduled:
+            chunk_seconds = scheduled_chunk_seconds(args, pending, budget, enforce)
+            if chunk_seconds is None:
+                return EXIT_FAILED
+            args.chunk_minutes = chunk_seconds / 60
+        else:
+            pending, plans = plan_files(args, pending, total, budget, enforce, report)
+
+    cache_keys = {}
+    if cache and pending:
+        pending, cache_keys = serve_cached(args, pending, total, formats, params, cache, index, report, plans)
+
+    if pending:
+        if args.shared_weights:
+            model, device = None, prepare_shared(args)
+            if isinstance(device, int):
+                return device           # exit code
+        else:
+            model, device = load_resident_model(args)
+            if model is None:
+                return device           # exit code
+
+        t0 = time.perf_counter()
+        run = run_scheduled if scheduled else run_sequential
+        try:
+            run(args, pending, total, formats, params, model, device, index, report, cache, cache_keys, plans)
+        except KeyboardInterrupt:
+            print("Interrupted.", file=sys.stderr)
+            return EXIT_INTERRUPTED
+        wall = time.perf_counter() - t0
+    else:
+        wall = 0.0
+
+    print("-" * 50)
+    print(f"Done: {report.done_count} transcribed, {report.cached_count} from cache, {skipped} skipped, {len(report.failed_files)} failed, "
+          f"{timedelta(seconds=int(report.audio_total))} audio in {timedelta(seconds=int(wall))}")
+    for f in report.failed_files:
+        print(f"  failed: {f}")
+    return EXIT_FAILED if report.failed_files else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
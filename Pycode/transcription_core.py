@@ -0,0 +1,524 @@
+"""Headless transcription engine shared by the GUI and the command-line entry points.
+Nothing in here imports tkinter."""
+import contextlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import wave
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from machine_profile import profile_defaults
+from model_fetcher import MODEL_URLS, fetch_model, model_ready
+from runtimes import active_runtime
+from segment_store import SegmentStore
+from stage_timing import StageTimer
+from subtitle_resegment import SubtitleRules, resegment
+
+# Dynamic library loading configuration
+WHISPER_AVAILABLE = False
+whisper = None
+torch = None
+# Defaults from the machine profile written by check_in_exe, set by setup_pytorch_path()
+MACHINE_DEFAULTS = {}
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30 * 60
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac")
+OUTPUT_FORMATS = ("json", "txt", "srt", "vtt")
+
+MODEL_NAMES = ["tiny", "base", "small", "medium", "large", "large-v2", "large-v3", "large-v3-turbo"]
+MODEL_SIZES = {
+    "tiny":  "~75 MB",
+    "base":  "~142 MB",
+    "small": "~466 MB",
+    "medium": "~1.46 GB",
+    "large": "~2.96 GB",
+    "large-v2": "~2.96 GB",
+    "large-v3": "~3.09 GB",
+    "large-v3-turbo": "~1.6 GB"
+}
+
+DEFAULT_PARAMS = {
+    "temperature": 0.0,
+    "best_of": 10,
+    "beam_size": 10,
+    "logprob_threshold": -1,
+    "no_speech_threshold": 0.5,
+    "condition_on_previous_text": False,
+    "word_timestamps": False,
+    "resegment_subtitles": False,
+    "fp16": False,
+}
+
+
+def app_base_path():
+    """Folder holding the executable (frozen) or this source file"""
+    if getattr(sys, 'frozen', False):
+        return Path(sys.executable).parent
+    return Path(__file__).parent
+
+
+def setup_pytorch_path():
+    """Setup PyTorch library path for dynamic loading; the folder is the runtime selected
+    in pytorch_runtimes/active.json (see runtimes.py). The thread count measured by
+    check_in_exe (machine_profile.py) is applied once torch is loaded."""
+    global WHISPER_AVAILABLE, whisper, torch, MACHINE_DEFAULTS
+
+    pytorch_dir = active_runtime(app_base_path())
+
+    if pytorch_dir.exists():
+        pytorch_path = str(pytorch_dir.absolute())
+        if pytorch_path not in sys.path:
+            sys.path.insert(0, pytorch_path)
+
+        try:
+            import torch as torch_module
+            import whisper as whisper_module
+            torch = torch_module
+            whisper = whisper_module
+            WHISPER_AVAILABLE = True
+            print(f"Successfully loaded PyTorch from: {pytorch_path}")
+            MACHINE_DEFAULTS = profile_defaults(torch)
+            if MACHINE_DEFAULTS.get("threads"):
+                torch.set_num_threads(MACHINE_DEFAULTS["threads"])
+            if MACHINE_DEFAULTS:
+                print(f"Machine profile defaults: {MACHINE_DEFAULTS}")
+            return True
+        except ImportError as e:
+            print(f"Failed to import PyTorch/Whisper: {e}")
+            return False
+    else:
+        print(f"PyTorch directory not found at: {pytorch_dir}")
+    return False
+
+
+def default_device():
+    """CUDA when available, unless the machine profile measured the CPU as the better choice"""
+    if MACHINE_DEFAULTS.get("device") == "cpu":
+        return "cpu"
+    return "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+
+
+def check_model_exists(ms):
+    """True when the checkpoint is on disk and matched its SHA-256 (a truncated file does not count)"""
+    if ms in MODEL_URLS:
+        return model_ready(ms)
+    return Path(ms).is_file()
+
+
+def load_model(model_size, device, progress=None):
+    """Load a Whisper model; a missing checkpoint is fetched by model_fetcher first
+    (parallel, resumable), progress(done_bytes, total_bytes) reporting the download.
+    Loading from the verified path skips whisper's own re-hash of the whole file."""
+    if model_size not in MODEL_URLS:
+        return whisper.load_model(model_size, device=device)
+    path = fetch_model(model_size, progress=progress)
+    model = whisper.load_model(str(path), device=device)
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(model_size)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return model
+
+
+def load_audio(file_path):
+    return whisper.load_audio(str(file_path))
+
+
+def load_audio_range(file_path, start=0.0, duration=None):
+    """Decode only [start, start + duration) seconds of a file; duration None reads to the end.
+    Same ffmpeg pipeline as whisper.load_audio, with an input seek in front."""
+    import numpy as np
+
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-ss", f"{start:.3f}"]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-i", str(file_path), "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+            "-ar", str(SAMPLE_RATE), "-"]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def audio_duration(audio):
+    return audio.shape[0] / float(SAMPLE_RATE)
+
+
+_FFMPEG_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def probe_duration(file_path):
+    """Length of an audio file in seconds without decoding it: the WAV header when possible,
+    else ffprobe, else the Duration line ffmpeg prints. None when none of them can tell."""
+    file_path = str(file_path)
+    if file_path.lower().endswith(".wav"):
+        try:
+            with wave.open(file_path, 'rb') as w:
+                return w.getnframes() / float(w.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass        # e.g. float or extensible WAV; let ffprobe read it
+
+    if shutil.which("ffprobe"):
+        try:
+            out = subprocess.run(
+                ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                 "-of", "default=noprint_wrappers=1:nokey=1", file_path],
+                capture_output=True, text=True, timeout=60
+            ).stdout.strip()
+            return float(out)
+        except (ValueError, OSError, subprocess.TimeoutExpired):
+            pass
+
+    if shutil.which("ffmpeg"):
+        try:
+            err = subprocess.run(["ffmpeg", "-nostdin", "-hide_banner", "-i", file_path],
+                                 capture_output=True, text=True, timeout=60).stderr
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        m = _FFMPEG_DURATION_RE.search(err)
+        if m:
+            return int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    return None
+
+
+def build_prompt(keyword, lang):
+    """Initial prompt that steers Whisper toward the keyword's topic"""
+    if not keyword or not lang:
+        return None
+    lang_prompts = {
+        'ja': f"この音声は『{keyword}』に関連しています。",
+        'en': f"The following audio is related to '{keyword}'.",
+        'zh': f"以下音频与'{keyword}'相关。",
+        'ko': f"다음 오디오는 '{keyword}'와 관련이 있습니다."
+    }
+    return lang_prompts.get(lang, lang_prompts['en'])
+
+
+def chunk_spans(duration, chunk_seconds=CHUNK_SECONDS):
+    """(offset, length) seconds of the chunks split_chunks would cut; the last length is None
+    so a short duration estimate never drops the tail"""
+    n = max(1, math.ceil(duration / chunk_seconds))
+    return [(i * chunk_seconds, chunk_seconds if i < n - 1 else None) for i in range(n)]
+
+
+def split_chunks(audio, chunk_seconds=CHUNK_SECONDS):
+    """Split decoded audio into (offset_seconds, samples) chunks"""
+    chunk_size = int(chunk_seconds * SAMPLE_RATE)
+    return [
+        (i / SAMPLE_RATE, audio[i: i + chunk_size])
+        for i in range(0, audio.shape[0], chunk_size)
+    ]
+
+
+_VERBOSE_SEGMENT_RE = re.compile(r'\[((?:\d+:)?\d+:\d+\.\d+) --> ((?:\d+:)?\d+:\d+\.\d+)\]\s*(.*)')
+
+
+def _timestamp_seconds(text):
+    seconds = 0.0
+    for part in text.split(':'):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+class SegmentLineStream(io.TextIOBase):
+    """Stream for whisper's verbose console output that reports every printed segment
+    as on_segment(start, end, text), shifted by offset seconds"""
+    def __init__(self, on_segment, offset=0.0):
+        super().__init__()
+        self.on_segment = on_segment
+        self.offset = offset
+        self._pending = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        # tqdm redraws with '\r', so split on both line endings to keep the buffer short
+        lines = re.split(r'[\r\n]', self._pending + text)
+        self._pending = lines.pop()
+        for line in lines:
+            m = _VERBOSE_SEGMENT_RE.search(line)
+            if m:
+                self.on_segment(_timestamp_seconds(m.group(1)) + self.offset,
+                                _timestamp_seconds(m.group(2)) + self.offset,
+                                m.group(3).strip())
+        return len(text)
+
+
+def transcribe_chunk(model, audio, language=None, prompt=None, params=None, verbose=None):
+    """One model.transcribe() call with the app's whisper parameters; returns whisper's result dict"""
+    p = dict(DEFAULT_PARAMS)
+    p.update(params or {})
+    return model.transcribe(
+        audio,
+        language=language,
+        task="transcribe",
+        initial_prompt=prompt,
+        verbose=verbose,
+        temperature=p["temperature"],
+        best_of=p["best_of"],
+        beam_size=p["beam_size"],
+        logprob_threshold=p["logprob_threshold"],
+        no_speech_threshold=p["no_speech_threshold"],
+        condition_on_previous_text=p["condition_on_previous_text"],
+        word_timestamps=p["word_timestamps"],
+        fp16=p["fp16"]
+    )
+
+
+def transcribe_chunks(model, audio, language=None, prompt=None, params=None,
+                      chunk_seconds=CHUNK_SECONDS, progress_stream=None, verbose=None, timer=None):
+    """Transcribe decoded audio chunk by chunk and return (SegmentStore, StageTimer).
+    progress_stream(offset) may return a stream that receives whisper's console output
+    for the chunk starting at offset seconds."""
+    return transcribe_pieces(model, split_chunks(audio, chunk_seconds), language, prompt, params,
+                             progress_stream, verbose, timer)
+
+
+def transcribe_pieces(model, pieces, language=None, prompt=None, params=None,
+                      progress_stream=None, verbose=None, timer=None):
+    """Transcribe (offset_seconds, samples) pieces in order; pieces may be a generator that
+    decodes each chunk only when it is needed. Returns (SegmentStore, StageTimer)."""
+    store = SegmentStore()
+    timer = timer or StageTimer()
+
+    for offset, seg_audio in pieces:
+        stream = progress_stream(offset) if progress_stream else None
+        with contextlib.ExitStack() as stack:
+            if stream is not None:
+                stack.enter_context(contextlib.redirect_stdout(stream))
+                stack.enter_context(contextlib.redirect_stderr(stream))
+            with timer.watch(model):
+                result_seg = transcribe_chunk(
+                    model, seg_audio,
+                    language=language,
+                    prompt=prompt,
+                    params=params,
+                    verbose=(stream is not None) if verbose is None else verbose
+                )
+        del seg_audio
+        store.extend_whisper_segments(result_seg["segments"], offset)
+
+    return store, timer
+
+
+def _memory_stage(memory, name):
+    return memory.stage(name) if memory is not None else contextlib.nullcontext()
+
+
+def transcribe_path(model, input_file, language=None, prompt=None, params=None,
+                    chunk_seconds=CHUNK_SECONDS, progress_stream=None, verbose=None,
+                    timer=None, memory=None, streaming=False):
+    """Decode and transcribe one file; returns (SegmentStore, duration_seconds, StageTimer).
+    streaming decodes one chunk at a time with load_audio_range instead of holding the
+    whole file in memory (used when the file is too long for the memory budget).
+    memory is an optional memory_budget.MemoryTracker."""
+    timer = timer or StageTimer()
+    duration = probe_duration(input_file) if streaming else None
+    if duration is None:
+        streaming = False
+
+    if streaming:
+        with _memory_stage(memory, "chunk_list"):
+            spans = chunk_spans(duration, chunk_seconds)
+        decoded = [0.0]
+
+        def pieces():
+            for offset, length in spans:
+                with timer.stage("decode_audio"):
+                    seg_audio = load_audio_range(input_file, offset, length)
+                decoded[0] += audio_duration(seg_audio)
+                yield offset, seg_audio
+
+        with _memory_stage(memory, "transcription"):
+            store, _ = transcribe_pieces(model, pieces(), language, prompt, params,
+                                         progress_stream, verbose, timer)
+        return store, decoded[0], timer
+
+    with _memory_stage(memory, "audio_load"), timer.stage("decode_audio"):
+        audio = load_audio(input_file)
+    duration = audio_duration(audio)
+    with _memory_stage(memory, "chunk_list"):
+        chunks = split_chunks(audio, chunk_seconds)
+    del audio
+    with _memory_stage(memory, "transcription"):
+        store, _ = transcribe_pieces(model, chunks, language, prompt, params,
+                                     progress_stream, verbose, timer)
+    return store, duration, timer
+
+
+def transcribe_file(model, input_file, base_path, formats, language=None, keyword="",
+                    model_name="", device="", params=None, chunk_seconds=CHUNK_SECONDS, verbose=None,
+                    timer=None, memory=None, streaming=False):
+    """Transcribe one audio file and export it to base_path.<ext>.
+    Returns (store, duration_seconds, written_paths); pass a StageTimer to get the stage times
+    and a MemoryTracker for the memory per stage."""
+    lang = None if language in (None, "", "auto") else language
+    timer = timer or StageTimer()
+    store, duration, _ = transcribe_path(
+        model, input_file,
+        language=lang,
+        prompt=build_prompt(keyword, lang),
+        params=params,
+        chunk_seconds=chunk_seconds,
+        verbose=verbose,
+        timer=timer,
+        memory=memory,
+        streaming=streaming
+    )
+    written = export_result(store, input_file, base_path, formats, language, keyword,
+                            model_name, device, params, timer, memory)
+    return store, duration, written
+
+
+def export_result(store, input_file, base_path, formats, language=None, keyword="",
+                  model_name="", device="", params=None, timer=None, memory=None):
+    """Write a finished (or cached) transcript of input_file to base_path.<ext>; returns the paths.
+    With a StageTimer the JSON metadata carries the stage times measured so far, and the
+    time spent writing is added to its write stage."""
+    Path(base_path).parent.mkdir(parents=True, exist_ok=True)
+    meta = build_metadata(input_file, keyword, language or "auto", model_name, device, store, timer, memory)
+    if timer is None:
+        return export(store, base_path, formats, meta, params)
+    with timer.stage("write"):
+        return export(store, base_path, formats, meta, params)
+
+
+def outputs_exist(base_path, formats):
+    return all(Path(f"{base_path}.{fmt}").exists() for fmt in formats)
+
+
+# ---------- exporters ----------
+def seconds_to_srt_time(seconds):
+    """Convert seconds to SRT timestamp format (HH:MM:SS,mmm)"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def seconds_to_vtt_time(seconds):
+    """Convert seconds to WebVTT timestamp format (HH:MM:SS.mmm)"""
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    millis = int((seconds % 1) * 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+
+
+def vtt_escape(text):
+    """Escape text for a WebVTT cue payload, where &, < and > start entities and tags"""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def karaoke_vtt_text(words):
+    """Build WebVTT cue text with per-word timestamp tags for karaoke-style highlighting"""
+    parts = [f"<c>{vtt_escape(words[0].word.strip())}</c>"]
+    for w in words[1:]:
+        parts.append(f"<{seconds_to_vtt_time(w.start)}><c>{vtt_escape(w.word)}</c>")
+    return "".join(parts)
+
+
+def build_metadata(source_file, keyword, language, model, device, store, timer=None, memory=None):
+    """Header fields of a saved JSON transcript; timer and memory are the job's StageTimer
+    and MemoryTracker, if any"""
+    meta = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "source_file": os.path.basename(source_file),
+        "keyword": keyword,
+        "language": language,
+        "model": model,
+        "device": device,
+    }
+    if timer is not None:
+        if store.has_words:
+            meta["word_alignment_seconds"] = round(timer.seconds["align"], 3)
+        meta["timings"] = timer.as_dict()
+    if memory is not None and memory.stages:
+        meta["memory_mb"] = memory.as_dict()
+    return meta
+
+
+def write_json(fp, store, meta):
+    data = dict(meta)
+    data["transcription"] = store.to_dicts()
+    with open(fp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_txt(fp, store, meta):
+    with open(fp, 'w', encoding='utf-8') as f:
+        f.write(f"Transcription of: {meta['source_file']}\n")
+        f.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Language: {meta['language']}\n")
+        f.write(f"Model: {meta['model']}\n")
+        f.write("-" * 50 + "\n\n")
+
+        for seg in store:
+            start_time = str(timedelta(seconds=int(seg.start)))
+            end_time = str(timedelta(seconds=int(seg.end)))
+            f.write(f"[{start_time} --> {end_time}]\n")
+            f.write(f"{seg.text}\n\n")
+
+
+def write_srt(fp, store):
+    with open(fp, 'w', encoding='utf-8') as f:
+        for i, seg in enumerate(store, 1):
+            start_time = seconds_to_srt_time(seg.start)
+            end_time = seconds_to_srt_time(seg.end)
+
+            f.write(f"{i}\n")
+            f.write(f"{start_time} --> {end_time}\n")
+            f.write(f"{seg.text}\n\n")
+
+
+def write_vtt(fp, store):
+    with open(fp, 'w', encoding='utf-8') as f:
+        f.write("WEBVTT\n\n")
+        for i, seg in enumerate(store):
+            start_time = seconds_to_vtt_time(seg.start)
+            end_time = seconds_to_vtt_time(seg.end)
+
+            f.write(f"{start_time} --> {end_time}\n")
+            words = store.words_of(i)
+            if words:
+                f.write(f"{karaoke_vtt_text(words)}\n\n")
+            else:
+                f.write(f"{vtt_escape(seg.text)}\n\n")
+
+
+def subtitle_store(store, language, params):
+    """Cues for SRT/VTT export: re-segmented when resegment_subtitles is enabled"""
+    if params.get("resegment_subtitles", False):
+        lang = (language or "").split(' - ')[0]
+        return resegment(store, SubtitleRules.for_language(lang))
+    return store
+
+
+def export(store, base_path, formats, meta, params=None):
+    """Write every requested format to base_path.<ext>; returns the written paths"""
+    params = params or {}
+    written = []
+    cues = None
+    for fmt in formats:
+        fp = f"{base_path}.{fmt}"
+        if fmt == "json":
+            write_json(fp, store, meta)
+        elif fmt == "txt":
+            write_txt(fp, store, meta)
+        elif fmt in ("srt", "vtt"):
+            if cues is None:
+                cues = subtitle_store(store, meta.get("language"), params)
+            (write_srt if fmt == "srt" else write_vtt)(fp, cues)
+        else:
+            raise ValueError(f"Unknown output format: {fmt}")
+        written.append(fp)
+    return written
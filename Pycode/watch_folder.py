@@ -0,0 +1,320 @@
+"""Watch-folder service: queue audio files as they finish writing and transcribe them
+with one resident model, writing the outputs next to each input.
+
+    python Transcription.py --watch \\\\share\\recordings --model large-v3 --formats srt,json
+
+Jobs live in a SQLite queue (job_queue.py), so a restart resumes where it stopped
+without transcribing finished files again.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import transcription_core as core
+from job_queue import DEFAULT_QUEUE_PATH, DONE, JobQueue
+from memory_budget import MemoryBudgetError, MemoryTracker, plan_memory
+from transcription_cli import (EXIT_INTERRUPTED, EXIT_OK, EXIT_USAGE, add_transcription_args,
+                               cache_lookup, chunk_seconds_for, index_result, load_resident_model,
+                               memory_settings, open_cache, open_index, open_metrics, params_from_args,
+                               parse_formats, profile_job)
+from stage_timing import StageTimer
+
+
+def log(message):
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  {message}", flush=True)
+
+
+class FolderWatcher:
+    """Polls directories for audio files and reports each one once it has finished writing:
+    non-empty, size and mtime unchanged for settle_seconds, and readable (not locked by the recorder)"""
+
+    def __init__(self, directories, recursive=False, settle_seconds=10.0):
+        self.directories = [Path(d) for d in directories]
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self._pending = {}      # path -> (size, mtime, first time seen with this size/mtime)
+        self._reported = {}     # path -> (size, mtime) last reported as ready
+
+    def _audio_files(self):
+        pattern = "**/*" if self.recursive else "*"
+        for root in self.directories:
+            for f in root.glob(pattern):
+                if f.suffix.lower() in core.AUDIO_EXTENSIONS and f.is_file():
+                    yield f
+
+    def scan(self, now=None):
+        """Return files that became ready since the last scan, as (path, size, mtime)"""
+        now = time.time() if now is None else now
+        ready = []
+        present = set()
+        for f in self._audio_files():
+            key = str(f)
+            present.add(key)
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            sig = (st.st_size, st.st_mtime)
+            if self._reported.get(key) == sig:
+                continue
+            if st.st_size == 0:
+                self._pending.pop(key, None)
+                continue
+
+            prev = self._pending.get(key)
+            if prev is None or prev[:2] != sig:
+                # Files already old on first sight (e.g. present at startup) count as settled
+                since = st.st_mtime if prev is None else now
+                self._pending[key] = sig + (min(since, now),)
+                prev = self._pending[key]
+            if now - prev[2] < self.settle_seconds or not self._readable(f):
+                continue
+
+            del self._pending[key]
+            self._reported[key] = sig
+            ready.append((f, st.st_size, st.st_mtime))
+
+        # Forget files that were moved away or deleted
+        for key in list(self._pending):
+            if key not in present:
+                del self._pending[key]
+        for key in list(self._reported):
+            if key not in present:
+                del self._reported[key]
+        return ready
+
+    @staticmethod
+    def _readable(path):
+        try:
+            with open(path, 'rb') as f:
+                f.read(1)
+            return True
+        except OSError:
+            return False
+
+
+class WatchService:
+    """Scan -> enqueue -> claim -> transcribe loop around one loaded model"""
+
+    def __init__(self, jobs, watcher, model, device, args, formats, index=None, cache=None, metrics=None,
+                 budget=None, enforce=False):
+        self.jobs = jobs
+        self.watcher = watcher
+        self.model = model
+        self.device = device
+        self.args = args
+        self.formats = formats
+        self.params = params_from_args(args)
+        self.index = index
+        self.cache = cache
+        self.metrics = metrics
+        self.budget = budget
+        self.enforce = enforce
+        self.host = socket.gethostname()
+        self.worker = f"{self.host}:{os.getpid()}"
+        self.processed = 0
+
+    def enqueue_ready(self):
+        for path, size, mtime in self.watcher.scan():
+            base = path.with_suffix("")
+            if not self.args.overwrite and core.outputs_exist(base, self.formats):
+                continue
+            job_id = self.jobs.enqueue(path, priority=self.args.priority, size=size, mtime=mtime,
+                                       max_attempts=self.args.max_attempts)
+            if job_id:
+                log(f"queued #{job_id} {path}")
+
+    def run_job(self, job):
+        input_file = Path(job["path"])
+        base = input_file.with_suffix("")
+        log(f"start #{job['id']} (try {job['attempts']}/{job['max_attempts']}) {input_file}")
+        if not input_file.exists():
+            self.jobs.fail(job["id"], "file no longer exists", retry=False)
+            log(f"failed #{job['id']}: file no longer exists")
+            return
+
+        plan = None
+        if self.budget is not None:
+            try:
+                plan = plan_memory(self.args.model, core.probe_duration(input_file), self.args.chunk_minutes * 60,
+                                   self.budget, self.device, self.enforce)
+            except MemoryBudgetError as e:
+                self.jobs.fail(job["id"], e, retry=False)
+                log(f"failed #{job['id']}: {e}")
+                if self.metrics:
+                    self.metrics.record_failure()
+                return
+            if plan.adjusted or not plan.fits:
+                log(f"memory #{job['id']}: {plan.describe()}" + ("" if plan.fits else ", may run out of memory"))
+
+        # The plan comes first: a shortened chunk is part of the cache key
+        chunk_seconds = chunk_seconds_for(self.args, plan)
+        cache_entry = None
+        if self.cache:
+            try:
+                content_hash, key, hit = cache_lookup(self.cache, input_file, self.args, self.params,
+                                                      chunk_seconds)
+                cache_entry = (content_hash, key)
+            except Exception as e:
+                hit = None
+                log(f"warning: cache lookup failed: {e}")
+            if hit is not None:
+                self.finish_cached(job, input_file, base, *hit)
+                return
+
+        t0 = time.perf_counter()
+        timer = StageTimer()
+        memory = MemoryTracker(self.args.trace_memory)
+        profile = profile_job(self.args, base)
+        try:
+            with profile:
+                store, duration, written = core.transcribe_file(
+                    self.model, input_file, base, self.formats,
+                    language=self.args.language,
+                    keyword=self.args.keyword.strip(),
+                    model_name=self.args.model,
+                    device=self.device,
+                    params=self.params,
+                    chunk_seconds=chunk_seconds,
+                    verbose=True if self.args.verbose else None,
+                    timer=timer,
+                    memory=memory,
+                    streaming=plan.streaming if plan else False
+                )
+        except Exception as e:
+            status = self.jobs.fail(job["id"], e)
+            log(f"failed #{job['id']}: {e} ({'will retry' if status != 'failed' else 'giving up'})")
+            if self.metrics:
+                self.metrics.record_failure()
+            return
+
+        self.jobs.complete(job["id"], written)
+        self.processed += 1
+        elapsed = time.perf_counter() - t0
+        rtf = elapsed / duration if duration > 0 else 0.0
+        log(f"done #{job['id']}: {len(store)} segments, {timedelta(seconds=int(duration))} audio "
+            f"in {elapsed:.1f}s (RTF {rtf:.2f}) -> {', '.join(os.path.basename(w) for w in written)}")
+        log(f"stages #{job['id']}: {timer.summary_line()}")
+        log(f"memory #{job['id']}: {memory.summary_line()}")
+        if getattr(profile, "paths", None):
+            log(f"profile #{job['id']}: {', '.join(profile.paths)}")
+        if self.metrics:
+            self.metrics.record(timer, duration)
+        if cache_entry:
+            try:
+                self.cache.put(cache_entry[1], cache_entry[0], store, self.args.model, self.args.language, duration)
+            except Exception as e:
+                log(f"warning: caching the result failed: {e}")
+        self.index_job(input_file, base, store)
+
+    def finish_cached(self, job, input_file, base, store, duration):
+        """Export a transcript found in the result cache instead of transcribing again"""
+        try:
+            written = core.export_result(store, input_file, base, self.formats, self.args.language,
+                                         self.args.keyword.strip(), self.args.model, "", self.params)
+        except Exception as e:
+            status = self.jobs.fail(job["id"], e)
+            log(f"failed #{job['id']}: {e} ({'will retry' if status != 'failed' else 'giving up'})")
+            return
+        self.jobs.complete(job["id"], written)
+        self.processed += 1
+        log(f"done #{job['id']}: served from cache, {len(store)} segments "
+            f"-> {', '.join(os.path.basename(w) for w in written)}")
+        self.index_job(input_file, base, store)
+
+    def index_job(self, input_file, base, store):
+        if self.index:
+            try:
+                index_result(self.index, input_file, base, self.formats, store, self.args)
+            except Exception as e:
+                log(f"warning: indexing failed: {e}")
+
+    def run(self, once=False):
+        """Process jobs until interrupted; with once=True stop when nothing is runnable"""
+        # One service per machine and queue: anything still 'running' for this host was cut off
+        recovered = self.jobs.recover(self.host)
+        if recovered:
+            log(f"requeued {recovered} job(s) interrupted by a previous run")
+        last_scan = 0.0
+        while True:
+            if time.monotonic() - last_scan >= self.args.poll:
+                self.enqueue_ready()
+                last_scan = time.monotonic()
+
+            job = self.jobs.claim(self.worker)
+            if job is None:
+                if once:
+                    return
+                time.sleep(min(self.args.poll, 1.0))
+                continue
+            try:
+                self.run_job(job)
+            except KeyboardInterrupt:
+                self.jobs.release(job["id"])
+                log(f"stopped, #{job['id']} returned to the queue")
+                raise
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="Transcription.py",
+        description="Watch folders and transcribe new audio files as they arrive")
+    parser.add_argument("--watch", nargs="+", required=True, metavar="DIR", help="directories to watch")
+    parser.add_argument("--queue", default=str(DEFAULT_QUEUE_PATH), help="job queue database")
+    parser.add_argument("--poll", type=float, default=5.0, help="seconds between folder scans")
+    parser.add_argument("--settle", type=float, default=10.0,
+                        help="seconds a file's size must stay unchanged before it is queued")
+    parser.add_argument("--priority", type=int, default=0, help="priority of jobs from the watched folders")
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=30.0,
+                        help="seconds before the first retry; doubles on each further failure")
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty instead of waiting")
+    add_transcription_args(parser)
+    return parser
+
+
+def _raise_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    formats = parse_formats(parser, args.formats)
+    budget, enforce = memory_settings(parser, args)
+
+    missing = [d for d in args.watch if not Path(d).is_dir()]
+    if missing:
+        print(f"Not a directory: {', '.join(missing)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    jobs = JobQueue(args.queue, retry_delay=args.retry_delay)
+    index = open_index(args)
+    model, device = load_resident_model(args)
+    if model is None:
+        return device           # exit code
+
+    watcher = FolderWatcher(args.watch, args.recursive, args.settle)
+    service = WatchService(jobs, watcher, model, device, args, formats, index, open_cache(args), open_metrics(args),
+                           budget, enforce)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+
+    counts = jobs.counts()
+    log(f"watching {', '.join(args.watch)} ({counts['queued']} queued, {counts[DONE]} done so far)")
+    try:
+        service.run(once=args.once)
+    except KeyboardInterrupt:
+        log(f"stopped after {service.processed} file(s)")
+        return EXIT_INTERRUPTED
+    log(f"queue empty, {service.processed} file(s) transcribed")
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""Content-addressed store of downloaded wheels for PyTorch_Downloader.
+
+Reinstalling, or switching between the CPU and CUDA builds of PyTorch, used to download
+multi-GB wheels again every time. Wheels now live once under objects/<sha256[:2]>/<sha256>;
+links/<source key>/ holds one file per wheel name (a hard link to the object, a copy where
+links are not supported) that pip reads with --find-links. The source key is a hash of the
+index URL or directory the wheels came from: the CPU and CUDA indexes publish torch under
+the same name and version with a different local label (2.7.1+cpu, 2.7.1+cu126), so a bare
+`torch` requirement must only ever be resolved against wheels from the index it names.
+Wheels added without a source (the embedded whisper wheel, imported bundles) go to
+links/local/. An SQLite index records size and last use, and prune() evicts the least
+recently used wheels beyond the size cap.
+
+install() first runs pip with --no-index against the wheels of its source. Only when that
+cannot be satisfied does `pip download` fetch the missing wheels (wheels of that source
+already in the store are taken from --find-links instead of the network); they are added
+to the store and the install runs offline again. The source may be an index URL or a local directory of
+wheels, so the whole flow can be tried without network access:
+
+    python wheel_store.py install --index ./wheelhouse --target ./libs torch numpy
+    python wheel_store.py stats
+    python wheel_store.py prune --max-gb 4
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_STORE_PATH = Path.home() / ".cache" / "whisper_transcription" / "wheels"
+# Room for a CUDA and a CPU build of torch side by side plus their dependencies
+DEFAULT_MAX_BYTES = 12 * 1024 ** 3
+HASH_BLOCK = 1024 * 1024
+# Links directory of wheels that did not come from an index
+LOCAL_SOURCE = "local"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wheels (
+    source     TEXT NOT NULL,
+    filename   TEXT NOT NULL,
+    sha256     TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    project    TEXT NOT NULL,
+    version    TEXT NOT NULL,
+    added_at   TEXT,
+    last_used  TEXT,
+    uses       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, filename)
+);
+CREATE INDEX IF NOT EXISTS wheels_sha256 ON wheels (sha256);
+CREATE INDEX IF NOT EXISTS wheels_last_used ON wheels (last_used);
+"""
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_project(name):
+    """PEP 503 name as it appears (with underscores) in wheel and .dist-info names"""
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def parse_wheel_name(filename):
+    """(project, version) of a wheel file name, e.g. torch-2.7.1+cpu-cp312-...whl"""
+    parts = Path(filename).name[:-len(".whl")].split("-")
+    if len(parts) < 5 or not filename.endswith(".whl"):
+        raise ValueError(f"not a wheel file name: {filename}")
+    return normalize_project(parts[0]), parts[1]
+
+
+def source_args(index):
+    """pip options that read packages from an index URL or a local directory of wheels"""
+    if index.startswith("file://"):
+        index = index[len("file://"):]
+    if os.path.isdir(index):
+        return ["--no-index", "--find-links", str(Path(index).absolute())]
+    return ["--index-url", index]
+
+
+def source_key(source):
+    """Name of the links directory for wheels from an index URL or local directory"""
+    if source is None:
+        return LOCAL_SOURCE
+    if source.startswith("file://"):
+        source = source[len("file://"):]
+    source = str(Path(source).absolute()) if os.path.isdir(source) else source.rstrip("/")
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+class WheelStore:
+    """Wheel files keyed by content, shared by every install from this machine"""
+
+    def __init__(self, root=DEFAULT_STORE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root).absolute()
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / "objects"
+        self.links_dir = self.root / "links"
+        self.db_path = self.root / "index.sqlite3"
+        self._write_lock = threading.Lock()
+        self.links_dir.mkdir(parents=True, exist_ok=True)
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Open a short-lived connection; commits on success and always closes"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _object_path(self, sha256):
+        return self.objects_dir / sha256[:2] / sha256
+
+    def _links(self, key):
+        return self.links_dir / key
+
+    def wheel_path(self, filename):
+        """Stored file of a wheel name (from any source), or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT sha256 FROM wheels WHERE filename = ? LIMIT 1", (filename,)).fetchone()
+        return self._object_path(row[0]) if row else None
+
+    # ---------- adding ----------
+    def add(self, wheel_path, source=None):
+        """Copy a wheel downloaded from source (an index URL or directory; None for a wheel
+        of no particular index) into the store; returns (filename, newly_added)"""
+        wheel_path = Path(wheel_path)
+        project, version = parse_wheel_name(wheel_path.name)
+        sha256 = hash_file(wheel_path)
+        obj = self._object_path(sha256)
+        key = source_key(source)
+        link = self._links(key) / wheel_path.name
+        with self._write_lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT sha256 FROM wheels WHERE source = ? AND filename = ?",
+                                   (key, wheel_path.name)).fetchone()
+            if row is not None and row[0] == sha256 and link.exists():
+                return wheel_path.name, False
+            if not obj.exists():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_name(obj.name + ".tmp")
+                shutil.copyfile(wheel_path, tmp)
+                os.replace(tmp, obj)
+            link.parent.mkdir(parents=True, exist_ok=True)
+            self._link(obj, link)
+            now = datetime.now().isoformat(timespec="seconds")
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO wheels (source, filename, sha256, size, project, version, added_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, wheel_path.name, sha256, obj.stat().st_size, project, version, now, now))
+        return wheel_path.name, True
+
+    def add_directory(self, directory, source=None):
+        """Add every wheel in directory; returns the names that were new to the store"""
+        added = []
+        for wheel in sorted(Path(directory).glob("*.whl")):
+            name, new = self.add(wheel, source)
+            if new:
+                added.append(name)
+        return added
+
+    @staticmethod
+    def _link(obj, link):
+        tmp = link.with_name(link.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            shutil.copyfile(obj, tmp)       # FAT/exFAT drives and some network shares
+        os.replace(tmp, link)
+
+    # ---------- installing ----------
+    def offline_args(self, source=None):
+        """pip options that install from the wheels of source only, or with no source from
+        every stored wheel (safe only for exact versions, e.g. torch==2.7.1+cpu)"""
+        if source is not None:
+            folders = [self._links(source_key(source))]
+        else:
+            folders = sorted(p for p in self.links_dir.iterdir() if p.is_dir())
+        args = ["--no-index"]
+        for folder in folders:
+            args += ["--find-links", str(folder)]
+        return args
+
+    def install(self, run_pip, requirements, target, source, pip_options=(), label="pip"):
+        """pip install requirements into target from the store, downloading only what it lacks.
+        run_pip(args, label) runs pip and raises RuntimeError on failure. source is an index
+        URL or a local wheel directory; pip_options (platform, --only-binary, --no-deps, ...)
+        apply to both the download and the install. Returns the names of downloaded wheels."""
+        install_args = ["install", *requirements, *pip_options, "--no-cache-dir", "--target", str(target)]
+        links = self._links(source_key(source))
+        links.mkdir(parents=True, exist_ok=True)
+        try:
+            run_pip(install_args + self.offline_args(source), f"{label} (wheel cache)")
+            downloaded = []
+        except RuntimeError:
+            with tempfile.TemporaryDirectory(prefix="download-", dir=self.root) as staging:
+                download_opts = [o for o in pip_options if o != "--upgrade"]
+                run_pip(["download", *requirements, *download_opts, "--no-cache-dir",
+                         "--dest", staging, *source_args(source), "--find-links", str(links)],
+                        f"{label} (download)")
+                downloaded = self.add_directory(staging, source)
+            run_pip(install_args + self.offline_args(source), label)
+        return downloaded
+
+    def installed_wheels(self, target):
+        """Names of stored wheels whose project and version are installed in target"""
+        installed = set()
+        for info in Path(target).glob("*.dist-info"):
+            name, _, version = info.name[:-len(".dist-info")].rpartition("-")
+            installed.add((normalize_project(name), version))
+        with self._connect() as conn:
+            rows = conn.execute("SELECT filename, project, version FROM wheels").fetchall()
+        return sorted({filename for filename, project, version in rows if (project, version) in installed})
+
+    def mark_installed(self, target):
+        """Record a use of the stored wheels installed in target (pruning evicts the least
+        recently used first); returns their names"""
+        used = self.installed_wheels(target)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._write_lock, self._connect() as conn:
+            conn.executemany("UPDATE wheels SET last_used = ?, uses = uses + 1 WHERE filename = ?",
+                             [(now, filename) for filename in used])
+        return used
+
+    # ---------- size cap ----------
+    def prune(self, max_bytes=None, keep=()):
+        """Delete least recently used wheels until the store fits max_bytes (the store's
+        cap by default); wheels named in keep stay. Returns (files removed, bytes freed)."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        keep = set(keep)
+        removed, freed = 0, 0
+        with self._write_lock:
+            with self._connect() as conn:
+                rows = conn.execute("SELECT source, filename, sha256, size FROM wheels "
+                                    "ORDER BY last_used, filename").fetchall()
+                total = sum(self._unique_sizes(rows).values())
+                for source, filename, sha256, size in rows:
+                    if total <= max_bytes:
+                        break
+                    if filename in keep:
+                        continue
+                    conn.execute("DELETE FROM wheels WHERE source = ? AND filename = ?", (source, filename))
+                    (self._links(source) / filename).unlink(missing_ok=True)
+                    removed += 1
+                    still_used = conn.execute("SELECT 1 FROM wheels WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+                    if not still_used:
+                        self._object_path(sha256).unlink(missing_ok=True)
+                        total -= size
+                        freed += size
+        return removed, freed
+
+    @staticmethod
+    def _unique_sizes(rows):
+        return {row[-2]: row[-1] for row in rows}
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT filename, sha256, size FROM wheels").fetchall()
+        return {"wheels": len(rows), "bytes": sum(self._unique_sizes(rows).values()),
+                "max_bytes": self.max_bytes, "path": str(self.root)}
+
+
+# ---------- command line ----------
+def _subprocess_pip(args, label):
+    print(f"[{label}] pip {' '.join(args)}", flush=True)
+    rc = subprocess.call([sys.executable, "-m", "pip", *args])
+    if rc != 0:
+        raise RuntimeError(f"{label} failed with exit-code {rc}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, fill or prune the local wheel store")
+    parser.add_argument("--root", default=str(DEFAULT_STORE_PATH))
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    prune = sub.add_parser("prune")
+    prune.add_argument("--max-gb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3)
+    add = sub.add_parser("add")
+    add.add_argument("wheels", nargs="+")
+    install = sub.add_parser("install")
+    install.add_argument("--index", required=True, help="index URL or local directory of wheels")
+    install.add_argument("--target", required=True)
+    install.add_argument("requirements", nargs="+")
+    args = parser.parse_args(argv)
+
+    store = WheelStore(args.root)
+    if args.command == "stats":
+        s = store.stats()
+        print(f"{s['wheels']} wheels, {s['bytes'] / 1024 ** 2:.0f} MB of {s['max_bytes'] / 1024 ** 3:g} GB in {s['path']}")
+    elif args.command == "prune":
+        removed, freed = store.prune(int(args.max_gb * 1024 ** 3))
+        print(f"removed {removed} wheels, freed {freed / 1024 ** 2:.0f} MB")
+    elif args.command == "add":
+        for wheel in args.wheels:
+            name, new = store.add(wheel)
+            print(f"{'added' if new else 'already stored'}: {name}")
+    else:
+        downloaded = store.install(_subprocess_pip, args.requirements, args.target, args.index,
+                                   ["--only-binary", ":all:", "--upgrade"])
+        store.mark_installed(args.target)
+        print(f"downloaded {len(downloaded)} wheels" if downloaded else "installed from the wheel store only")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())